@@ -0,0 +1,300 @@
+"""
+This script benchmarks the CPU-side stages of the documentation of Python scripts.
+
+Synthetic modules of several sizes are generated, with a flat layout (top-level functions and
+classes with methods) and a deeply nested one (classes, methods and closures defined inside each
+other), and every stage of the documentation process is timed on them without querying any model:
+tokenizing and extracting the elements as the legacy parser did, reading the script, indexing
+its elements, selecting and minimizing them for their prompts and rewriting the script with a
+docstring per element, both with offset-based edits and with the legacy `str.replace` rewrite of
+each element. The operations per second and the peak memory of each stage are reported,
+and compared against a stored baseline to catch regressions before a release.
+
+Usage:
+    python benchmarks/bench_python.py                    Run and compare against the baseline.
+    python benchmarks/bench_python.py --save-baseline    Run and store the results as the baseline.
+    python benchmarks/bench_python.py --sizes 100 1000   Run only some sizes.
+
+Functions:
+    generate_module: Generates the source code of a synthetic Python module.
+    legacy_rewrite: Adds a docstring to every element with the legacy `str.replace` rewrite.
+    run_benchmarks: Times every stage on the synthetic modules.
+    compare: Compares some results against a baseline.
+    main: Runs the benchmarks from the command line.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from llmcode.utils.file_utils import (  # noqa: E402
+    apply_edits,
+    extract_functions_and_classes_from_python_tokens,
+    iter_python_elements,
+    parse_python,
+    read_python,
+)
+from llmcode.utils.document import _docstring_edit, _select_elements  # noqa: E402
+
+SIZES = [100, 1000, 10000, 50000]  # Lines of the synthetic modules
+SHAPES = ["flat", "nested"]
+BASELINE = Path(__file__).parent / "baseline.json"
+MIN_TIME = 0.5  # Seconds each stage is repeated for
+TOLERANCE = 0.3  # Allowed relative slowdown or memory increase
+
+FUNCTION = '''def function_{n}(values, factor=2):
+    """Scales the values."""
+    # Keep only the positive values
+    result = []
+    for value in values:
+        if value > 0:
+            result.append(value * factor)
+    message = "{text}"
+    return result, message
+
+'''
+
+CLASS = """class Class{n}:
+    def __init__(self, size):
+        self.size = size
+        self.items = []
+
+    def add(self, item):
+        # Ignore the items that do not fit
+        if len(self.items) < self.size:
+            self.items.append(item)
+        return len(self.items)
+
+"""
+
+
+def _flat_chunk(n):
+    return FUNCTION.format(n=n, text="x" * 40) + CLASS.format(n=n)
+
+
+def _nested_chunk(n, depth=8):
+    lines = []
+    for level in range(depth):
+        indent = "    " * level
+        if level % 2:
+            lines.append(f"{indent}def method_{n}_{level}(self, value):")
+        else:
+            lines.append(f"{indent}class Level{n}_{level}:")
+        lines.append(f'{indent}    """Level {level}."""')
+        lines.append(f"{indent}    total = {level}  # The level")
+    for level in reversed(range(depth)):
+        indent = "    " * (level + 1)
+        lines.append(f"{indent}if total > {level}:")
+        lines.append(f"{indent}    total -= 1")
+        if level % 2:
+            lines.append(f"{indent}return total")
+    return "\n".join(lines) + "\n\n\n"
+
+
+def generate_module(lines, shape="flat"):
+    """
+    Generates the source code of a synthetic Python module.
+
+    Args:
+        lines (int): The approximate number of lines of the module.
+        shape (str, optional): "flat" for top-level functions and classes, or "nested" for classes,
+            methods and closures defined inside each other (default is "flat").
+
+    Returns:
+        (str): The source code of the module, with at least the given number of lines.
+    """
+    chunk = _flat_chunk if shape == "flat" else _nested_chunk
+    pieces = ['"""A synthetic module."""\n\n']
+    count = 2
+    n = 0
+    while count < lines:
+        piece = chunk(n)
+        pieces.append(piece)
+        count += piece.count("\n")
+        n += 1
+    return "".join(pieces)
+
+
+def legacy_rewrite(source, elements, docstring):
+    """
+    Adds a docstring to every element with the legacy `str.replace` rewrite.
+
+    Every element found by the legacy parser is replaced in the whole script by a copy with the
+    docstring inserted at its docstring index, as the documentation process did before the
+    offset-based edits.
+
+    Args:
+        source (str): The source code of the script.
+        elements (dict): The elements of the script by type, as returned by
+            `extract_functions_and_classes_from_python_tokens`.
+        docstring (str): The content of the docstring.
+
+    Returns:
+        (str): The rewritten source code.
+    """
+    for element_list in elements.values():
+        for element, _, where in element_list:
+            n_spaces = len(element[:where]) - len(element[:where].rstrip(" "))
+            new_element = (
+                element[:where]
+                + f'"""{docstring}"""'
+                + "\n"
+                + " " * n_spaces
+                + element[where:]
+            )
+            source = source.replace(element, new_element)
+    return source
+
+
+def _time(function, min_time):
+    """Returns the operations per second of a function, repeated for at least a minimum time."""
+    runs = 0
+    start = time.perf_counter()
+    elapsed = 0
+    while runs == 0 or elapsed < min_time:
+        function()
+        runs += 1
+        elapsed = time.perf_counter() - start
+    return runs / elapsed
+
+
+def _peak_memory(function):
+    """Returns the peak memory allocated by a function, in KiB."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _stages(path, source):
+    """Returns the stages to benchmark on a script, by name."""
+    spans = list(iter_python_elements(source))
+    tokens = parse_python(path)
+    elements, legacy_source = extract_functions_and_classes_from_python_tokens(tokens)
+    return {
+        "tokenize": lambda: parse_python(path),
+        "extract": lambda: extract_functions_and_classes_from_python_tokens(tokens),
+        "read": lambda: read_python(path),
+        "index": lambda: list(iter_python_elements(source)),
+        "select": lambda: _select_elements(source, spans, None, True),
+        "rewrite": lambda: apply_edits(
+            source,
+            [_docstring_edit(source, span, "A new docstring.") for span in spans],
+        ),
+        "replace": lambda: legacy_rewrite(legacy_source, elements, "A new docstring."),
+    }
+
+
+def run_benchmarks(sizes=SIZES, shapes=SHAPES, min_time=MIN_TIME):
+    """
+    Times every stage on the synthetic modules.
+
+    Args:
+        sizes (list, optional): The number of lines of the modules (default is SIZES).
+        shapes (list, optional): The shapes of the modules (default is SHAPES).
+        min_time (float, optional): The seconds each stage is repeated for (default is MIN_TIME).
+
+    Returns:
+        (dict): The results by "stage/shape/lines", with the operations per second ("ops") and the
+            peak memory in KiB ("peak_kib") of each stage.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as folder:
+        for shape in shapes:
+            for size in sizes:
+                source = generate_module(size, shape)
+                path = Path(folder) / f"{shape}_{size}.py"
+                path.write_text(source, encoding="utf-8")
+                for stage, function in _stages(str(path), source).items():
+                    results[f"{stage}/{shape}/{size}"] = {
+                        "ops": _time(function, min_time),
+                        "peak_kib": _peak_memory(function),
+                    }
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    Compares some results against a baseline.
+
+    Args:
+        results (dict): The results of `run_benchmarks`.
+        baseline (dict): The stored results to compare against.
+        tolerance (float, optional): The allowed relative slowdown or memory increase (default is TOLERANCE).
+
+    Returns:
+        (list): The keys of the results that regressed, with the reason.
+    """
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        if result["ops"] < baseline[key]["ops"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: {result['ops']:.2f} ops/s < {baseline[key]['ops']:.2f} ops/s"
+            )
+        if result["peak_kib"] > baseline[key]["peak_kib"] * (1 + tolerance):
+            regressions.append(
+                f"{key}: {result['peak_kib']:.0f} KiB > {baseline[key]['peak_kib']:.0f} KiB"
+            )
+    return regressions
+
+
+def main():
+    """
+    Runs the benchmarks from the command line, printing a table of the results.
+
+    Returns:
+        (int): 1 if some stage regressed against the baseline, 0 otherwise.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--shapes", nargs="*", choices=SHAPES, default=SHAPES)
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store the results as the baseline instead of comparing against it",
+    )
+    args = parser.parse_args()
+    results = run_benchmarks(args.sizes, args.shapes, args.min_time)
+    baseline = (
+        json.loads(args.baseline.read_text(encoding="utf-8"))
+        if args.baseline.exists()
+        else {}
+    )
+    print(f"{'stage/shape/lines':<28}{'ops/s':>12}{'peak KiB':>12}{'vs baseline':>14}")
+    for key, result in results.items():
+        change = (
+            f"{result['ops'] / baseline[key]['ops'] - 1:+.0%}"
+            if key in baseline
+            else "-"
+        )
+        print(f"{key:<28}{result['ops']:>12.2f}{result['peak_kib']:>12.0f}{change:>14}")
+    if args.save_baseline:
+        args.baseline.write_text(
+            json.dumps({**baseline, **results}, indent=2) + "\n", encoding="utf-8"
+        )
+        print(f"Baseline stored in {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    for regression in regressions:
+        print(f"Regression in {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
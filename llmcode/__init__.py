@@ -3,6 +3,25 @@ Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
 """
 
-from llmcode.utils.auxiliary import format_code as docu
-
 __all__ = ("docu",)
+
+
+def __getattr__(name):
+    """
+    Imports `docu`, the `format_code` function, the first time it is accessed, so importing the
+    package (e.g. to run the command line interface) does not import the documentation process.
+
+    Args:
+        name (str): The name of the attribute.
+
+    Returns:
+        (callable): The `format_code` function, if the name is "docu".
+
+    Raises:
+        AttributeError: If the package has no attribute with the name.
+    """
+    if name == "docu":
+        from llmcode.utils.auxiliary import format_code as docu
+
+        return docu
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,16 +4,61 @@ in LLMCode. It includes settings for file exclusion, language specification,
 timeout settings, and documentation prompts.
 
 Attributes:
-    exclude (list): Files to exclude from documentation.
+    exclude (list): Files to exclude from documentation, as gitignore patterns (e.g. names or globs).
+    use_gitignore (bool): Whether to exclude the files ignored by the .gitignore files and the
+        .git/info/exclude file of the repository of the documented folder.
+    ignore_file (str or None): Name of the project ignore file, with gitignore patterns, read from
+        the documented folder.
     elements2doc (list or None): Specific elements to document.
         If None, all elements are documented.
     languages (list): Languages of the scripts to be documented.
     completion_timeout (int): Maximum time to wait for the model to give a response (in seconds).
+    max_workers (int): Maximum number of concurrent queries to the model.
+    max_completion_threads (int): Maximum number of threads running synchronous completion functions.
+    max_connections (int): Maximum number of connections of each pool of the reusable OpenAI client.
+    keepalive_timeout (float): Seconds an idle connection of the reusable clients is kept open.
+    local_base_url (str): Base URL of the OpenAI-compatible local server of the local backend.
+    local_api_key (str or None): API key of the local server, if it requires one.
+    local_max_connections (int): Maximum number of connections (and queries in flight) to the local server.
+    cassette_path (str): Path to the cassette file of the record/replay backend.
+    cassette_mode (str): "record" to store the responses of cassette_backend, or "replay" to read them.
+    cassette_backend (str): Backend whose responses are recorded.
+    cassette_latency (float, tuple, callable or None): Simulated latency of every replayed query: a
+        number of seconds, a (min, max) uniform range, or a function of a random.Random.
+    cassette_error_rate (float): Probability of a simulated error (HTTP 429) in a query.
+    cassette_seed (int or None): Seed of the simulated latencies and errors.
+    requests_per_minute (int or None): Requests per minute budget of the account. If None, it is
+        taken from the rate-limit headers of the API, if any.
+    tokens_per_minute (int or None): Tokens per minute budget of the account. If None, it is
+        taken from the rate-limit headers of the API, if any.
+    max_retries (int): Maximum number of retries of a rate-limited query.
+    backoff_base (float): Base of the exponential backoff of the retries (in seconds).
+    backoff_max (float): Maximum backoff of the retries (in seconds).
     rewrite (bool): Whether to overwrite the code in the same input path.
     surname (str): Suffix to add to the folder or file name if not overwriting.
     overwrite (bool): Whether to overwrite the current docstrings.
-    document_prompts (dict): Paths to the prompt files for documenting functions and classes.
+    document_prompts (dict): Paths to the prompt files for documenting functions and classes, and
+        several functions at once ("functions").
     query_completion_key (str): Placeholder in the prompt for an element.
+    pack_elements (bool): Whether to document several small functions of a script with a single query.
+    pack_max_tokens (int): Maximum number of tokens of the functions packed in a query.
+    minimize_elements (bool): Whether to strip the comments, long literals and (beyond the token
+        budget) the nested bodies of the elements before sending them to the model.
+    max_element_tokens (int): Token budget of a minimized element.
+    max_literal_length (int): Maximum length of the string literals of a minimized element.
+    token_counter (callable or None): Function that counts the tokens of a text. If None, tiktoken
+        is used if installed, and otherwise the tokens are estimated from the length of the text.
+    use_cache (bool): Whether to store the completions in a persistent cache and reuse them.
+    cache_path (Path): Path to the SQLite database of the completion cache.
+    cache_max_size (int): Maximum size of the completion cache (in bytes).
+    incremental (bool): Whether to skip the scripts unchanged since the last run with the same settings,
+        recording them in a run manifest in the documented folder.
+    manifest_name (str): Name of the run manifest file, stored in the documented folder.
+    metrics_json (str or None): Path to write the JSON summary of the metrics of each run to, if any.
+    metrics_prometheus (str or None): Path to write the metrics of each run to as a Prometheus textfile, if any.
+    plan_output_tokens (int): Estimated number of tokens of a response, used by the plans.
+    plan_query_latency (float): Estimated latency of a query before its output is generated (in seconds).
+    plan_output_rate (float): Estimated number of output tokens the model generates per second.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
@@ -23,9 +68,29 @@ from pathlib import Path
 import os
 
 exclude = []
+use_gitignore = True
+ignore_file = ".llmcodeignore"
 elements2doc = None
 languages = ["python"]
 completion_timeout = 30
+max_workers = 1
+max_completion_threads = 32
+max_connections = 32
+keepalive_timeout = 60
+local_base_url = os.environ.get("LLMCODE_LOCAL_BASE_URL", "http://localhost:8000/v1")
+local_api_key = os.environ.get("LLMCODE_LOCAL_API_KEY")
+local_max_connections = 64
+cassette_path = "llmcode_cassette.jsonl"
+cassette_mode = "replay"
+cassette_backend = "get_completion_openai_async"
+cassette_latency = None
+cassette_error_rate = 0
+cassette_seed = None
+requests_per_minute = None
+tokens_per_minute = None
+max_retries = 5
+backoff_base = 1
+backoff_max = 60
 rewrite = True
 surname = "_analysed"
 overwrite = False
@@ -35,6 +100,28 @@ document_prompts = {
         / f"..{os.path.sep}prompts{os.path.sep}python{os.path.sep}documentFunction.txt",
         "class": Path(__file__).parent
         / f"..{os.path.sep}prompts{os.path.sep}python{os.path.sep}documentClass.txt",
+        "functions": Path(__file__).parent
+        / f"..{os.path.sep}prompts{os.path.sep}python{os.path.sep}documentFunctions.txt",
     }
 }
 query_completion_key = "!<QUERY COMPLETION>!"
+pack_elements = False
+minimize_elements = False
+max_element_tokens = 2000
+max_literal_length = 200
+token_counter = None
+pack_max_tokens = 1500
+use_cache = False
+cache_path = (
+    Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache"))
+    / "llmcode"
+    / "completions.sqlite"
+)
+cache_max_size = 100 * 1024 * 1024
+incremental = False
+manifest_name = ".llmcode_manifest.json"
+metrics_json = None
+metrics_prometheus = None
+plan_output_tokens = 150
+plan_query_latency = 1.0
+plan_output_rate = 50
@@ -10,6 +10,18 @@ Options:
     --languages     Specify programming languages to include.
     --elements2doc  Specify elements to document.
     --overwrite     Overwrite existing docstrings if present.
+    --jobs          Maximum number of concurrent queries to the model.
+    --cache         Reuse and store the completions in the persistent cache.
+    --no-cache      Do not use the persistent cache, even if it is enabled.
+    --incremental   Skip the scripts unchanged since the last run with the same settings.
+    --force         Document all the scripts, even if incremental runs are enabled.
+    --pack          Document several small functions with a single query.
+    --batch-export  Write the queries to a JSONL file for the OpenAI Batch API and exit.
+    --batch-import  Document the scripts with the results file of a completed batch.
+    --metrics-json  Write the JSON summary of the metrics of the run to a file.
+    --metrics-prometheus  Write the metrics of the run to a Prometheus textfile.
+    --plan          Write the elements to document and their estimated tokens and time to a plan file and exit.
+    --execute       Document the elements of a plan file.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
@@ -19,9 +31,17 @@ import sys
 import argparse
 import signal
 from threading import Event
-from llmcode.cfg.custom_params import exclude, languages, elements2doc
-from .utils.logger import LOGGER
-from .utils.auxiliary import format_code
+from llmcode.cfg.custom_params import (
+    exclude,
+    languages,
+    elements2doc,
+    max_workers,
+    use_cache,
+    incremental,
+    pack_elements,
+    metrics_json,
+    metrics_prometheus,
+)
 
 
 def parse_args():
@@ -31,8 +51,8 @@ def parse_args():
     This function sets up an argument parser to handle the input parameters
     required for the script execution. It allows the user to specify a path,
     exclude certain files or directories, choose programming languages,
-    identify elements to document, and decide whether to overwrite existing
-    docstrings.
+    identify elements to document, decide whether to overwrite existing
+    docstrings and set how many queries are sent to the model concurrently.
 
     Args:
         path (str, optional): The path to format without a name (default is None).
@@ -40,6 +60,18 @@ def parse_args():
         --languages (str, optional): A list of programming languages to include (default is languages).
         --elements2doc (str, optional): A list of elements to document (default is elements2doc).
         --overwrite (bool, optional): Whether to overwrite the current docstrings (default is False).
+        --jobs (int, optional): Maximum number of concurrent queries to the model (default is max_workers).
+        --cache (bool, optional): Whether to use the persistent completion cache (default is use_cache).
+        --no-cache (bool, optional): Whether to disable the persistent completion cache, overriding --cache (default is False).
+        --incremental (bool, optional): Whether to skip the scripts unchanged since the last run (default is incremental).
+        --force (bool, optional): Whether to document all the scripts, overriding --incremental (default is False).
+        --pack (bool, optional): Whether to document several small functions with a single query (default is pack_elements).
+        --batch-export (str, optional): The JSONL file to write the queries to, without documenting (default is None).
+        --batch-import (str, optional): The JSONL results file of a batch to document with (default is None).
+        --metrics-json (str, optional): The file to write the JSON summary of the metrics to (default is metrics_json).
+        --metrics-prometheus (str, optional): The Prometheus textfile to write the metrics to (default is metrics_prometheus).
+        --plan (str, optional): The JSON file to write the plan of the run to, without documenting (default is None).
+        --execute (str, optional): The JSON plan file whose elements are documented, instead of a path (default is None).
 
     Returns:
         Namespace: An object containing the parsed arguments as attributes.
@@ -72,7 +104,88 @@ def parse_args():
         action="store_true",
         help="Wheter to overwrite or not the current docstrings",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=max_workers,
+        help="Maximum number of concurrent queries to the model",
+    )
+    parser.add_argument(
+        "--cache",
+        dest="use_cache",
+        action="store_true",
+        default=use_cache,
+        help="Reuse and store the completions in the persistent cache",
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="use_cache",
+        action="store_false",
+        default=use_cache,
+        help="Do not use the persistent cache, even if it is enabled",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        default=incremental,
+        help="Skip the scripts unchanged since the last run with the same settings",
+    )
+    parser.add_argument(
+        "--force",
+        dest="incremental",
+        action="store_false",
+        default=incremental,
+        help="Document all the scripts, even if incremental runs are enabled",
+    )
+    parser.add_argument(
+        "--pack",
+        action="store_true",
+        default=pack_elements,
+        help="Document several small functions with a single query",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="FILE",
+        default=metrics_json,
+        help="Write the JSON summary of the time spent in every stage of the run to a file",
+    )
+    parser.add_argument(
+        "--metrics-prometheus",
+        metavar="FILE",
+        default=metrics_prometheus,
+        help="Write the metrics of the run to a Prometheus textfile",
+    )
+    batch = parser.add_mutually_exclusive_group()
+    batch.add_argument(
+        "--batch-export",
+        metavar="FILE",
+        default=None,
+        help="Write the queries to a JSONL file for the OpenAI Batch API and exit",
+    )
+    batch.add_argument(
+        "--batch-import",
+        metavar="FILE",
+        default=None,
+        help="Document the scripts with the results file of a completed batch",
+    )
+    batch.add_argument(
+        "--plan",
+        metavar="FILE",
+        default=None,
+        help="Write the elements to document, with their estimated tokens and time, to a JSON plan file and exit",
+    )
+    batch.add_argument(
+        "--execute",
+        metavar="FILE",
+        default=None,
+        help="Document the elements of a JSON plan file written with --plan",
+    )
+    args = parser.parse_args()
+    if args.execute is not None and args.path is not None:
+        parser.error(
+            "a plan is executed on the path it was made for, do not pass a path with --execute"
+        )
+    return args
 
 
 def main():
@@ -80,8 +193,12 @@ def main():
     Main function to initiate the formatting process for scripts or folders.
 
     This function sets up a signal handler for interrupt signals (SIGINT) to gracefully stop the operation
-    when requested. It checks for the required path argument, and if missing, logs an informative message
-    and exits. It then calls the `format_code` function with the appropriate parameters.
+    when requested. It checks for the required path argument (unless a plan is executed), and if missing, logs
+    an informative message and exits. It then calls the `format_code` function with the appropriate parameters,
+    exports the queries to a batch file, writes the plan of the run or documents the elements of a plan. When
+    the results of a batch are imported, they are used instead of the completion function and the completion
+    cache is not used. The documentation process is imported
+    only after the arguments are parsed and a path is given, so `--help` returns immediately.
     """
 
     def crtl_c_handler(sig, frame):
@@ -90,12 +207,60 @@ def main():
     signal.signal(signal.SIGINT, crtl_c_handler)
     stop_flag = Event()
     args = parse_args()
-    if args.path is None:
+    from .utils.logger import LOGGER
+
+    if args.path is None and args.execute is None:
         LOGGER.info(
             "Missing path to format: Please provide the path to be documented. \
             It can be an script or a folder containing scripts at any level."
         )
         sys.exit(0)
+    # The documentation process is only imported once there is something to document
+    from .utils.auxiliary import format_code, export_batch, export_plan, execute_plan
+
+    if args.execute is not None:
+        execute_plan(
+            args.execute,
+            stop_flag,
+            args.jobs,
+            args.use_cache,
+            args.incremental,
+            None,
+            args.pack,
+            args.metrics_json,
+            args.metrics_prometheus,
+        )
+        return
+    if args.plan is not None:
+        export_plan(
+            args.path,
+            args.plan,
+            args.exclude,
+            args.languages,
+            args.elements2doc,
+            args.overwrite,
+            args.jobs,
+            args.incremental,
+        )
+        return
+    if args.batch_export is not None:
+        export_batch(
+            args.path,
+            args.batch_export,
+            args.exclude,
+            args.languages,
+            args.elements2doc,
+            args.overwrite,
+        )
+        return
+    if args.batch_import is not None:
+        from .utils.batch import BatchResults
+
+        get_completion_function = BatchResults(args.batch_import).get_completion_batch
+    else:
+        get_completion_function = (
+            None  # The configured backend, resolved when first queried
+        )
     format_code(
         args.path,
         args.exclude,
@@ -103,6 +268,13 @@ def main():
         args.elements2doc,
         args.overwrite,
         stop_flag,
+        args.jobs,
+        args.use_cache and args.batch_import is None,
+        args.incremental,
+        get_completion_function,
+        args.pack,
+        args.metrics_json,
+        args.metrics_prometheus,
     )
 
 
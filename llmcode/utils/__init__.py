@@ -7,7 +7,8 @@ Attributes:
     LANGUAGE (dict): Maps file suffixes to their corresponding programming languages.
     ANSI_CODE (dict): ANSI escape codes for terminal text coloring.
     TQDM_BAR_FORMAT (str): Format string for tqdm progress bars.
-    DOC_FUNCTION (dict): Maps programming languages to their document functions and parameters.
+    DOC_FUNCTION (dict): Maps programming languages to their document and prompt rendering functions and parameters,
+        built when first accessed.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
@@ -28,12 +29,31 @@ ANSI_CODE = {
 }
 TQDM_BAR_FORMAT = "{desc}: {percentage:3.0f}%|{bar:20}| {n_fmt}/{total_fmt} [{elapsed}]"
 
-from .document import doc_python_file
-from ..cfg.custom_params import document_prompts
 
-DOC_FUNCTION = {
-    "python": {
-        "function": doc_python_file,
-        "kwargs": {"prompts": document_prompts["python"]},
-    }
-}
+def __getattr__(name):
+    """
+    Builds `DOC_FUNCTION` the first time it is accessed, so the document functions (and their
+    dependencies) are only imported when some script is going to be documented.
+
+    Args:
+        name (str): The name of the attribute.
+
+    Returns:
+        (dict): The document functions by programming language, if the name is "DOC_FUNCTION".
+
+    Raises:
+        AttributeError: If the package has no attribute with the name.
+    """
+    if name == "DOC_FUNCTION":
+        from .document import doc_python_file_async, render_python_file_prompts
+        from ..cfg.custom_params import document_prompts
+
+        globals()["DOC_FUNCTION"] = {
+            "python": {
+                "function": doc_python_file_async,
+                "render_prompts": render_python_file_prompts,
+                "kwargs": {"prompts": document_prompts["python"]},
+            }
+        }
+        return globals()["DOC_FUNCTION"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
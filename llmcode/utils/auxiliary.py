@@ -1,42 +1,75 @@
 """
 This module provides utilities for formatting and documenting code files.
 
-It includes functions to format code files, apply documentation functions based on
-programming languages, and manage temporary file operations during the documentation process.
+It includes functions to format code files and apply documentation functions based on
+programming languages. The scripts are documented in place: each one is read once, transformed
+in memory and written back atomically only if its content changed.
+The process runs in an asyncio event loop; the synchronous functions are thin wrappers
+that start the loop.
 
 Functions:
-    format_code: Formats and documents code files in the specified path.
-    _apply_to_scripts: Applies a given function to scripts in a directory, handling temporary files.
+    format_code_async: Formats and documents code files in the specified path.
+    format_code: Synchronous wrapper of format_code_async.
+    export_batch: Exports the queries of the documentation process to a batch file.
+    export_plan: Plans the documentation process, writing the elements to query and their estimates.
+    execute_plan_async: Documents the elements of a plan.
+    execute_plan: Synchronous wrapper of execute_plan_async.
+    _apply_by_suffix_async: Applies a function per file suffix to the scripts of a directory, walking it once.
+    _apply_to_scripts_async: Applies a given function to the scripts in a directory.
+    _apply_to_scripts: Synchronous wrapper of _apply_to_scripts_async.
+    _find_scripts: Validates the path to document and finds its scripts.
+    _check_path: Validates the path to document and filters the supported languages.
+    _ignore_spec: Compiles the exclusion patterns of a documented folder.
+    _plan_covers: Checks if the planned elements of a script cover all its elements to document.
+    _settings_fingerprint: Computes the fingerprint of the documentation settings of a language.
+    _finish_run: Closes the resources of a run and exports its metrics.
+    _export_metrics: Exports the metrics of a run.
+    _open_cache: Opens the persistent completion cache.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
 """
 
 from pathlib import Path
-import shutil
-import os
+import asyncio
+import datetime
+import functools
+import inspect
+import sqlite3
 from threading import Event
-from tqdm import tqdm
 import llmcode.cfg.custom_params as custom_params
+import llmcode.cfg.completion_params as completion_params
 from .file_utils import (
     list_submodule_directories,
-    is_file_in_directory,
     copy_path,
-    ensure_folder_exist,
-    get_temp_folder,
+    read_content,
+    walk_scripts,
 )
-from .completion import get_completion
+from .completion import cancel_on_stop, close_client, _get_params
+from .cache import CompletionCache
+from .ignore import IgnoreSpec, find_missing
+from .batch import BatchWriter
+from .manifest import RunManifest, hash_file, settings_fingerprint
+from .metrics import get_metrics
+from .plan import Plan
 from . import ANSI_CODE, DOC_FUNCTION, SUFFIX, LANGUAGE, TQDM_BAR_FORMAT
 from .logger import LOGGER
 
 
-def format_code(
+async def format_code_async(
     path,
     exclude=custom_params.exclude,
     languages=custom_params.languages,
     elements2doc=custom_params.elements2doc,
     overwrite=custom_params.overwrite,
     stop_flag=Event(),
+    max_workers=custom_params.max_workers,
+    use_cache=custom_params.use_cache,
+    incremental=custom_params.incremental,
+    get_completion=None,
+    pack=custom_params.pack_elements,
+    metrics_json=custom_params.metrics_json,
+    metrics_prometheus=custom_params.metrics_prometheus,
 ):
     """
     Formats code files by applying specific documentation functions based on language.
@@ -44,7 +77,13 @@ def format_code(
     This function processes either a directory or a specific code file, excluding specified files
     from documentation generation, and applies predefined functions according to the code's language.
     It validates the input path, checks supported languages, and logs relevant information during the
-    process. If the path is a directory, it applies the functions to all relevant scripts within.
+    process. If the path is a directory, it applies the functions to all relevant scripts within. A single
+    semaphore of `max_workers` slots is shared by all the scripts of all the languages, bounding the number
+    of queries in flight during the whole run, and the queries in flight are cancelled as soon as the stop
+    flag is set. The scripts of all the languages are found in a single walk of the directory, and they start
+    being documented while the walk goes on. In incremental mode, the scripts recorded in the run manifest
+    of the project as documented with the same content and settings are skipped. The metrics of the process are
+    reset at the beginning of the run and exported at the end, if requested.
 
     Args:
         path (str): The path to the directory or file to be formatted.
@@ -53,12 +92,466 @@ def format_code(
         elements2doc (list, optional): List of specific elements to document (default is custom_params.elements2doc).
         overwrite (bool, optional): Flag indicating whether to overwrite existing documentation (default is custom_params.overwrite).
         stop_flag (Event, optional): A threading event to signal when to stop the process (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries to the model (default is custom_params.max_workers).
+        use_cache (bool, optional): Whether to reuse the completions stored in the persistent cache (default is custom_params.use_cache).
+        incremental (bool, optional): Whether to skip the scripts unchanged since they were documented with the same settings (default is custom_params.incremental).
+        get_completion (callable, optional): The function or coroutine function to get the completions (default is None, the configured completion function, resolved when a query is needed).
+        pack (bool, optional): Whether to document several small functions with a single query (default is custom_params.pack_elements).
+        metrics_json (str, optional): The path to write the JSON summary of the metrics of the run to (default is custom_params.metrics_json).
+        metrics_prometheus (str, optional): The path to write the metrics of the run to as a Prometheus textfile (default is custom_params.metrics_prometheus).
 
     Returns:
         (bool): True if the formatting process was successful, False otherwise.
     """
-    languages_filtered = languages.copy()
     path = Path(path)
+    languages_filtered = _check_path(path, exclude, languages)
+    if languages_filtered is None:
+        return None
+    metrics = get_metrics()
+    metrics.reset()
+    new_path = (
+        copy_path(path, add_to_parent=custom_params.surname)
+        if not custom_params.rewrite
+        else path
+    )
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    cache = _open_cache() if use_cache else None
+    manifest = (
+        RunManifest(
+            new_path if new_path.is_dir() else new_path.parent,
+            custom_params.manifest_name,
+        )
+        if incremental
+        else None
+    )
+    if not path.is_dir():
+        languages_filtered = [LANGUAGE[path.suffix]]
+    jobs = {
+        SUFFIX[l]: (
+            DOC_FUNCTION[l]["function"],
+            _settings_fingerprint(l, elements2doc, overwrite),
+            {
+                **DOC_FUNCTION[l]["kwargs"],
+                "elements2doc": elements2doc,
+                "overwrite": overwrite,
+                "cache": cache,
+                "pack": pack,
+                "get_completion": get_completion,
+            },
+        )
+        for l in languages_filtered
+    }
+    await cancel_on_stop(
+        _apply_by_suffix_async(
+            new_path,
+            jobs,
+            _ignore_spec(new_path, exclude) if new_path.is_dir() else exclude,
+            stop_flag,
+            max_workers,
+            semaphore,
+            manifest,
+        ),
+        stop_flag,
+    )
+    await _finish_run(cache, manifest, metrics, metrics_json, metrics_prometheus)
+    return True
+
+
+def format_code(
+    path,
+    exclude=custom_params.exclude,
+    languages=custom_params.languages,
+    elements2doc=custom_params.elements2doc,
+    overwrite=custom_params.overwrite,
+    stop_flag=Event(),
+    max_workers=custom_params.max_workers,
+    use_cache=custom_params.use_cache,
+    incremental=custom_params.incremental,
+    get_completion=None,
+    pack=custom_params.pack_elements,
+    metrics_json=custom_params.metrics_json,
+    metrics_prometheus=custom_params.metrics_prometheus,
+):
+    """
+    Synchronous wrapper of `format_code_async`, running it in a new event loop.
+
+    Args:
+        path (str): The path to the directory or file to be formatted.
+        exclude (list, optional): List of filenames or folders to exclude from documentation (default is custom_params.exclude).
+        languages (list, optional): List of programming languages to apply for documentation (default is custom_params.languages).
+        elements2doc (list, optional): List of specific elements to document (default is custom_params.elements2doc).
+        overwrite (bool, optional): Flag indicating whether to overwrite existing documentation (default is custom_params.overwrite).
+        stop_flag (Event, optional): A threading event to signal when to stop the process (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries to the model (default is custom_params.max_workers).
+        use_cache (bool, optional): Whether to reuse the completions stored in the persistent cache (default is custom_params.use_cache).
+        incremental (bool, optional): Whether to skip the scripts unchanged since they were documented with the same settings (default is custom_params.incremental).
+        get_completion (callable, optional): The function or coroutine function to get the completions (default is None, the configured completion function, resolved when a query is needed).
+        pack (bool, optional): Whether to document several small functions with a single query (default is custom_params.pack_elements).
+        metrics_json (str, optional): The path to write the JSON summary of the metrics of the run to (default is custom_params.metrics_json).
+        metrics_prometheus (str, optional): The path to write the metrics of the run to as a Prometheus textfile (default is custom_params.metrics_prometheus).
+
+    Returns:
+        (bool): True if the formatting process was successful, False otherwise.
+    """
+    return asyncio.run(
+        format_code_async(
+            path,
+            exclude,
+            languages,
+            elements2doc,
+            overwrite,
+            stop_flag,
+            max_workers,
+            use_cache,
+            incremental,
+            get_completion,
+            pack,
+            metrics_json,
+            metrics_prometheus,
+        )
+    )
+
+
+def export_batch(
+    path,
+    output,
+    exclude=custom_params.exclude,
+    languages=custom_params.languages,
+    elements2doc=custom_params.elements2doc,
+    overwrite=custom_params.overwrite,
+):
+    """
+    Exports the queries of the documentation process to a batch file, without querying the model.
+
+    The scripts and elements are selected as in `format_code_async`, and the rendered prompt of every
+    element to document is written as a request of the OpenAI Batch API. No script is modified. The
+    results of the batch are applied later by running `format_code` with the completion function of
+    a `BatchResults`.
+
+    Args:
+        path (str): The path to the directory or file to be documented.
+        output (str): The path to the JSONL batch file to write.
+        exclude (list, optional): List of filenames or folders to exclude from documentation (default is custom_params.exclude).
+        languages (list, optional): List of programming languages to document (default is custom_params.languages).
+        elements2doc (list, optional): List of specific elements to document (default is custom_params.elements2doc).
+        overwrite (bool, optional): Flag indicating whether to overwrite existing documentation (default is custom_params.overwrite).
+
+    Returns:
+        (int | None): The number of requests written, or None if the path can not be documented.
+    """
+    found = _find_scripts(Path(path), exclude, languages)
+    if found is None:
+        return None
+    root, scripts = found
+    writer = BatchWriter(output)
+    try:
+        for script, suffix in scripts:
+            l = LANGUAGE[suffix]
+            prompts = DOC_FUNCTION[l]["render_prompts"](
+                script,
+                elements2doc=elements2doc,
+                overwrite=overwrite,
+                **DOC_FUNCTION[l]["kwargs"],
+            )
+            for qualname, prompt, _ in prompts or []:
+                writer.add(script.relative_to(root).as_posix(), qualname, prompt)
+    finally:
+        writer.close()
+    LOGGER.info(
+        "%s\r%s requests written to the batch file %s.",
+        ANSI_CODE["reset"],
+        writer.requests,
+        output,
+    )
+    return writer.requests
+
+
+def export_plan(
+    path,
+    output,
+    exclude=custom_params.exclude,
+    languages=custom_params.languages,
+    elements2doc=custom_params.elements2doc,
+    overwrite=custom_params.overwrite,
+    max_workers=custom_params.max_workers,
+    incremental=custom_params.incremental,
+):
+    """
+    Plans the documentation process, writing the elements that would be queried to a plan file.
+
+    The scripts and elements are selected as in `format_code_async`, skipping the elements with a
+    docstring unless overwriting and, in incremental mode, the scripts unchanged since they were
+    documented, but the model is not queried and no script is modified. Every element is written with
+    the estimated input and output tokens of its query, and the plan with the projected wall time of
+    the run at `max_workers` concurrent queries. The plan is documented later by `execute_plan`.
+
+    Args:
+        path (str): The path to the directory or file to be documented.
+        output (str): The path to the JSON plan file to write.
+        exclude (list, optional): List of filenames or folders to exclude from documentation (default is custom_params.exclude).
+        languages (list, optional): List of programming languages to document (default is custom_params.languages).
+        elements2doc (list, optional): List of specific elements to document (default is custom_params.elements2doc).
+        overwrite (bool, optional): Flag indicating whether to overwrite existing documentation (default is custom_params.overwrite).
+        max_workers (int, optional): Maximum number of concurrent queries to the model the wall time is projected at (default is custom_params.max_workers).
+        incremental (bool, optional): Whether to leave out the scripts unchanged since they were documented with the same settings (default is custom_params.incremental).
+
+    Returns:
+        (Plan | None): The plan written, or None if the path can not be documented.
+    """
+    path = Path(path)
+    found = _find_scripts(path, exclude, languages)
+    if found is None:
+        return None
+    root, scripts = found
+    manifest = RunManifest(root, custom_params.manifest_name) if incremental else None
+    plan = Plan(
+        path,
+        {
+            "elements2doc": elements2doc,
+            "overwrite": overwrite,
+            "max_workers": max_workers,
+            "model": getattr(completion_params, "model", None),
+        },
+    )
+    skipped = 0
+    for script, suffix in scripts:
+        l = LANGUAGE[suffix]
+        if manifest is not None and manifest.is_unchanged(
+            script, _settings_fingerprint(l, elements2doc, overwrite)
+        ):
+            skipped += 1
+            continue
+        plan.add(
+            script,
+            l,
+            DOC_FUNCTION[l]["render_prompts"](
+                script,
+                elements2doc=elements2doc,
+                overwrite=overwrite,
+                **DOC_FUNCTION[l]["kwargs"],
+            ),
+        )
+    plan.save(output)
+    summary = plan.summary()
+    if skipped:
+        LOGGER.info(
+            "%s\r%s scripts unchanged since the last run were left out of the plan.",
+            ANSI_CODE["reset"],
+            skipped,
+        )
+    LOGGER.info(
+        "%s\r%s elements of %s scripts to document, with about %s input and %s output "
+        "tokens, projected to take %s at %s concurrent queries. Plan written to %s.",
+        ANSI_CODE["reset"],
+        summary["elements"],
+        summary["scripts"],
+        summary["input_tokens"],
+        summary["output_tokens"],
+        datetime.timedelta(seconds=round(summary["seconds"])),
+        max_workers,
+        output,
+    )
+    return plan
+
+
+async def execute_plan_async(
+    plan_path,
+    stop_flag=Event(),
+    max_workers=custom_params.max_workers,
+    use_cache=custom_params.use_cache,
+    incremental=custom_params.incremental,
+    get_completion=None,
+    pack=custom_params.pack_elements,
+    metrics_json=custom_params.metrics_json,
+    metrics_prometheus=custom_params.metrics_prometheus,
+):
+    """
+    Documents the elements of a plan written by `export_plan`.
+
+    Only the scripts of the plan are documented, without walking the folder, and only the elements planned
+    for each of them, with the settings the plan was made with. The elements that got a docstring since
+    the plan was made are not overwritten unless the plan overwrites them, and a warning is logged for the
+    scripts that changed. In incremental mode, a script is only recorded in the run manifest if its planned
+    elements cover all the elements that a full run would document in it. The scripts are documented as in `format_code_async`, in place or in a copy of
+    the documented path depending on `custom_params.rewrite`.
+
+    Args:
+        plan_path (str): The path to the JSON plan file.
+        stop_flag (Event, optional): A threading event to signal when to stop the process (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries to the model (default is custom_params.max_workers).
+        use_cache (bool, optional): Whether to reuse the completions stored in the persistent cache (default is custom_params.use_cache).
+        incremental (bool, optional): Whether to skip the scripts unchanged since they were documented with the same settings (default is custom_params.incremental).
+        get_completion (callable, optional): The function or coroutine function to get the completions (default is None, the configured completion function, resolved when a query is needed).
+        pack (bool, optional): Whether to document several small functions with a single query (default is custom_params.pack_elements).
+        metrics_json (str, optional): The path to write the JSON summary of the metrics of the run to (default is custom_params.metrics_json).
+        metrics_prometheus (str, optional): The path to write the metrics of the run to as a Prometheus textfile (default is custom_params.metrics_prometheus).
+
+    Returns:
+        (bool | None): True if the plan was executed, or None if its path does not exist anymore.
+    """
+    plan = Plan.load(plan_path)
+    if not plan.path.exists():
+        LOGGER.info(
+            "%s\r❌ The path %s of the plan %s does not exist.",
+            ANSI_CODE["red"],
+            plan.path,
+            plan_path,
+        )
+        return None
+    elements2doc = plan.settings["elements2doc"]
+    overwrite = plan.settings["overwrite"]
+    metrics = get_metrics()
+    metrics.reset()
+    new_path = (
+        copy_path(plan.path, add_to_parent=custom_params.surname)
+        if not custom_params.rewrite
+        else plan.path
+    )
+    new_root = new_path if new_path.is_dir() else new_path.parent
+    scripts = []
+    for entry in plan.scripts:
+        script = new_root / entry["path"] if new_path.is_dir() else new_path
+        if not script.exists():
+            LOGGER.info(
+                "%s\r⚠ The script %s of the plan does not exist anymore and was skipped.",
+                ANSI_CODE["yellow"],
+                str(script),
+            )
+            continue
+        if hash_file(script) != entry["sha256"]:
+            LOGGER.info(
+                "%s\r⚠ The script %s changed since the plan was made. Its planned elements are "
+                "documented if they are still found.",
+                ANSI_CODE["yellow"],
+                str(script),
+            )
+        planned = [element["qualname"] for element in entry["elements"]]
+        complete = incremental and _plan_covers(
+            script, entry["language"], planned, elements2doc, overwrite
+        )
+        scripts.append(
+            (script, SUFFIX[entry["language"]], {"elements2doc": planned}, complete)
+        )
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    cache = _open_cache() if use_cache else None
+    manifest = (
+        RunManifest(new_root, custom_params.manifest_name) if incremental else None
+    )
+    jobs = {
+        SUFFIX[l]: (
+            DOC_FUNCTION[l]["function"],
+            _settings_fingerprint(l, elements2doc, overwrite),
+            {
+                **DOC_FUNCTION[l]["kwargs"],
+                "elements2doc": elements2doc,
+                "overwrite": overwrite,
+                "cache": cache,
+                "pack": pack,
+                "get_completion": get_completion,
+            },
+        )
+        for l in {entry["language"] for entry in plan.scripts}
+    }
+    await cancel_on_stop(
+        _apply_by_suffix_async(
+            new_root,
+            jobs,
+            [],
+            stop_flag,
+            max_workers,
+            semaphore,
+            manifest,
+            scripts,
+        ),
+        stop_flag,
+    )
+    await _finish_run(cache, manifest, metrics, metrics_json, metrics_prometheus)
+    return True
+
+
+def execute_plan(
+    plan_path,
+    stop_flag=Event(),
+    max_workers=custom_params.max_workers,
+    use_cache=custom_params.use_cache,
+    incremental=custom_params.incremental,
+    get_completion=None,
+    pack=custom_params.pack_elements,
+    metrics_json=custom_params.metrics_json,
+    metrics_prometheus=custom_params.metrics_prometheus,
+):
+    """
+    Synchronous wrapper of `execute_plan_async`, running it in a new event loop.
+
+    Args:
+        plan_path (str): The path to the JSON plan file.
+        stop_flag (Event, optional): A threading event to signal when to stop the process (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries to the model (default is custom_params.max_workers).
+        use_cache (bool, optional): Whether to reuse the completions stored in the persistent cache (default is custom_params.use_cache).
+        incremental (bool, optional): Whether to skip the scripts unchanged since they were documented with the same settings (default is custom_params.incremental).
+        get_completion (callable, optional): The function or coroutine function to get the completions (default is None, the configured completion function, resolved when a query is needed).
+        pack (bool, optional): Whether to document several small functions with a single query (default is custom_params.pack_elements).
+        metrics_json (str, optional): The path to write the JSON summary of the metrics of the run to (default is custom_params.metrics_json).
+        metrics_prometheus (str, optional): The path to write the metrics of the run to as a Prometheus textfile (default is custom_params.metrics_prometheus).
+
+    Returns:
+        (bool | None): True if the plan was executed, or None if its path does not exist anymore.
+    """
+    return asyncio.run(
+        execute_plan_async(
+            plan_path,
+            stop_flag,
+            max_workers,
+            use_cache,
+            incremental,
+            get_completion,
+            pack,
+            metrics_json,
+            metrics_prometheus,
+        )
+    )
+
+
+def _find_scripts(path, exclude, languages):
+    """
+    Validates the path to document and finds its scripts of the supported languages.
+
+    Args:
+        path (Path): The path to the directory or file to be documented.
+        exclude (list): List of filenames or folders to exclude from documentation.
+        languages (list): List of programming languages to document.
+
+    Returns:
+        (tuple | None): The folder the scripts are relative to and an iterable of the (path, suffix) tuples
+            of the scripts, or None if the path can not be documented.
+    """
+    languages_filtered = _check_path(path, exclude, languages)
+    if languages_filtered is None:
+        return None
+    if not path.is_dir():
+        return path.resolve().parent, [(path.resolve(), path.suffix)]
+    root = path.resolve()
+    return root, walk_scripts(
+        root, [SUFFIX[l] for l in languages_filtered], _ignore_spec(root, exclude)
+    )
+
+
+def _check_path(path, exclude, languages):
+    """
+    Validates the path to document and the files to exclude, and filters the supported languages.
+
+    If the path is a directory, the submodules found in it are added to the files to exclude. The
+    exclusions with glob characters are not validated, since they may legitimately match nothing.
+
+    Args:
+        path (Path): The path to the directory or file to be documented.
+        exclude (list): List of filenames or folders to exclude from documentation.
+        languages (list): List of programming languages to document.
+
+    Returns:
+        (list | None): The supported languages, or None if the path is a script that can not be documented.
+    """
+    languages_filtered = languages.copy()
     assert path.exists(), f"{ANSI_CODE['red']}\r❌ {path} does not exist."
     if path.is_dir():
         for i, l in enumerate(languages):
@@ -71,11 +564,13 @@ def format_code(
                 )
                 languages_filtered.pop(i)
         # Check if the exclude folders exist, if there is an error stop the program to warn the user
-        for e in exclude:
-            assert is_file_in_directory(
-                path, e
-            ), f"{ANSI_CODE['red']}\r❌ Check the name of the file {e} that you want to exclude because it is not included in {path}, you could have make a typo!"
-        exclude.extend(list_submodule_directories(path))
+        missing = find_missing(path, exclude)
+        assert (
+            not missing
+        ), f"{ANSI_CODE['red']}\r❌ Check the name of the file {missing[0]} that you want to exclude because it is not included in {path}, you could have make a typo!"
+        exclude.extend(  # Anchored to the folder, so only the submodules are pruned
+            "/" + submodule for submodule in list_submodule_directories(path)
+        )
         if exclude:
             exc_str = " ".join(exclude)
             LOGGER.info(
@@ -94,124 +589,418 @@ def format_code(
             path.suffix,
         )
         return None
-    new_path = (
-        copy_path(path, add_to_parent=custom_params.surname)
-        if not custom_params.rewrite
-        else path
+    return languages_filtered
+
+
+def _ignore_spec(root, exclude):
+    """
+    Compiles the exclusion patterns of a documented folder with the ignore files configured in `custom_params`.
+
+    Args:
+        root (Path): The documented folder.
+        exclude (list): The exclusions of the command line, as gitignore patterns.
+
+    Returns:
+        (IgnoreSpec): The compiled exclusion patterns.
+    """
+    return IgnoreSpec(
+        root, exclude, custom_params.use_gitignore, custom_params.ignore_file
     )
-    for l in languages_filtered:
-        if stop_flag.is_set():
-            break
-        _apply_to_scripts(
-            new_path,
-            (
-                DOC_FUNCTION[l]["function"]
-                if path.is_dir()
-                else DOC_FUNCTION[LANGUAGE[path.suffix]]["function"]
-            ),
-            extension=SUFFIX[l] if path.is_dir() else path.suffix,
-            exclude=exclude,
-            stop_flag=stop_flag,
-            get_completion=get_completion,
-            **{
-                **DOC_FUNCTION[l]["kwargs"],
-                "elements2doc": elements2doc,
-                "overwrite": overwrite,
+
+
+def _plan_covers(script, language, planned, elements2doc, overwrite):
+    """
+    Checks if the planned elements of a script cover all the elements a full run would document in it.
+
+    Args:
+        script (Path): The path to the script.
+        language (str): The programming language of the script.
+        planned (list): The qualified names of the planned elements of the script.
+        elements2doc (list): List of specific elements to document.
+        overwrite (bool): Flag indicating whether to overwrite existing documentation.
+
+    Returns:
+        (bool): True if no element to document was left out of the plan.
+    """
+    selected = DOC_FUNCTION[language]["render_prompts"](
+        script,
+        elements2doc=elements2doc,
+        overwrite=overwrite,
+        **DOC_FUNCTION[language]["kwargs"],
+    )
+    return selected is not None and {qualname for qualname, _, _ in selected} <= set(
+        planned
+    )
+
+
+def _settings_fingerprint(language, elements2doc, overwrite):
+    """
+    Computes the fingerprint of the settings used to document the scripts of a language.
+
+    The fingerprint covers the content of the prompts, the elements to document, the overwrite
+    flag and the completion function and parameters, so a change in any of them makes the
+    scripts be documented again in incremental mode.
+
+    Args:
+        language (str): The programming language of the scripts.
+        elements2doc (list): List of specific elements to document.
+        overwrite (bool): Flag indicating whether to overwrite existing documentation.
+
+    Returns:
+        (str): The fingerprint of the settings.
+    """
+    return settings_fingerprint(
+        {
+            "language": language,
+            "prompts": {
+                e_type: read_content(prompt)
+                for e_type, prompt in DOC_FUNCTION[language]["kwargs"]
+                .get("prompts", {})
+                .items()
             },
+            "elements2doc": elements2doc,
+            "overwrite": overwrite,
+            "completion_function": completion_params.completion_function,
+            "completion_params": _get_params(),
+        }
+    )
+
+
+async def _finish_run(cache, manifest, metrics, json_path, prometheus_path):
+    """
+    Closes the resources of a run: the connections of the clients, the completion cache and the run
+    manifest, which is saved, and exports the metrics of the run.
+
+    Args:
+        cache (CompletionCache | None): The completion cache of the run, if any.
+        manifest (RunManifest | None): The run manifest of the run, if any.
+        metrics (Metrics): The metrics of the run.
+        json_path (str | None): The path to the JSON summary of the metrics, or None not to write it.
+        prometheus_path (str | None): The path to the Prometheus textfile, or None not to write it.
+    """
+    await close_client()
+    if cache is not None:
+        LOGGER.info(
+            "%s\rCompletion cache: %s hits, %s misses.",
+            ANSI_CODE["reset"],
+            cache.hits,
+            cache.misses,
+        )
+        cache.close()
+    if manifest is not None:
+        manifest.save()
+    _export_metrics(metrics, json_path, prometheus_path)
+
+
+def _export_metrics(metrics, json_path, prometheus_path):
+    """
+    Exports the metrics of a run to the requested files, logging the time spent in every stage.
+
+    Args:
+        metrics (Metrics): The metrics of the run.
+        json_path (str | None): The path to the JSON summary, or None not to write it.
+        prometheus_path (str | None): The path to the Prometheus textfile, or None not to write it.
+    """
+    summary = metrics.summary()
+    LOGGER.info(
+        "%s\rTime by stage: %s.",
+        ANSI_CODE["reset"],
+        ", ".join(
+            f"{stage} {entry['overall']['total']:.2f}s"
+            for stage, entry in summary["stages"].items()
+        ),
+    )
+    for path, write in (
+        (json_path, metrics.write_json),
+        (prometheus_path, metrics.write_prometheus),
+    ):
+        if path is None:
+            continue
+        try:
+            write(path)
+        except OSError as e:
+            LOGGER.info(
+                "%s\r⚠ The metrics could not be written to %s: %s",
+                ANSI_CODE["yellow"],
+                path,
+                e,
+            )
+
+
+def _open_cache():
+    """
+    Opens the persistent completion cache configured in `custom_params`.
+
+    Returns:
+        (CompletionCache | None): The opened cache, or None if it could not be opened.
+    """
+    try:
+        return CompletionCache(custom_params.cache_path, custom_params.cache_max_size)
+    except (OSError, sqlite3.Error) as e:
+        LOGGER.info(
+            "%s\r⚠ The completion cache %s could not be opened, completions will not be cached: %s",
+            ANSI_CODE["yellow"],
+            custom_params.cache_path,
+            e,
+        )
+        return None
+
+
+async def _run_function(
+    function_to_execute, file, stop_flag, semaphore, *args, **kwargs
+):
+    """
+    Runs the function to execute on a script, awaiting it if it is a coroutine function.
+
+    Coroutine functions receive the shared semaphore to bound their queries. Regular functions
+    are run in a worker thread so that they do not block the event loop.
+
+    Args:
+        function_to_execute (callable): The function or coroutine function to execute.
+        file (Path): The script to apply the function to.
+        stop_flag (Event): A flag to signal cessation of the function execution.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent queries.
+        *args: Additional positional arguments to be passed to the function.
+        **kwargs: Additional keyword arguments to be passed to the function.
+
+    Returns:
+        (any): The value returned by the function.
+    """
+    if inspect.iscoroutinefunction(function_to_execute):
+        return await function_to_execute(
+            file, stop_flag=stop_flag, semaphore=semaphore, *args, **kwargs
+        )
+    return await asyncio.to_thread(
+        function_to_execute, file, stop_flag=stop_flag, *args, **kwargs
+    )
+
+
+async def _apply_by_suffix_async(
+    root_path,
+    jobs,
+    exclude,
+    stop_flag=Event(),
+    max_workers=1,
+    semaphore=None,
+    manifest=None,
+    scripts=None,
+):
+    """
+    Applies a function per file suffix to the scripts of a directory, walking the directory once.
+
+    The directory (and its subdirectories) is walked a single time, pruning the excluded folders, and each
+    script found is dispatched to the function of its suffix as soon as it is found, so the scripts are
+    documented while the walk goes on. The functions are applied in place; they are responsible for writing
+    a file only if its content changed. The files are processed concurrently, and all of them acquire the
+    same semaphore (passed to the function as `semaphore`) before each query, so the number of completions
+    in flight never exceeds `max_workers` in the whole run. If a run manifest is provided, the files it
+    records as unchanged are skipped before being read, and the files for which the function returns True
+    are recorded in it. If the scripts are given, they are processed instead of walking the directory.
+
+    Args:
+        root_path (str): The root directory path where the scripts are located, or the path to a script.
+        jobs (dict): The (function, fingerprint, kwargs) tuple to apply to the scripts of each suffix, where
+            function is the function or coroutine function to execute, fingerprint the fingerprint of the
+            settings used with the manifest, and kwargs the keyword arguments of the function.
+        exclude (list | IgnoreSpec): The compiled exclusion patterns, or a list of gitignore patterns relative
+            to the root directory, such as names of files or folders.
+        stop_flag (Event, optional): A flag to signal cessation of the function execution (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries shared by all the files (default is 1).
+        semaphore (asyncio.Semaphore, optional): A semaphore shared with other calls to limit the number of
+            concurrent queries. If None, a new one of `max_workers` slots is created (default is None).
+        manifest (RunManifest, optional): The run manifest of the project (default is None).
+        scripts (Iterable, optional): The (path, suffix, kwargs, record) tuples of the scripts to process instead
+            of walking the directory, where kwargs override the keyword arguments of the function of the suffix
+            for the script, and record tells whether the script can be recorded in the manifest (default is None).
+
+    Returns:
+        (bool): True if the operation was successful, otherwise None.
+    """
+    root_path = Path(root_path).resolve()
+    semaphore = semaphore or asyncio.Semaphore(max(1, max_workers))
+    if isinstance(exclude, str):
+        exclude = [exclude]
+
+    async def document_file(file, suffix, overrides={}, record=True):
+        function, fingerprint, kwargs = jobs[suffix]
+        result = await _run_function(
+            function, file, stop_flag, semaphore, **{**kwargs, **overrides}
+        )
+        if manifest is not None and record and result is True:
+            manifest.record(file, fingerprint)
+        return file
+
+    if not root_path.is_dir():
+        if manifest is not None and manifest.is_unchanged(
+            root_path, jobs[root_path.suffix][1]
+        ):
+            LOGGER.info(
+                "%s\rThe script %s is unchanged since the last run and was skipped.",
+                ANSI_CODE["reset"],
+                str(root_path),
+            )
+            return True
+        await document_file(root_path, root_path.suffix)
+        return True
+    from tqdm import tqdm
+
+    pbar = tqdm(
+        desc=f"{ANSI_CODE['reset']}\rStarting to document...",
+        total=None,
+        bar_format=TQDM_BAR_FORMAT,
+    )
+    file_slots = asyncio.Semaphore(max(1, max_workers))
+    found = dict.fromkeys(jobs, 0)
+    skipped = 0
+    tasks = set()
+
+    async def document_slot(file, suffix, overrides, record):
+        async with file_slots:
+            if stop_flag.is_set():  # Do not start new scripts once interrupted
+                return file
+            return await document_file(file, suffix, overrides, record)
+
+    def update(task):
+        if not task.cancelled() and task.exception() is None:
+            pbar.set_description(
+                f"{ANSI_CODE['reset']}\rDocumented script {task.result()}..."
+            )
+            pbar.update()
+
+    try:
+        if scripts is None:
+            scripts = (
+                (file, suffix, {}, True)
+                for file, suffix in walk_scripts(root_path, jobs, exclude)
+            )
+        for file, suffix, overrides, record in scripts:
+            if stop_flag.is_set():
+                break
+            found[suffix] += 1
+            if manifest is not None and manifest.is_unchanged(file, jobs[suffix][1]):
+                skipped += 1
+                continue
+            task = asyncio.ensure_future(document_slot(file, suffix, overrides, record))
+            task.add_done_callback(update)
+            tasks.add(task)
+            await asyncio.sleep(0)  # Let the scripts found so far start
+        pbar.total = len(tasks)
+        pbar.refresh()
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        pbar.close()
+    for suffix, n_files in found.items():
+        if not n_files:
+            LOGGER.info(
+                "%s\r⚠ No scripts were found for %s in the folder %s",
+                ANSI_CODE["yellow"],
+                LANGUAGE.get(suffix, suffix),
+                str(root_path),
+            )
+    if not any(found.values()):
+        return None
+    if skipped:
+        LOGGER.info(
+            "%s\r%s scripts unchanged since the last run were skipped.",
+            ANSI_CODE["reset"],
+            skipped,
+        )
+    if stop_flag.is_set():
+        LOGGER.info(
+            "%s\r Terminated by user. Some scripts were not fully documented.",
+            ANSI_CODE["yellow"],
         )
     return True
 
 
-def _apply_to_scripts(
+async def _apply_to_scripts_async(
     root_path,
     function_to_execute,
     extension,
     exclude,
     stop_flag=Event(),
+    max_workers=1,
+    semaphore=None,
+    manifest=None,
+    fingerprint=None,
     *args,
     **kwargs,
 ):
     """
     Applies a specified function to all scripts in a given directory with a specified extension.
 
-    This function searches the provided directory (and its subdirectories) for files that match the given
-    extension. It allows for exclusion of specific files and applies a provided function to each of the
-    found files, handling temporary file creation and cleanup.
+    This is `_apply_by_suffix_async` with a single function, applied to the scripts of one extension.
 
     Args:
         root_path (str): The root directory path where the scripts are located.
         function_to_execute (callable): The function to execute on each found script.
         extension (str): The file extension of the scripts to process.
+        exclude (list): The files or folders to exclude, as gitignore patterns relative to the root directory.
+        stop_flag (Event, optional): A flag to signal cessation of the function execution (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries shared by all the files (default is 1).
+        semaphore (asyncio.Semaphore, optional): A semaphore shared with other calls to limit the number of
+            concurrent queries. If None, a new one of `max_workers` slots is created (default is None).
+        manifest (RunManifest, optional): The run manifest of the project (default is None).
+        fingerprint (str, optional): The fingerprint of the settings, used with the manifest (default is None).
+        *args: Additional positional arguments to be passed to the function.
+        **kwargs: Additional keyword arguments to be passed to the function.
+
+    Returns:
+        (bool): True if the operation was successful, otherwise None.
+    """
+    if args:
+        function_to_execute = functools.partial(function_to_execute, *args)
+    return await _apply_by_suffix_async(
+        root_path,
+        {extension: (function_to_execute, fingerprint, kwargs)},
+        exclude,
+        stop_flag,
+        max_workers,
+        semaphore,
+        manifest,
+    )
+
+
+def _apply_to_scripts(
+    root_path,
+    function_to_execute,
+    extension,
+    exclude,
+    stop_flag=Event(),
+    max_workers=1,
+    *args,
+    **kwargs,
+):
+    """
+    Synchronous wrapper of `_apply_to_scripts_async`, running it in a new event loop.
+
+    Args:
+        root_path (str): The root directory path where the scripts are located.
+        function_to_execute (callable): The function or coroutine function to execute on each found script.
+        extension (str): The file extension of the scripts to process.
         exclude (list): A list of substrings; files containing any of these will be excluded from processing.
         stop_flag (Event, optional): A flag to signal cessation of the function execution (default is Event()).
+        max_workers (int, optional): Maximum number of concurrent queries shared by all the files (default is 1).
         *args: Additional positional arguments to be passed to the function.
         **kwargs: Additional keyword arguments to be passed to the function.
 
     Returns:
         (bool): True if the operation was successful, otherwise None.
     """
-    root_path = Path(root_path).resolve()
-    if root_path.is_dir():
-        files = [py_file.resolve() for py_file in root_path.glob(f"**/*{extension}")]
-        if not files:
-            LOGGER.info(
-                "%s\r⚠ No scripts were found for %s in the folder %s",
-                ANSI_CODE["yellow"],
-                LANGUAGE[extension],
-                str(root_path),
-            )
-            return None
-        files = [
-            file
-            for file in files
-            if not any([str(discard) in str(file) for discard in exclude])
-        ]
-        # Create temporary project
-        temporary_files = []
-        temporary_folders = []
-        for file in files:
-            folder_name = str(file.parent).replace(
-                str(root_path), get_temp_folder() + os.path.sep + str(root_path.name)
-            )
-            ensure_folder_exist(folder_name)
-            temporary_folders.append(folder_name)
-            temporary_files.append(Path(folder_name) / file.name)
-        temporary_folders = list(set(temporary_folders))  # Get unique elements
-        # Copy the files to the temporary dir
-        for f, tf in zip(files, temporary_files):
-            shutil.copyfile(f, tf)
-        pbar = tqdm(
-            temporary_files,
-            desc=f"{ANSI_CODE['reset']}\rStarting to document...",
-            total=len(temporary_files),
-            bar_format=TQDM_BAR_FORMAT,
-        )
-        for c_file in pbar:
-            pbar.set_description(
-                f"{ANSI_CODE['reset']}\rDocumenting script {c_file}..."
-            )
-            function_to_execute(c_file, stop_flag=stop_flag, *args, **kwargs)
-            if stop_flag.is_set():
-                LOGGER.info(
-                    "%s\r Terminated by user. Program was documenting script %s",
-                    ANSI_CODE["yellow"],
-                    str(c_file),
-                )
-                break
-        pbar.close()
-        # Copy the files to the original location and delete the temporary file
-        for f, tf in zip(files, temporary_files):
-            shutil.copyfile(tf, f)
-            os.remove(tf)
-    else:
-        folder_name = str(root_path.parent).replace(
-            str(root_path.parent),
-            get_temp_folder() + os.path.sep + str(root_path.parent.name),
-        )
-        ensure_folder_exist(folder_name)
-        file = Path(folder_name) / root_path.name
-        shutil.copyfile(root_path, file)
-        function_to_execute(file, stop_flag=stop_flag, *args, **kwargs)
-        shutil.copyfile(file, root_path)
-        os.remove(file)
-    return True
+    return asyncio.run(
+        _apply_to_scripts_async(
+            root_path,
+            function_to_execute,
+            extension,
+            exclude,
+            stop_flag,
+            max_workers,
+            None,
+            None,
+            None,
+            *args,
+            **kwargs,
+        )
+    )
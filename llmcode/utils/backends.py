@@ -0,0 +1,293 @@
+"""
+This module provides the registry of completion backends and the backend for local servers.
+
+A completion backend is a function or coroutine function that takes a prompt and returns the
+response of the model. The backend to use is configured by name in
+`completion_params.completion_function`, and it can be a registered backend (such as the
+completion functions of `completion.py`, the local backend or the record/replay backend of
+`cassette.py`), a backend installed by another package under the "llmcode.backends" entry
+point group, or the dotted path of any function (e.g. "my_package.my_module:my_completion").
+
+The local backend sends the queries to any server with an OpenAI-compatible chat completions
+endpoint, such as the servers of llama.cpp, vLLM or Ollama, with its own pool of keep-alive
+connections, which also bounds the number of queries in flight to the server.
+
+Functions:
+    register_backend: Registers a completion backend under a name.
+    resolve_backend: Returns the completion backend for a name, entry point or dotted path.
+    close_sessions: Closes the HTTP sessions of the backends opened in the running event loop.
+    header_trace_config: Returns an aiohttp trace configuration that reports the headers of the responses.
+    get_local_backend: Returns the local backend of the process.
+    get_completion_local_async: Retrieves a completion from an OpenAI-compatible local server.
+
+Classes:
+    BackendError: Raised when a server answers a query with an error.
+    LoopSession: An aiohttp session per event loop with a bounded pool of keep-alive connections.
+    LocalBackend: A client of an OpenAI-compatible chat completions endpoint.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import asyncio
+import importlib
+import llmcode.cfg.custom_params as custom_params
+from .scheduler import report_headers
+
+ENTRY_POINT_GROUP = "llmcode.backends"
+# Imported when a backend is not registered
+BUILTIN_MODULES = ["llmcode.utils.completion", "llmcode.utils.cassette"]
+
+_backends = {}  # Registered backends by name
+_sessions = []  # Sessions to close at the end of a run
+
+
+def register_backend(function=None, name=None):
+    """
+    Registers a completion backend under a name. It can be used as a decorator.
+
+    Args:
+        function (callable, optional): The function or coroutine function that takes a prompt and
+            returns the response of the model (default is None, to be used as a decorator with arguments).
+        name (str, optional): The name of the backend (default is the name of the function).
+
+    Returns:
+        (callable): The function, unchanged.
+    """
+    if function is None:
+        return lambda function: register_backend(function, name)
+    _backends[name or function.__name__] = function
+    return function
+
+
+def resolve_backend(name):
+    """
+    Returns the completion backend for a name.
+
+    The name is looked up in the registered backends (including those of the built-in backend
+    modules, which are imported on demand), then in the backends installed under the
+    "llmcode.backends" entry point group, and finally imported as a dotted path, either as
+    "module:function" or "module.function".
+
+    Args:
+        name (str): The name, entry point or dotted path of the backend.
+
+    Returns:
+        (callable): The function or coroutine function of the backend.
+
+    Raises:
+        ValueError: If no backend is found for the name.
+    """
+    if name not in _backends:
+        for module in BUILTIN_MODULES:
+            importlib.import_module(module)
+    if name in _backends:
+        return _backends[name]
+    from importlib.metadata import entry_points
+
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        if entry_point.name == name:
+            return register_backend(entry_point.load(), name)
+    module_name, _, attribute = name.replace(":", ".").rpartition(".")
+    if module_name:
+        try:
+            return register_backend(
+                getattr(importlib.import_module(module_name), attribute), name
+            )
+        except (ImportError, AttributeError):
+            pass
+    raise ValueError(
+        f"Unknown completion backend {name}. Use one of {', '.join(sorted(_backends))}, "
+        f"a backend of the {ENTRY_POINT_GROUP} entry points or the dotted path of a function."
+    )
+
+
+class BackendError(Exception):
+    """
+    Raised when a server answers a query with an error.
+
+    Attributes:
+        http_status (int): The HTTP status of the response.
+        headers (Mapping): The headers of the response, used to back off if rate limited.
+    """
+
+    def __init__(self, message, http_status, headers):
+        super().__init__(message)
+        self.http_status = http_status
+        self.headers = headers
+
+
+def header_trace_config():
+    """
+    Returns an aiohttp trace configuration that reports the headers of the successful responses of a
+    session to the rate limiter of the completion in progress.
+
+    Returns:
+        (aiohttp.TraceConfig): The trace configuration.
+    """
+    import aiohttp
+
+    async def on_request_end(session, context, params):
+        if params.response.status < 400:
+            report_headers(params.response.headers)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    return trace_config
+
+
+class LoopSession:
+    """
+    An aiohttp session per event loop, with a bounded pool of keep-alive connections.
+
+    The session of an event loop is created on first use, and a new one is created if the code
+    runs in another event loop (e.g. in a new call of a synchronous wrapper). The headers of the
+    successful responses are reported to the rate limiter.
+
+    Attributes:
+        max_connections (int): The maximum number of connections of the pool.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+    """
+
+    def __init__(self, max_connections, keepalive_timeout):
+        """
+        Creates the holder of the sessions, registering it to be closed at the end of the runs.
+
+        Args:
+            max_connections (int): The maximum number of connections of the pool.
+            keepalive_timeout (float): Seconds an idle connection is kept open.
+        """
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self._session = None
+        self._loop = None
+        _sessions.append(self)
+
+    def get(self):
+        """
+        Returns the session of the running event loop, creating it if needed.
+
+        Returns:
+            (aiohttp.ClientSession): The session.
+        """
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._loop is not loop:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.max_connections,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=300,
+                ),
+                trace_configs=[header_trace_config()],
+            )
+            self._loop = loop
+        return self._session
+
+    async def aclose(self):
+        """Closes the session if it was opened in the running event loop."""
+        if self._session is not None and self._loop is asyncio.get_running_loop():
+            await self._session.close()
+            self._session = None
+
+
+async def close_sessions():
+    """Closes the HTTP sessions of the backends opened in the running event loop."""
+    for session in _sessions:
+        await session.aclose()
+
+
+class LocalBackend:
+    """
+    A client of an OpenAI-compatible chat completions endpoint, such as a llama.cpp, vLLM or Ollama server.
+
+    The queries are sent with the parameters of `completion_params` through a pool of keep-alive
+    connections, whose size bounds the number of queries in flight to the server.
+
+    Attributes:
+        base_url (str): The base URL of the API of the server (e.g. "http://localhost:8000/v1").
+        api_key (str | None): The API key of the server, if it requires one.
+        params (dict): The parameters of the completion request.
+        session (LoopSession): The sessions of the connection pool.
+    """
+
+    def __init__(self, base_url, api_key, max_connections, keepalive_timeout):
+        """
+        Creates the backend.
+
+        Args:
+            base_url (str): The base URL of the API of the server.
+            api_key (str | None): The API key of the server, if it requires one.
+            max_connections (int): The maximum number of connections to the server.
+            keepalive_timeout (float): Seconds an idle connection is kept open.
+        """
+        from .completion import _get_params
+
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.params = _get_params()
+        self.session = LoopSession(max_connections, keepalive_timeout)
+        self._headers = {"Authorization": f"Bearer {api_key}"} if api_key else {}
+
+    async def acomplete(self, prompt):
+        """
+        Generates a completion response from the chat completions endpoint of the server.
+
+        Args:
+            prompt (str): The input text that the model will generate a response for.
+
+        Returns:
+            (str): The content of the model's response.
+
+        Raises:
+            BackendError: If the server answers with an error.
+        """
+        async with self.session.get().post(
+            f"{self.base_url}/chat/completions",
+            json={"messages": [{"role": "user", "content": prompt}], **self.params},
+            headers=self._headers,
+        ) as response:
+            if response.status != 200:  # The body of an error may not be JSON
+                raise BackendError(
+                    f"{self.base_url} answered {response.status}: {await response.text()}",
+                    response.status,
+                    response.headers,
+                )
+            body = await response.json(content_type=None)
+        return body["choices"][0]["message"]["content"]
+
+
+_local_backend = None
+
+
+def get_local_backend():
+    """
+    Returns the local backend of the process, creating it on first use from `custom_params`.
+
+    Returns:
+        (LocalBackend): The local backend.
+    """
+    global _local_backend
+    if _local_backend is None:
+        _local_backend = LocalBackend(
+            custom_params.local_base_url,
+            custom_params.local_api_key,
+            custom_params.local_max_connections,
+            custom_params.keepalive_timeout,
+        )
+    return _local_backend
+
+
+@register_backend
+async def get_completion_local_async(prompt):
+    """
+    Generates a completion response from the OpenAI-compatible local server of `custom_params.local_base_url`.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response.
+    """
+    return await get_local_backend().acomplete(prompt)
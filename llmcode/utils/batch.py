@@ -0,0 +1,195 @@
+"""
+This module provides the offline batch mode of the documentation process.
+
+Instead of querying the model interactively, the rendered prompts of all the elements to
+document are written to a JSONL file in the format of the OpenAI Batch API, which is cheaper
+and has a higher throughput. Once the batch is completed, its results file is loaded and
+the responses are applied through the normal documentation process, looking them up by the
+rendered prompt instead of querying the model.
+
+Every request has a stable custom ID made of the relative path of the script, the qualified
+name of the element and a hash of the rendered prompt, so exporting the same tree twice gives
+the same requests, and a response is only applied to an element whose prompt did not change.
+
+Functions:
+    prompt_hash: Computes the hash of a rendered prompt.
+    custom_id: Computes the custom ID of the request of an element.
+    batch_request: Builds a request in the format of the OpenAI Batch API.
+
+Classes:
+    BatchWriter: Writes the requests of the batch to a JSONL file.
+    BatchResults: The responses of a completed batch, used as a completion function.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import hashlib
+import json
+from .completion import CompletionSkippedError, _get_params
+from .logger import LOGGER
+from . import ANSI_CODE
+
+BATCH_URL = "/v1/chat/completions"
+
+
+def prompt_hash(prompt):
+    """
+    Computes the hash of a rendered prompt.
+
+    Args:
+        prompt (str): The rendered prompt.
+
+    Returns:
+        (str): The first 16 hexadecimal digits of the SHA-256 digest of the prompt.
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:16]
+
+
+def custom_id(script, qualname, prompt):
+    """
+    Computes the custom ID of the request of an element.
+
+    Args:
+        script (str): The path to the script, relative to the documented folder.
+        qualname (str): The qualified name of the element.
+        prompt (str): The rendered prompt of the element.
+
+    Returns:
+        (str): The custom ID, as "script:qualname:hash".
+    """
+    return f"{script}:{qualname}:{prompt_hash(prompt)}"
+
+
+def batch_request(request_id, prompt, params):
+    """
+    Builds a request in the format of the OpenAI Batch API.
+
+    Args:
+        request_id (str): The custom ID of the request.
+        prompt (str): The rendered prompt.
+        params (dict): The parameters of the completion, such as the model.
+
+    Returns:
+        (dict): The request, to be written as a line of the batch file.
+    """
+    return {
+        "custom_id": request_id,
+        "method": "POST",
+        "url": BATCH_URL,
+        "body": {"messages": [{"role": "user", "content": prompt}], **params},
+    }
+
+
+class BatchWriter:
+    """
+    Writes the requests of the batch to a JSONL file.
+
+    Elements with the same rendered prompt in several places get the same response, so their
+    prompt is only requested once.
+
+    Attributes:
+        path (str): The path to the JSONL file.
+        requests (int): The number of requests written.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the batch file, replacing it if it exists.
+
+        Args:
+            path (str or Path): The path to the JSONL file.
+        """
+        self.path = path
+        self.requests = 0
+        self._params = _get_params()
+        self._hashes = set()
+        self._file = open(path, "w", encoding="utf-8")
+
+    def add(self, script, qualname, prompt):
+        """
+        Adds the request of an element to the batch.
+
+        Args:
+            script (str): The path to the script, relative to the documented folder.
+            qualname (str): The qualified name of the element.
+            prompt (str): The rendered prompt of the element.
+        """
+        if prompt_hash(prompt) in self._hashes:
+            return
+        self._hashes.add(prompt_hash(prompt))
+        request = batch_request(
+            custom_id(script, qualname, prompt), prompt, self._params
+        )
+        self._file.write(json.dumps(request, ensure_ascii=False) + "\n")
+        self.requests += 1
+
+    def close(self):
+        """Closes the batch file."""
+        self._file.close()
+
+
+class BatchResults:
+    """
+    The responses of a completed batch, used as a completion function.
+
+    Attributes:
+        path (str): The path to the JSONL results file.
+        responses (dict): The content of the successful responses, by prompt hash.
+        errors (int): The number of failed requests in the results file.
+    """
+
+    def __init__(self, path):
+        """
+        Loads the results file of a batch.
+
+        Args:
+            path (str or Path): The path to the JSONL results file, in the format of the OpenAI Batch API.
+        """
+        self.path = path
+        self.responses = {}
+        self.errors = 0
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                try:
+                    if result.get("error") or response.get("status_code", 200) != 200:
+                        raise ValueError(
+                            result.get("error") or response.get("status_code")
+                        )
+                    content = response["body"]["choices"][0]["message"]["content"]
+                except (KeyError, IndexError, TypeError, ValueError):
+                    self.errors += 1
+                    continue
+                self.responses[result["custom_id"].rsplit(":", 1)[-1]] = content
+        if self.errors:
+            LOGGER.info(
+                "%s\r⚠ %s requests of the batch %s failed. Their elements will not be documented.",
+                ANSI_CODE["yellow"],
+                self.errors,
+                path,
+            )
+
+    async def get_completion_batch(self, prompt):
+        """
+        Returns the response of the batch to a rendered prompt.
+
+        Args:
+            prompt (str): The rendered prompt.
+
+        Returns:
+            (str): The content of the response.
+
+        Raises:
+            CompletionSkippedError: If the batch has no response for the prompt, e.g. if the element changed
+                after the export or its request failed, so the element is left untouched.
+        """
+        try:
+            return self.responses[prompt_hash(prompt)]
+        except KeyError:
+            raise CompletionSkippedError(
+                "the batch has no response for this element"
+            ) from None
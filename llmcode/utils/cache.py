@@ -0,0 +1,167 @@
+"""
+This module provides a persistent cache for the completions of the model.
+
+The cache is stored in a SQLite database and is content-addressed: each completion is
+stored under a hash of the fully rendered prompt, the completion function and the
+parameters of the completion. Running the documentation process again on unchanged
+code is then served from the cache. The cache is bounded in size and evicts the least
+recently used completions first.
+
+Classes:
+    CompletionCache: A disk-backed, size-bounded LRU cache of completions.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class CompletionCache:
+    """
+    A disk-backed, size-bounded LRU cache of completions stored in a SQLite database.
+
+    Every entry records the size of the stored completion and the last time it was used. When
+    the total size exceeds `max_size`, the least recently used entries are evicted. The number
+    of hits and misses since the cache was opened is kept in the `hits` and `misses` attributes.
+
+    Attributes:
+        path (Path): The path to the SQLite database.
+        max_size (int): The maximum size of the cache in bytes.
+        hits (int): Number of lookups served from the cache.
+        misses (int): Number of lookups not found in the cache.
+    """
+
+    def __init__(self, path, max_size):
+        """
+        Opens (or creates) the cache database.
+
+        Args:
+            path (str or Path): The path to the SQLite database.
+            max_size (int): The maximum size of the cache in bytes.
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS completions_last_used "
+                "ON completions (last_used)"
+            )
+        self._size = self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()[0]
+
+    @staticmethod
+    def key(prompt, params, completion_function=""):
+        """
+        Computes the key of a completion.
+
+        Args:
+            prompt (str): The fully rendered prompt.
+            params (dict): The parameters of the completion, such as the model.
+            completion_function (str, optional): The name of the completion function (default is "").
+
+        Returns:
+            (str): The hexadecimal SHA-256 digest identifying the completion.
+        """
+        content = json.dumps(
+            {"prompt": prompt, "params": params, "function": completion_function},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached completion for a key, marking it as recently used.
+
+        Args:
+            key (str): The key of the completion.
+
+        Returns:
+            (str | None): The cached completion, or None if it is not in the cache.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            with self._connection:
+                self._connection.execute(
+                    "UPDATE completions SET last_used = ? WHERE key = ?",
+                    (time.time(), key),
+                )
+            return row[0]
+
+    def set(self, key, response):
+        """
+        Stores a completion, evicting the least recently used ones if the cache is full.
+
+        Args:
+            key (str): The key of the completion.
+            response (str): The completion to store.
+        """
+        size = len(key) + len(response.encode("utf-8"))
+        with self._lock, self._connection:
+            previous = self._connection.execute(
+                "SELECT size FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time()),
+            )
+            self._size += size - (previous[0] if previous else 0)
+            if self._size > self.max_size:
+                self._evict()
+
+    def _evict(self):
+        """Deletes the least recently used entries until the cache fits in its maximum size."""
+        evicted = []
+        for key, size in self._connection.execute(
+            "SELECT key, size FROM completions ORDER BY last_used"
+        ):
+            if self._size <= self.max_size:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._connection.executemany("DELETE FROM completions WHERE key = ?", evicted)
+
+    def stats(self):
+        """
+        Returns the statistics of the cache.
+
+        Returns:
+            (dict): The number of hits, misses, stored entries and the size in bytes of the cache.
+        """
+        with self._lock:
+            entries = self._connection.execute(
+                "SELECT COUNT(*) FROM completions"
+            ).fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size": self._size,
+        }
+
+    def close(self):
+        """Closes the connection to the database."""
+        self._connection.close()
@@ -0,0 +1,194 @@
+"""
+This module provides the record/replay completion backend.
+
+A cassette is a JSONL file with the responses of a backend to a set of prompts. In record
+mode, the queries are sent to the recorded backend and its responses are appended to the
+cassette; in replay mode, the responses are read from the cassette, so a run can be repeated
+offline and deterministically. Optionally, a latency and an error rate are simulated for
+every query, which allows to measure the throughput of the scheduler and the pipeline
+without querying a real model.
+
+Functions:
+    get_cassette: Returns the cassette of the process.
+    get_completion_cassette_async: Retrieves a completion from the cassette of the process.
+
+Classes:
+    Cassette: Records the responses of a backend and replays them.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import random
+from pathlib import Path
+import llmcode.cfg.custom_params as custom_params
+from .backends import BackendError, register_backend, resolve_backend
+
+
+class Cassette:
+    """
+    Records the responses of a backend to a JSONL file and replays them.
+
+    Attributes:
+        path (Path): The path to the cassette file.
+        mode (str): "record" to query the backend and store its responses, or "replay" to read them.
+        backend (str): The name, entry point or dotted path of the recorded backend.
+        latency (float | tuple | callable | None): The simulated latency of every query: a number of
+            seconds, a (min, max) range of a uniform distribution, a function that takes a
+            `random.Random` and returns the seconds, or None for no latency.
+        error_rate (float): The probability of a query failing with a simulated error.
+        error_status (int): The HTTP status of the simulated errors.
+        responses (dict): The recorded responses by prompt hash.
+    """
+
+    def __init__(
+        self,
+        path,
+        mode="replay",
+        backend=None,
+        latency=None,
+        error_rate=0,
+        error_status=429,
+        seed=None,
+    ):
+        """
+        Opens a cassette, loading its recorded responses.
+
+        Args:
+            path (str or Path): The path to the cassette file.
+            mode (str, optional): "record" or "replay" (default is "replay").
+            backend (str, optional): The name, entry point or dotted path of the backend to record
+                (default is None, only valid in replay mode).
+            latency (float | tuple | callable, optional): The simulated latency of every query (default is None).
+            error_rate (float, optional): The probability of a simulated error (default is 0).
+            error_status (int, optional): The HTTP status of the simulated errors (default is 429).
+            seed (int, optional): The seed of the simulated latencies and errors (default is None).
+
+        Raises:
+            ValueError: If the mode is not valid or no backend is given to record.
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode {mode}. Use record or replay.")
+        if mode == "record" and backend is None:
+            raise ValueError("A backend is required to record a cassette.")
+        self.path = Path(path)
+        self.mode = mode
+        self.backend = backend
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.responses = {}
+        self._random = random.Random(seed)
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["key"]] = record["response"]
+
+    @staticmethod
+    def key(prompt):
+        """
+        Computes the key of a prompt in the cassette.
+
+        Args:
+            prompt (str): The rendered prompt.
+
+        Returns:
+            (str): The hexadecimal SHA-256 digest of the prompt.
+        """
+        return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+    def _delay(self):
+        """Returns the simulated latency of a query, in seconds."""
+        if self.latency is None:
+            return 0
+        if callable(self.latency):
+            return self.latency(self._random)
+        if isinstance(self.latency, (tuple, list)):
+            return self._random.uniform(*self.latency)
+        return self.latency
+
+    async def complete(self, prompt):
+        """
+        Returns the response to a prompt, recording or replaying it.
+
+        Args:
+            prompt (str): The rendered prompt.
+
+        Returns:
+            (str): The response.
+
+        Raises:
+            BackendError: If a simulated error occurs.
+            KeyError: If the prompt is not in the cassette in replay mode.
+        """
+        delay = self._delay()
+        failed = self._random.random() < self.error_rate
+        if delay:
+            await asyncio.sleep(delay)
+        if failed:
+            raise BackendError("Simulated error", self.error_status, {})
+        key = self.key(prompt)
+        if self.mode == "replay":
+            try:
+                return self.responses[key]
+            except KeyError:
+                raise KeyError(f"the prompt is not recorded in {self.path}") from None
+        backend = resolve_backend(self.backend)
+        if inspect.iscoroutinefunction(backend):
+            response = await backend(prompt)
+        else:
+            response = await asyncio.to_thread(backend, prompt)
+        if response is not None:
+            self.responses[key] = response
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(
+                    json.dumps(
+                        {"key": key, "prompt": prompt, "response": response},
+                        ensure_ascii=False,
+                    )
+                    + "\n"
+                )
+        return response
+
+
+_cassette = None
+
+
+def get_cassette():
+    """
+    Returns the cassette of the process, opening it on first use from `custom_params`.
+
+    Returns:
+        (Cassette): The cassette.
+    """
+    global _cassette
+    if _cassette is None:
+        _cassette = Cassette(
+            custom_params.cassette_path,
+            custom_params.cassette_mode,
+            custom_params.cassette_backend,
+            custom_params.cassette_latency,
+            custom_params.cassette_error_rate,
+            seed=custom_params.cassette_seed,
+        )
+    return _cassette
+
+
+@register_backend
+async def get_completion_cassette_async(prompt):
+    """
+    Generates a completion response from the cassette of `custom_params.cassette_path`.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The recorded (or, in record mode, the newly recorded) response.
+    """
+    return await get_cassette().complete(prompt)
@@ -2,30 +2,221 @@
 This module handles the completion functionality using an LLM API.
 
 It provides functions to execute tasks with a timeout and to obtain completions
-from LLM APIs based on specified parameters.
+from LLM APIs based on specified parameters. Completion functions can be either
+regular functions or coroutine functions; the asynchronous ones let many queries
+be in flight at the same time from a single event loop. The completion functions of
+this module are registered as backends, and the one to use is resolved through the
+backend registry the first time it is needed. The OpenAI library is only imported by the
+functions that send requests, so importing this module stays fast.
+
+Classes:
+    CompletionExecutor: A reusable executor with bounded workers and cancellable requests.
+    CompletionCancelledError: Raised when an in-flight completion is cancelled.
+    CompletionSkippedError: Raised by a completion function that has no completion for a prompt.
+    OpenAIClient: A long-lived client of the OpenAI API with keep-alive connection pools.
 
 Functions:
+    get_executor: Returns the completion executor of the process.
+    cancel_on_stop: Awaits an awaitable, cancelling the requests in flight when stopped.
     run_with_timeout: Executes a function with a specified timeout.
+    run_with_timeout_async: Awaits a function or coroutine function with a specified timeout.
     get_completion_openai: Retrieves a completion from the OpenAI API using a prompt.
+    get_completion_openai_async: Retrieves a completion from the OpenAI API using the async client.
+    get_completion_openai_stream: Streams a completion from the OpenAI API until the docstring is complete.
+    get_completion_openai_stream_async: Streams a completion using the async client until the docstring is complete.
+    get_client: Returns the OpenAI client of the process.
+    close_client: Closes the connections of the clients of the backends opened in the running event loop.
+    closing_client: Awaits an awaitable and then closes the connections of the OpenAI client.
+    get_completion_openai_client: Retrieves a completion through the OpenAI client of the process.
+    get_completion_openai_client_async: Retrieves a completion through the OpenAI client of the process, asynchronously.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
 """
 
-import threading
-import openai
+import asyncio
+import contextlib
+import contextvars
+import functools
+import inspect
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import llmcode.cfg.completion_params as completion_params
+import llmcode.cfg.custom_params as custom_params
 from . import ANSI_CODE
 from .logger import LOGGER
+from .metrics import get_metrics
+from .scheduler import report_headers, reporting_headers
+from .backends import (
+    LoopSession,
+    close_sessions,
+    header_trace_config,
+    register_backend,
+    resolve_backend,
+)
+
+
+class CompletionCancelledError(Exception):
+    """Raised when an in-flight completion is cancelled by the stop flag."""
+
+
+class CompletionSkippedError(Exception):
+    """Raised by a completion function that has no completion for a prompt, so its element is left untouched."""
+
+
+class CompletionExecutor:
+    """
+    A reusable executor for the completion requests of the whole process.
+
+    Regular completion functions run in a single thread pool with a bounded number of workers,
+    instead of a new thread per request, and coroutine functions run in the event loop. Every
+    request has a deadline; the asynchronous requests in flight are tracked so that all of them
+    can be cancelled at once when the stop flag is set, and the pending requests of the thread
+    pool are cancelled before they start.
+
+    Attributes:
+        max_threads (int): The maximum number of worker threads.
+    """
+
+    def __init__(self, max_threads):
+        """
+        Creates the executor.
+
+        Args:
+            max_threads (int): The maximum number of worker threads.
+        """
+        self.max_threads = max_threads
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_threads, thread_name_prefix="llmcode-completion"
+        )
+        self._tasks = set()
+
+    def run(self, target_function, args=(), kwargs={}, timeout=30):
+        """
+        Runs a function in the thread pool and waits for its result.
+
+        Args:
+            target_function (callable): The function to execute.
+            args (tuple, optional): Positional arguments for the function (default is empty tuple).
+            kwargs (dict, optional): Keyword arguments for the function (default is empty dictionary).
+            timeout (float, optional): The deadline of the request in seconds (default is 30).
+
+        Returns:
+            (any): The result of the function.
+
+        Raises:
+            TimeoutError: If the function does not finish before the deadline.
+        """
+        future = self._pool.submit(
+            contextvars.copy_context().run, target_function, *args, **kwargs
+        )
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()  # Do not start it if it is still waiting for a worker
+            raise TimeoutError from None
+
+    async def submit(self, target_function, args=(), kwargs={}, timeout=30):
+        """
+        Awaits a function or coroutine function with a deadline, as a cancellable request.
+
+        Args:
+            target_function (callable): The function or coroutine function to execute.
+            args (tuple, optional): Positional arguments for the function (default is empty tuple).
+            kwargs (dict, optional): Keyword arguments for the function (default is empty dictionary).
+            timeout (float, optional): The deadline of the request in seconds (default is 30).
+
+        Returns:
+            (any): The result of the function.
+
+        Raises:
+            TimeoutError: If the function does not finish before the deadline.
+            CompletionCancelledError: If the request is cancelled by `cancel`.
+        """
+        if inspect.iscoroutinefunction(target_function):
+            awaitable = target_function(*args, **kwargs)
+        else:
+            awaitable = asyncio.get_running_loop().run_in_executor(
+                self._pool,
+                functools.partial(
+                    contextvars.copy_context().run, target_function, *args, **kwargs
+                ),
+            )
+        task = asyncio.ensure_future(asyncio.wait_for(awaitable, timeout))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        try:
+            await asyncio.wait({task})
+        except asyncio.CancelledError:  # The caller was cancelled
+            task.cancel()
+            raise
+        if task.cancelled():
+            raise CompletionCancelledError
+        try:
+            return task.result()
+        except asyncio.TimeoutError:
+            raise TimeoutError from None
+
+    def cancel(self):
+        """Cancels all the asynchronous requests in flight. It must be called from the event loop."""
+        for task in list(self._tasks):
+            task.cancel()
+
+    async def watch(self, stop_flag, interval=0.1):
+        """
+        Cancels the requests in flight as soon as the stop flag is set.
+
+        Args:
+            stop_flag (Event): The flag that signals to stop, set on SIGINT.
+            interval (float, optional): Seconds between checks of the flag (default is 0.1).
+        """
+        while not stop_flag.is_set():
+            await asyncio.sleep(interval)
+        self.cancel()
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Returns the completion executor of the process, creating it on first use.
+
+    Returns:
+        (CompletionExecutor): The executor, with at most custom_params.max_completion_threads workers.
+    """
+    global _executor
+    if _executor is None:
+        _executor = CompletionExecutor(custom_params.max_completion_threads)
+    return _executor
+
+
+async def cancel_on_stop(awaitable, stop_flag):
+    """
+    Awaits an awaitable, cancelling the completion requests in flight if the stop flag is set.
+
+    Args:
+        awaitable (Awaitable): The awaitable to run, such as the documentation of some scripts.
+        stop_flag (Event): The flag that signals to stop, set on SIGINT.
+
+    Returns:
+        (any): The result of the awaitable.
+    """
+    watcher = asyncio.ensure_future(get_executor().watch(stop_flag))
+    try:
+        return await awaitable
+    finally:
+        watcher.cancel()
 
 
 def run_with_timeout(target_function, args=(), kwargs={}, timeout=30):
     """
     Runs a target function with specified arguments and keyword arguments within a given timeout.
 
-    This function uses a separate thread to execute the target_function with the provided args and kwargs.
-    If the function completes within the timeout period, its result is returned. If it exceeds the timeout,
-    or if an exception occurs during execution, the function will log an informative message and return None.
+    This function executes the target_function in the worker threads of the completion executor, so
+    no thread is created per call and the number of live workers is bounded. If the function completes
+    within the timeout period, its result is returned. If it exceeds the timeout, or if an exception
+    occurs during execution, the function will log an informative message and return None.
 
     Args:
         target_function (callable): The function to execute.
@@ -36,38 +227,193 @@ def run_with_timeout(target_function, args=(), kwargs={}, timeout=30):
     Returns:
         (any | None): The result of the target_function if it completes successfully; None if it times out or raises an exception.
     """
-    result = [None]  # A mutable container to store the function result
-    exception = [None]  # A container to capture exceptions
+    metrics = get_metrics()
+    try:
+        result = get_executor().run(target_function, args, kwargs, timeout)
+        metrics.increment("completions", outcome="ok")
+        return result
+    except TimeoutError:
+        metrics.increment("completions", outcome="timeout")
+        LOGGER.info(
+            "%s⚠ The completion could not be done. %s response lasted more than %s seconds, which is the limit.",
+            ANSI_CODE["yellow"],
+            target_function.__name__,
+            timeout,
+        )
+    except Exception as e:
+        metrics.increment("completions", outcome="error")
+        LOGGER.info(
+            "%s⚠ The completion could not be done. %s raised the exception %s",
+            ANSI_CODE["yellow"],
+            target_function.__name__,
+            e,
+        )
+    return None
 
-    def target_wrapper():
-        try:
-            result[0] = target_function(*args, **kwargs)
-        except Exception as e:
-            exception[0] = e
-
-    thread = threading.Thread(target=target_wrapper)
-    thread.start()
-    thread.join(timeout)
-    if thread.is_alive():
+
+async def run_with_timeout_async(
+    target_function, args=(), kwargs={}, timeout=30, rate_limiter=None, tokens=0
+):
+    """
+    Awaits a target function with specified arguments and keyword arguments within a given timeout.
+
+    Coroutine functions are awaited directly in the running event loop, while regular functions are
+    run in the worker threads of the completion executor so that they do not block the loop. If the
+    function completes within the timeout period, its result is returned. If it exceeds the timeout,
+    is cancelled by the stop flag, or if an exception occurs during execution, the function will log
+    an informative message and return None, but the `CompletionSkippedError` of the function is
+    raised so that the caller leaves its element untouched. If a rate limiter is provided, the call
+    waits for its budget, the calls that fail because of the rate limits are retried after a
+    backoff, and the rate-limit headers of the successful responses reported by the backends
+    update its budget.
+
+    Args:
+        target_function (callable): The function or coroutine function to execute.
+        args (tuple, optional): Positional arguments to pass to the target_function (default is empty tuple).
+        kwargs (dict, optional): Keyword arguments to pass to the target_function (default is empty dictionary).
+        timeout (int, optional): The time in seconds to wait for the function execution before timing out (default is 30).
+        rate_limiter (RateLimiter, optional): Admits the calls within the rate limits (default is None).
+        tokens (int, optional): The estimated number of tokens of the call, for the rate limiter (default is 0).
+
+    Returns:
+        (any | None): The result of the target_function if it completes successfully; None if it times out or raises an exception.
+
+    Raises:
+        CompletionSkippedError: If the target_function has no completion for its arguments.
+    """
+    executor = get_executor()
+    metrics = get_metrics()
+    attempt = 0
+    try:
+        while True:
+            delay = rate_limiter.reserve(tokens) if rate_limiter is not None else 0
+            if delay > 0:  # Cancellable wait for the budget
+                await executor.submit(asyncio.sleep, (delay,), timeout=delay + 1)
+            try:
+                with reporting_headers(
+                    rate_limiter.update if rate_limiter is not None else None
+                ):
+                    result = await executor.submit(
+                        target_function, args, kwargs, timeout
+                    )
+                metrics.increment("completions", outcome="ok")
+                return result
+            except (TimeoutError, CompletionCancelledError, CompletionSkippedError):
+                raise
+            except Exception as e:
+                if (
+                    rate_limiter is None
+                    or attempt >= rate_limiter.max_retries
+                    or not rate_limiter.is_retryable(e)
+                ):
+                    raise
+                delay = rate_limiter.backoff(e, attempt)  # Pauses all the requests
+                LOGGER.info(
+                    "%s⚠ %s was rate limited (%s). Retrying in %.1f seconds...",
+                    ANSI_CODE["yellow"],
+                    target_function.__name__,
+                    e,
+                    delay,
+                )
+                metrics.increment("retries")
+                attempt += 1
+    except TimeoutError:
+        metrics.increment("completions", outcome="timeout")
         LOGGER.info(
             "%s⚠ The completion could not be done. %s response lasted more than %s seconds, which is the limit.",
             ANSI_CODE["yellow"],
             target_function.__name__,
             timeout,
         )
-        return None
-    if exception[0]:
+    except CompletionCancelledError:
+        metrics.increment("completions", outcome="cancelled")
+        LOGGER.info(
+            "%s⚠ The completion could not be done. %s was cancelled by the user.",
+            ANSI_CODE["yellow"],
+            target_function.__name__,
+        )
+    except CompletionSkippedError:
+        metrics.increment("completions", outcome="skipped")
+        raise
+    except Exception as e:
+        metrics.increment("completions", outcome="error")
         LOGGER.info(
             "%s⚠ The completion could not be done. %s raised the exception %s",
             ANSI_CODE["yellow"],
             target_function.__name__,
-            exception[0],
+            e,
         )
-        return None
-    return result[0]
+    return None
+
+
+def _get_params():
+    """
+    Returns the parameters for the completion request defined in `completion_params`.
+
+    Returns:
+        (dict): The public attributes of the `completion_params` module, but the name of the
+            completion function.
+    """
+    return {
+        key: value
+        for key, value in vars(completion_params).items()
+        if not key.startswith("__") and key != "completion_function"
+    }
+
+
+def _report_response(response, *args, **kwargs):
+    """Reports the headers of a successful response of a requests session to the rate limiter."""
+    if response.ok:
+        report_headers(response.headers)
+
+
+def _reporting_requests_session():
+    """
+    Creates a requests session for the OpenAI library that reports the headers of its responses.
+
+    Returns:
+        (requests.Session): The session.
+    """
+    import requests
+
+    session = requests.Session()
+    session.mount("https://", requests.adapters.HTTPAdapter(max_retries=2))
+    session.hooks["response"].append(_report_response)
+    return session
+
+
+def _install_requests_session():
+    """Makes the synchronous requests of the OpenAI library report their headers, unless a session is set."""
+    import openai
+
+    if not openai.requestssession:
+        openai.requestssession = (
+            _reporting_requests_session  # A session per worker thread
+        )
+
+
+@contextlib.asynccontextmanager
+async def _reporting_aiosession():
+    """
+    Sends the asynchronous requests of the OpenAI library made in the block of an `async with` statement
+    through a session that reports the headers of their responses, unless a session is already set.
+    """
+    import aiohttp
+    import openai
+
+    if openai.aiosession.get() is not None:
+        yield
+        return
+    async with aiohttp.ClientSession(trace_configs=[header_trace_config()]) as session:
+        token = openai.aiosession.set(session)
+        try:
+            yield
+        finally:
+            openai.aiosession.reset(token)
 
 
 # Completion using openai API
+@register_backend
 def get_completion_openai(prompt):
     """
     Generates a completion response from OpenAI's Chat API based on the provided prompt.
@@ -75,7 +421,8 @@ def get_completion_openai(prompt):
     This function takes a user-defined prompt and sends it to the OpenAI completion model,
     returning the content of the model's response. Additional parameters for the completion
     can be passed using the `completion_params` object, which is filtered to exclude any
-    private attributes.
+    private attributes. The HTTP request is given the completion timeout as its deadline, so
+    it does not outlive the query.
 
     Args:
         prompt (str): The input text that the model will generate a response for.
@@ -83,19 +430,322 @@ def get_completion_openai(prompt):
     Returns:
         (str): The content of the model's response.
     """
-    params = {
-        key: value
-        for key, value in vars(completion_params).items()
-        if not key.startswith("__")
-    }
+    import openai
+
+    _install_requests_session()
     return (
         openai.ChatCompletion.create(
-            messages=[{"role": "user", "content": prompt}], **params
+            messages=[{"role": "user", "content": prompt}],
+            request_timeout=custom_params.completion_timeout,
+            **_get_params(),
         )
         .choices[0]
         .message.content
     )
 
 
-# The completion function to use
-get_completion = globals()[vars(completion_params).pop("completion_function")]
+@register_backend
+async def get_completion_openai_async(prompt):
+    """
+    Generates a completion response from OpenAI's Chat API without blocking the event loop.
+
+    This is the asynchronous counterpart of `get_completion_openai`. It sends the prompt through
+    the async OpenAI client, so many requests can be awaited concurrently from a single thread.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response.
+    """
+    import openai
+
+    async with _reporting_aiosession():
+        response = await openai.ChatCompletion.acreate(
+            messages=[{"role": "user", "content": prompt}],
+            request_timeout=custom_params.completion_timeout,
+            **_get_params(),
+        )
+    return response.choices[0].message.content
+
+
+def _docstring_end(text, start=0):
+    """
+    Finds the end of the first docstring of a response.
+
+    Args:
+        text (str): The response received so far.
+        start (int, optional): The offset from which the closing delimiter is searched, to avoid
+            searching the whole response for every chunk (default is 0).
+
+    Returns:
+        (int | None): The offset after the closing triple quotes, or None if the docstring is not complete.
+    """
+    opening = text.find('"""')
+    if opening == -1:
+        return None
+    closing = text.find('"""', max(opening + 3, start))
+    return None if closing == -1 else closing + 3
+
+
+def _stream_chunk(chunk):
+    """Returns the content of a chunk of a streamed chat completion."""
+    return chunk.choices[0].delta.get("content") or "" if chunk.choices else ""
+
+
+# Completion using openai API, streaming the response
+@register_backend
+def get_completion_openai_stream(prompt):
+    """
+    Generates a completion response from OpenAI's Chat API, streaming it until the docstring is complete.
+
+    The response is read chunk by chunk, and the stream is closed as soon as the closing triple quotes of
+    the docstring arrive, so the text that the model may write after the docstring is neither waited for
+    nor generated. The received text is logged incrementally at the debug level.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response, up to the end of the docstring.
+    """
+    import openai
+
+    _install_requests_session()
+    response = openai.ChatCompletion.create(
+        messages=[{"role": "user", "content": prompt}],
+        request_timeout=custom_params.completion_timeout,
+        stream=True,
+        **_get_params(),
+    )
+    text = ""
+    try:
+        for chunk in response:
+            content = _stream_chunk(chunk)
+            LOGGER.debug(content)
+            end = _docstring_end(text + content, len(text) - 2)
+            text += content
+            if end is not None:
+                return text[:end]
+    finally:
+        response.close()
+    return text
+
+
+@register_backend
+async def get_completion_openai_stream_async(prompt):
+    """
+    Asynchronous counterpart of `get_completion_openai_stream`.
+
+    The response is streamed through the async OpenAI client and the stream is closed as soon as the
+    closing triple quotes of the docstring arrive.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response, up to the end of the docstring.
+    """
+    import openai
+
+    async with _reporting_aiosession():
+        response = await openai.ChatCompletion.acreate(
+            messages=[{"role": "user", "content": prompt}],
+            request_timeout=custom_params.completion_timeout,
+            stream=True,
+            **_get_params(),
+        )
+        text = ""
+        try:
+            async for chunk in response:
+                content = _stream_chunk(chunk)
+                LOGGER.debug(content)
+                end = _docstring_end(text + content, len(text) - 2)
+                text += content
+                if end is not None:
+                    return text[:end]
+        finally:
+            await response.aclose()
+    return text
+
+
+class OpenAIClient:
+    """
+    A long-lived client of the OpenAI API, created once per process.
+
+    The client keeps a pool of keep-alive connections for the synchronous requests (a `requests`
+    session) and another one for the asynchronous requests (an `aiohttp` session per event loop),
+    so the TCP connections and TLS sessions are reused among the queries instead of being set up
+    for each one. The parameters of the completion are computed once when the client is created.
+
+    Attributes:
+        params (Mapping): The frozen parameters of the completion request.
+        session (requests.Session): The session of the synchronous requests.
+        aiosession (LoopSession): The sessions of the asynchronous requests.
+        max_connections (int): The maximum number of connections of each pool.
+        keepalive_timeout (float): Seconds an idle connection is kept open.
+    """
+
+    def __init__(self, max_connections, keepalive_timeout):
+        """
+        Creates the client, installing its session for the synchronous requests of the OpenAI library.
+
+        Args:
+            max_connections (int): The maximum number of connections of each pool.
+            keepalive_timeout (float): Seconds an idle connection is kept open.
+        """
+        import openai
+        import requests
+
+        self.params = MappingProxyType(_get_params())
+        self.max_connections = max_connections
+        self.keepalive_timeout = keepalive_timeout
+        self.session = requests.Session()
+        self.session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=1, pool_maxsize=max_connections, max_retries=2
+            ),
+        )
+        self.session.hooks["response"].append(_report_response)
+        openai.requestssession = self.session
+        self.aiosession = LoopSession(max_connections, keepalive_timeout)
+
+    def complete(self, prompt):
+        """
+        Generates a completion response from OpenAI's Chat API.
+
+        Args:
+            prompt (str): The input text that the model will generate a response for.
+
+        Returns:
+            (str): The content of the model's response.
+        """
+        import openai
+
+        return (
+            openai.ChatCompletion.create(
+                messages=[{"role": "user", "content": prompt}],
+                request_timeout=custom_params.completion_timeout,
+                **self.params,
+            )
+            .choices[0]
+            .message.content
+        )
+
+    async def acomplete(self, prompt):
+        """
+        Generates a completion response from OpenAI's Chat API without blocking the event loop.
+
+        Args:
+            prompt (str): The input text that the model will generate a response for.
+
+        Returns:
+            (str): The content of the model's response.
+        """
+        import openai
+
+        token = openai.aiosession.set(self.aiosession.get())
+        try:
+            response = await openai.ChatCompletion.acreate(
+                messages=[{"role": "user", "content": prompt}],
+                request_timeout=custom_params.completion_timeout,
+                **self.params,
+            )
+        finally:
+            openai.aiosession.reset(token)
+        return response.choices[0].message.content
+
+
+_client = None
+
+
+def get_client():
+    """
+    Returns the OpenAI client of the process, creating it on first use.
+
+    Returns:
+        (OpenAIClient): The client, with the pool settings of `custom_params`.
+    """
+    global _client
+    if _client is None:
+        _client = OpenAIClient(
+            custom_params.max_connections, custom_params.keepalive_timeout
+        )
+    return _client
+
+
+async def close_client():
+    """Closes the connections of the OpenAI client and the other backends opened in the running event loop."""
+    await close_sessions()
+
+
+async def closing_client(awaitable):
+    """
+    Awaits an awaitable and then closes the connections of the OpenAI client opened in the running event loop.
+
+    Args:
+        awaitable (Awaitable): The awaitable to run, such as the documentation of a script.
+
+    Returns:
+        (any): The result of the awaitable.
+    """
+    try:
+        return await awaitable
+    finally:
+        await close_client()
+
+
+# Completion using a reusable openai client
+@register_backend
+def get_completion_openai_client(prompt):
+    """
+    Generates a completion response from OpenAI's Chat API through the client of the process.
+
+    Unlike `get_completion_openai`, the connections are kept alive and reused among the requests and
+    the parameters of the completion are not computed for every request.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response.
+    """
+    return get_client().complete(prompt)
+
+
+@register_backend
+async def get_completion_openai_client_async(prompt):
+    """
+    Asynchronous counterpart of `get_completion_openai_client`.
+
+    Args:
+        prompt (str): The input text that the model will generate a response for.
+
+    Returns:
+        (str): The content of the model's response.
+    """
+    return await get_client().acomplete(prompt)
+
+
+def __getattr__(name):
+    """
+    Resolves the completion function to use, `get_completion`, the first time it is accessed.
+
+    The backend is resolved on demand, so importing this module neither looks up the entry points
+    nor imports the module of a custom backend until a completion is actually needed.
+
+    Args:
+        name (str): The name of the attribute.
+
+    Returns:
+        (callable): The configured completion function, if the name is "get_completion".
+
+    Raises:
+        AttributeError: If the module has no attribute with the name.
+    """
+    if name == "get_completion":
+        function = resolve_backend(completion_params.completion_function)
+        globals()["get_completion"] = function
+        return function
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,189 +2,727 @@
 This module provides functionality for documenting Python scripts.
 
 It includes functions to parse Python scripts, extract classes and functions,
-and generate or update docstrings using a completion model.
+and generate or update docstrings using a completion model. The documentation
+pipeline is asynchronous, so many queries can be in flight at the same time
+without a thread per query; synchronous wrappers are provided for convenience.
 
 Functions:
-    doc_element: Generates a docstring for a given element using a completion model.
-    doc_python_file: Documents a Python file by generating or updating docstrings for its elements.
+    doc_element_async: Generates a docstring for a given element using a completion model.
+    doc_element: Synchronous wrapper of doc_element_async.
+    doc_python_file_async: Documents a Python file by generating or updating docstrings for its elements.
+    doc_python_file: Synchronous wrapper of doc_python_file_async.
+    render_python_file_prompts: Renders the prompts of the elements of a Python file without querying the model.
+    _parse_docstring: Parses the docstring of an element from the response of the model.
+    _select_elements: Selects the elements of a script to be documented.
+    _insertion_edit: Builds the edit that inserts a line at the beginning of the body of an element.
+    _docstring_edit: Builds the edit that sets the docstring of an element.
+    _body_indent: Returns the indentation of the body of an element.
+    _pack_elements: Groups the small functions of a script into packs.
+    _split_packed_response: Splits the response to a packed query into the docstrings of its elements.
+    _format_docstring: Formats the content of a docstring with the indentation of its element.
+    _query_packed_async: Queries the completion model for several elements, packing the small functions.
+    _query_elements_async: Queries the completion model for several elements with bounded concurrency.
 
 Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
 """
 
 import re
+import json
+import time
+import asyncio
+import inspect
+import contextlib
+from collections import Counter
 from threading import Event
 import llmcode.cfg.custom_params as custom_params
-from .file_utils import (
-    extract_functions_and_classes_from_python_tokens,
-    parse_python,
-    read_content,
+import llmcode.cfg.completion_params as completion_params
+from .file_utils import apply_edits, iter_python_elements, read_python, write_atomic
+from .prompt import get_prompt_template
+from .scheduler import get_rate_limiter
+from .tokens import count_tokens, minimize_python
+from .completion import (
+    CompletionSkippedError,
+    run_with_timeout_async,
+    cancel_on_stop,
+    closing_client,
+    _get_params,
 )
-from .completion import run_with_timeout, get_completion
-from . import ANSI_CODE
+from . import ANSI_CODE, completion
 from .logger import LOGGER
+from .metrics import get_metrics
 
 
-def doc_element(element, prompt, get_completion):
+def _parse_docstring(response):
+    """
+    Parses the docstring of an element from the response of the model.
+
+    Args:
+        response (str | None): The response of the model.
+
+    Returns:
+        (str | None): The content of the first triple-quoted block of the response, or None if there
+            is no such block or it is empty.
+    """
+    docstring = (
+        re.search(r'"""(.*?)"""', response, re.DOTALL)
+        if isinstance(response, str)
+        else None
+    )
+    return docstring.group(1) if docstring and docstring.group(1).strip() else None
+
+
+async def doc_element_async(
+    element,
+    prompt,
+    get_completion,
+    semaphore=None,
+    cache=None,
+    element_type=None,
+    parse=_parse_docstring,
+):
     """
     Processes a specific element by generating a completion based on a provided prompt.
 
-    This function utilizes a completion generator, replaces a specific key in the prompt with
-    the given element, and executes the generation process within a specified timeout limit.
+    This function utilizes a completion generator, renders the cached template of the prompt with
+    the given element, and awaits the generation process within a specified timeout limit. If a
+    semaphore is provided, the query waits for a free slot before being sent. If a cache is
+    provided, it is consulted first with the rendered prompt and the completion parameters, and
+    the completions that parse into usable docstrings are stored in it. The queries are admitted
+    by the rate limiter of the process, and the rate-limited ones are retried. The time spent
+    rendering the prompt and waiting for the completion is recorded in the metrics of the process.
 
     Args:
         element (str): The specific element to be processed and substituted in the prompt.
         prompt (str): The prompt template that includes a placeholder for the element.
-        get_completion (callable): A function responsible for generating the completion based
-            on the modified prompt.
+        get_completion (callable): A function or coroutine function responsible for generating
+            the completion based on the modified prompt.
+        semaphore (asyncio.Semaphore, optional): Limits the number of concurrent queries (default is None).
+        cache (CompletionCache, optional): A persistent cache of completions (default is None).
+        element_type (str, optional): The type of the element, to label its metrics (default is None).
+        parse (callable, optional): Parses the docstrings of the completion; the completions it parses
+            into an empty result are not cached (default is _parse_docstring).
 
     Returns:
         (any): The result of the completion generation, which can vary depending on the
         implementation of the get_completion function.
+
+    Raises:
+        CompletionSkippedError: If get_completion has no completion for the prompt.
     """
-    return run_with_timeout(
-        get_completion,
-        args=(
-            read_content(prompt).replace(custom_params.query_completion_key, element),
-        ),
-        timeout=custom_params.completion_timeout,
+    metrics = get_metrics()
+    labels = {"element_type": element_type} if element_type else {}
+    with metrics.timer("render", **labels):
+        prompt = get_prompt_template(prompt).render(element)
+    if cache is not None:
+        key = cache.key(prompt, _get_params(), get_completion.__name__)
+        result = cache.get(key)
+        metrics.increment("cache", result="miss" if result is None else "hit")
+        if result is not None:
+            return result
+    async with semaphore or contextlib.nullcontext():
+        with metrics.timer("completion", **labels):
+            result = await run_with_timeout_async(
+                get_completion,
+                args=(prompt,),
+                timeout=custom_params.completion_timeout,
+                rate_limiter=get_rate_limiter(),
+                tokens=count_tokens(prompt)
+                + getattr(completion_params, "max_tokens", 0),
+            )
+    if cache is not None and parse(result):  # Unusable answers are not replayed
+        cache.set(key, result)
+    return result
+
+
+def doc_element(element, prompt, get_completion):
+    """
+    Synchronous wrapper of `doc_element_async`.
+
+    Args:
+        element (str): The specific element to be processed and substituted in the prompt.
+        prompt (str): The prompt template that includes a placeholder for the element.
+        get_completion (callable): A function or coroutine function responsible for generating
+            the completion based on the modified prompt.
+
+    Returns:
+        (any): The result of the completion generation, which can vary depending on the
+        implementation of the get_completion function.
+
+    Raises:
+        CompletionSkippedError: If get_completion has no completion for the prompt.
+    """
+    return asyncio.run(
+        closing_client(doc_element_async(element, prompt, get_completion))
     )
 
 
-def doc_python_file(
+def _insertion_edit(source, span, text):
+    """
+    Builds the edit that inserts a line of text at the beginning of the body of an element.
+
+    The text is inserted with the indentation of the body. If the body is in the same line as
+    the definition (e.g. "def f(): return 1"), it is moved to a new line after the text.
+
+    Args:
+        source (str): The source code of the script.
+        span (ElementSpan): The span of the element.
+        text (str): The text to insert, such as a docstring or a comment.
+
+    Returns:
+        (tuple): The (start, end, replacement) edit.
+    """
+    indent = _body_indent(source, span)
+    line_start = source.rfind("\n", 0, span.body_start) + 1
+    if not source[line_start : span.body_start].strip():
+        return (span.body_start, span.body_start, f"{text}\n{indent}")
+    start = len(source[: span.body_start].rstrip(" \t"))
+    return (start, span.body_start, f"\n{indent}{text}\n{indent}")
+
+
+def _body_indent(source, span):
+    """
+    Returns the indentation of the body of an element.
+
+    Args:
+        source (str): The source code of the script.
+        span (ElementSpan): The span of the element.
+
+    Returns:
+        (str): The indentation of the body, or that of the definition plus four spaces if the body
+            is in the same line as the definition.
+    """
+    line_start = source.rfind("\n", 0, span.body_start) + 1
+    indent = source[line_start : span.body_start]
+    if not indent.strip():
+        return indent
+    header_start = source.rfind("\n", 0, span.start) + 1
+    return source[header_start : span.start] + " " * 4
+
+
+def _docstring_edit(source, span, docstring):
+    """
+    Builds the edit that sets the docstring of an element.
+
+    The current docstring literal is replaced if there is one, keeping its string prefix, and
+    otherwise the new docstring is inserted at the beginning of the body.
+
+    Args:
+        source (str): The source code of the script.
+        span (ElementSpan): The span of the element.
+        docstring (str): The content of the docstring, without quotes.
+
+    Returns:
+        (tuple): The (start, end, replacement) edit.
+    """
+    if span.docstring_start is None:
+        return _insertion_edit(source, span, f'"""{docstring}"""')
+    literal = source[span.docstring_start : span.docstring_end]
+    prefix = literal[: len(literal) - len(literal.lstrip("rRuU"))]
+    return (span.docstring_start, span.docstring_end, f'{prefix}"""{docstring}"""')
+
+
+def _select_elements(script_content, spans, elements2doc, overwrite):
+    """
+    Selects the elements of a script to be documented.
+
+    Args:
+        script_content (str): The source code of the script.
+        spans (list): The spans of the elements of the script.
+        elements2doc (list): The elements to document, by name or qualified name. If None, all of them.
+        overwrite (bool): Whether to select the elements that already have a docstring.
+
+    Returns:
+        (list): A list of (span, element) tuples, where element is the source code of the element,
+            minimized for its prompt if custom_params.minimize_elements is set.
+    """
+    queries = []
+    for span in spans:
+        if elements2doc is not None and not (
+            span.name in elements2doc or span.qualname in elements2doc
+        ):  # Filter the elements to document
+            continue
+        if (
+            span.docstring_start is not None and not overwrite
+        ):  # If element had docstring and we do not want to change it
+            continue
+        element = script_content[span.start : span.end]
+        if custom_params.minimize_elements:
+            line_start = script_content.rfind("\n", 0, span.start) + 1
+            element = minimize_python(element, script_content[line_start : span.start])
+        queries.append((span, element))
+    return queries
+
+
+def render_python_file_prompts(
+    script,
+    prompts,
+    elements2doc=custom_params.elements2doc,
+    overwrite=custom_params.overwrite,
+):
+    """
+    Renders the prompts of the elements of a Python script that would be documented, without querying the model.
+
+    The elements are selected as in `doc_python_file_async`, so the prompts are exactly the ones that
+    the documentation process would send.
+
+    Args:
+        script (str): The path to the Python script file.
+        prompts (dict): A dictionary with the prompts to be used for generating docstrings.
+        elements2doc (list, optional): A list of elements (classes or functions) to document, by name or
+            qualified name. Defaults to custom_params.elements2doc.
+        overwrite (bool, optional): Flag indicating whether to select the elements with a docstring. Defaults to
+            custom_params.overwrite.
+
+    Returns:
+        (list | None): A list of (qualname, prompt, element_type) tuples, or None if the script could not be parsed.
+    """
+    try:
+        script_content = read_python(script)
+        spans = list(iter_python_elements(script_content))
+    except Exception as e:
+        LOGGER.info(
+            "%s\r❌Check the script %s. The following error occurred: %s",
+            ANSI_CODE["red"],
+            script,
+            e,
+        )
+        return None
+    return [
+        (
+            span.qualname,
+            get_prompt_template(prompts[span.type]).render(element),
+            span.type,
+        )
+        for span, element in _select_elements(
+            script_content, spans, elements2doc, overwrite
+        )
+    ]
+
+
+def _pack_elements(queries, max_tokens):
+    """
+    Groups the small functions of a script into packs that are documented with a single query.
+
+    The functions are packed greedily in the order of the script while their number of tokens fits
+    in the budget. Classes, functions larger than the budget and functions whose
+    qualified name is repeated in the script are not packed.
+
+    Args:
+        queries (list): A list of (span, element) tuples to be documented.
+        max_tokens (int): The maximum number of tokens of the elements of a pack.
+
+    Returns:
+        (list): The packs of at least two elements, as lists of indices of the queries.
+    """
+    # Counted once, the elements with duplicated names are not packed
+    qualnames = Counter(span.qualname for span, _ in queries)
+    packs, pack, pack_tokens = [], [], 0
+    for i, (span, element) in enumerate(queries):
+        tokens = count_tokens(element)
+        if (
+            span.type != "function"
+            or tokens > max_tokens
+            or qualnames[span.qualname] > 1
+        ):
+            continue
+        if pack_tokens + tokens > max_tokens:
+            packs.append(pack)
+            pack, pack_tokens = [], 0
+        pack.append(i)
+        pack_tokens += tokens
+    packs.append(pack)
+    return [pack for pack in packs if len(pack) > 1]
+
+
+def _split_packed_response(response):
+    """
+    Splits the response to a packed query into the docstrings of its elements.
+
+    Args:
+        response (str | None): The response of the model, a JSON object of docstrings by qualified name.
+
+    Returns:
+        (dict): The docstrings by qualified name, empty if the response could not be parsed.
+    """
+    if response is None or "{" not in response:
+        return {}
+    try:
+        docstrings = json.loads(
+            response[response.index("{") : response.rindex("}") + 1]
+        )
+    except ValueError:
+        return {}
+    if not isinstance(docstrings, dict):
+        return {}
+    return {
+        name: docstring.strip().strip('"').strip()
+        for name, docstring in docstrings.items()
+        if isinstance(docstring, str) and docstring.strip().strip('"').strip()
+    }
+
+
+def _format_docstring(docstring, indent):
+    """
+    Formats the content of a docstring with the indentation of the body of its element.
+
+    Args:
+        docstring (str): The content of the docstring, without quotes.
+        indent (str): The indentation of the body of the element.
+
+    Returns:
+        (str): The content of the docstring, starting and ending with a new line.
+    """
+    lines = inspect.cleandoc(docstring).splitlines()
+    lines = [indent + line if line.strip() else "" for line in lines]
+    return "\n" + "\n".join(lines) + "\n" + indent
+
+
+async def _query_packed_async(
+    script_content,
+    queries,
+    prompts,
+    get_completion,
+    semaphore,
+    stop_flag=Event(),
+    cache=None,
+    max_tokens=custom_params.pack_max_tokens,
+):
+    """
+    Queries the completion model for a list of elements, packing the small functions into shared queries.
+
+    The small functions are grouped by `_pack_elements`, and each group is documented with a single query
+    of the "functions" prompt that asks for the docstrings of all of them keyed by qualified name. The
+    response is split back onto the elements, and the elements missing from it are queried on their own.
+
+    Args:
+        script_content (str): The source code of the script.
+        queries (list): A list of (span, element) tuples to be documented.
+        prompts (dict): A dictionary with the prompts to be used for generating docstrings.
+        get_completion (callable): A function or coroutine function responsible for generating the completion.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent queries.
+        stop_flag (Event, optional): An event flag to signal stopping the queries (default is Event()).
+        cache (CompletionCache, optional): A persistent cache of completions (default is None).
+        max_tokens (int, optional): The maximum number of tokens of the elements of a pack
+            (default is custom_params.pack_max_tokens).
+
+    Returns:
+        (list): The response for each query, with the docstrings of the packed elements between triple
+            quotes, None for the failed ones or those skipped by the stop flag, or the `CompletionSkippedError`
+            of the elements get_completion has no completion for.
+    """
+    packs = _pack_elements(queries, max_tokens)
+
+    async def query(pack):
+        elements = "\n\n".join(
+            f"NAME: {queries[i][0].qualname}\n{queries[i][1]}" for i in pack
+        )
+        async with semaphore:
+            if stop_flag.is_set():
+                return {}
+            try:
+                response = await doc_element_async(
+                    elements,
+                    prompts["functions"],
+                    get_completion,
+                    cache=cache,
+                    element_type="functions",
+                    parse=_split_packed_response,
+                )
+            except CompletionSkippedError:  # Queried on their own
+                return {}
+            return _split_packed_response(response)
+
+    results = [None] * len(queries)
+    for pack, docstrings in zip(
+        packs, await asyncio.gather(*(query(pack) for pack in packs))
+    ):
+        for i in pack:
+            span = queries[i][0]
+            if span.qualname in docstrings:
+                indent = _body_indent(script_content, span)
+                results[i] = (
+                    f'"""{_format_docstring(docstrings[span.qualname], indent)}"""'
+                )
+    missing = [i for i, result in enumerate(results) if result is None]
+    if packs:
+        LOGGER.info(
+            "%s\r%s elements packed into %s queries, %s queried on their own.",
+            ANSI_CODE["reset"],
+            len(queries) - len(missing),
+            len(packs),
+            len(missing),
+        )
+    for i, result in zip(
+        missing,
+        await _query_elements_async(
+            [
+                (queries[i][1], prompts[queries[i][0].type], queries[i][0].type)
+                for i in missing
+            ],
+            get_completion,
+            semaphore,
+            stop_flag,
+            cache,
+        ),
+    ):
+        results[i] = result
+    return results
+
+
+async def _query_elements_async(
+    queries, get_completion, semaphore, stop_flag=Event(), cache=None
+):
+    """
+    Queries the completion model for a list of elements with bounded concurrency.
+
+    All the queries are scheduled at once in the running event loop, and the semaphore limits how
+    many of them are in flight at the same time. Sharing the semaphore among several scripts shares
+    the concurrency limit among all of them. The results are returned in the same order as the
+    queries, independently of the order in which they finish. Queries that have not been sent when
+    the stop flag is set are skipped.
+
+    Args:
+        queries (list): A list of (element, prompt, element_type) tuples to be documented.
+        get_completion (callable): A function or coroutine function responsible for generating the completion.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent queries.
+        stop_flag (Event, optional): An event flag to signal stopping the queries (default is Event()).
+        cache (CompletionCache, optional): A persistent cache of completions (default is None).
+
+    Returns:
+        (list): The result of `doc_element_async` for each query, None for the queries skipped by the
+            stop flag, or the `CompletionSkippedError` of the queries get_completion has no completion for.
+    """
+
+    async def query(element, prompt, element_type):
+        async with semaphore:
+            if stop_flag.is_set():
+                return None
+            try:
+                return await doc_element_async(
+                    element,
+                    prompt,
+                    get_completion,
+                    cache=cache,
+                    element_type=element_type,
+                )
+            except CompletionSkippedError as e:
+                return e
+
+    return await asyncio.gather(*(query(*query_args) for query_args in queries))
+
+
+async def doc_python_file_async(
     script,
     prompts,
     elements2doc=custom_params.elements2doc,
     overwrite=custom_params.overwrite,
-    get_completion=get_completion,
+    get_completion=None,
     stop_flag=Event(),
     TODO_message="# TODO: Document this ELEMENT on your own. Could not be documented by the model.",
+    max_workers=custom_params.max_workers,
+    semaphore=None,
+    cache=None,
+    pack=custom_params.pack_elements,
 ):
     """
     Documents Python files by generating docstrings for classes and functions.
 
-    This function parses a given Python script, extracts the defined classes and functions, and generates docstrings
+    This function parses a given Python script, indexes the classes and functions defined at any depth, and generates docstrings
     for them using specified prompts and a completion function. It also handles existing docstrings based on the
-    overwrite parameter and can stop the documentation process if triggered.
+    overwrite parameter and can stop the documentation process if triggered. The queries for all the elements
+    of the script are sent concurrently (up to `max_workers` at a time, or as many as the shared semaphore allows),
+    and the responses are applied in the order of the elements, so the resulting script does not depend on the
+    level of concurrency. In packing mode, several small functions are documented with a single query. The new docstrings are collected as edits against the offsets of the original script,
+    which is rewritten once at the end, so each docstring always lands in its own element. The script is read
+    once and transformed in memory, and it is only written (atomically, with the encoding it was read with)
+    if its content changed, so an interrupted run never leaves it half written. The time spent in every
+    stage is recorded in the metrics of the process.
 
     Args:
         script (str): The path to the Python script file to be documented.
         prompts (dict): A dictionary with the prompts to be used for generating docstrings.
-        elements2doc (list, optional): A list of elements (classes or functions) to document. Defaults to
-            custom_params.elements2doc.
+        elements2doc (list, optional): A list of elements (classes or functions) to document, by name or
+            qualified name (e.g. "MyClass.my_method"). Defaults to custom_params.elements2doc.
         overwrite (bool, optional): Flag indicating whether to overwrite existing docstrings. Defaults to
             custom_params.overwrite.
-        get_completion (callable, optional): A function to get the completion responses. Defaults to get_completion.
+        get_completion (callable, optional): A function or coroutine function to get the completion responses.
+            Defaults to None, the configured completion function, resolved only if some element is queried.
         stop_flag (Event, optional): An event flag to signal stopping the documentation process. Defaults to
             Event().
         TODO_message (str, optional): Message template to indicate that an element could not be documented.
             Defaults to "# TODO: Document this ELEMENT on your own. Could not be documented by the model."
+        max_workers (int, optional): Maximum number of concurrent queries to the completion model, used when no
+            semaphore is provided. Defaults to custom_params.max_workers.
+        semaphore (asyncio.Semaphore, optional): A semaphore shared with other scripts to limit the number of
+            concurrent queries. Defaults to None.
+        cache (CompletionCache, optional): A persistent cache of completions, consulted before each query.
+            Defaults to None.
+        pack (bool, optional): Whether to document several small functions with a single query, using the
+            "functions" prompt. Defaults to custom_params.pack_elements.
+
+    Returns:
+        (bool | None): True if all the selected elements were documented, False if some of them could not be
+            documented, and None if the script could not be parsed or the process was interrupted.
     """
     script = str(script)
+    metrics = get_metrics()
     try:
-        parsed = parse_python(script)
-        if parsed is None:
-            LOGGER.info(
-                "%s\r❌Check the script {script}. It is not properly coded and can not be documented.",
-                ANSI_CODE["red"],
-            )
-            return None
-        (
-            classes_and_functions,
-            script_content,
-        ) = extract_functions_and_classes_from_python_tokens(parsed)
+        with metrics.timer("parse", script):
+            script_content, encoding = read_python(script, with_encoding=True)
+            spans = list(iter_python_elements(script_content))
     except Exception as e:
+        metrics.increment("scripts", outcome="error")
         LOGGER.info(
             "%s\r❌Check the script %s. The following error occurred: %s",
             ANSI_CODE["red"],
             script,
             e,
         )
+        return None
 
-    def add_msg(msg, where, element, script_content):
-        n_spaces = 0
-        for ch in element[where - 1 :: -1]:
-            if ch == " ":
-                n_spaces += 1
-            else:
-                break
-        new_element = element[:where] + msg + "\n" + " " * n_spaces + element[where:]
-        return script_content.replace(element, new_element)
-
-    for e_type, elements in classes_and_functions.items():
-        for element, e_name, dosctring_idx in elements:
-            if (
-                elements2doc is not None and e_name not in elements2doc
-            ):  # Filter the elements to document
-                continue
-            if stop_flag.is_set():
-                LOGGER.info(
-                    "%s\r Ended during the documentation of script %s. Interrupted by SIGINT.%s",
-                    ANSI_CODE["yellow"],
+    # Select the elements to query before sending any request
+    with metrics.timer("select", script):
+        queries = _select_elements(script_content, spans, elements2doc, overwrite)
+    for span, _ in queries:
+        metrics.increment("elements", element_type=span.type)
+    if queries and get_completion is None:
+        get_completion = completion.get_completion
+    semaphore = semaphore or asyncio.Semaphore(max(1, max_workers))
+    query_start = time.perf_counter()
+    if pack and "functions" in prompts:
+        results = await _query_packed_async(
+            script_content,
+            queries,
+            prompts,
+            get_completion,
+            semaphore,
+            stop_flag,
+            cache,
+            custom_params.pack_max_tokens,
+        )
+    else:
+        results = await _query_elements_async(
+            [(element, prompts[span.type], span.type) for span, element in queries],
+            get_completion,
+            semaphore,
+            stop_flag,
+            cache,
+        )
+    metrics.observe("query", time.perf_counter() - query_start, script)
+    if stop_flag.is_set():
+        LOGGER.info(
+            "%s\r Ended during the documentation of script %s. Interrupted by SIGINT.%s",
+            ANSI_CODE["yellow"],
+            script,
+            ANSI_CODE["reset"],
+        )
+        return
+    # Collect the edits against the original script and apply them at once
+    documented = True
+    edits = []
+    for (span, _), result in zip(queries, results):
+        LOGGER.info(
+            "%s\r\n🤖 Generating docstring for %s %s...\n\n",
+            ANSI_CODE["reset"],
+            span.type,
+            span.qualname,
+        )
+        if isinstance(result, CompletionSkippedError):  # Left untouched
+            LOGGER.info(
+                "%s\r⚠ No completion for %s %s (%s). Left untouched...",
+                ANSI_CODE["yellow"],
+                span.type,
+                span.qualname,
+                result,
+            )
+            documented = False
+            continue
+        new_docstring = _parse_docstring(result)
+        if new_docstring:  # Query successfull
+            LOGGER.info("%s\r%s\n\n\n", ANSI_CODE["reset"], new_docstring)
+            edits.append(_docstring_edit(script_content, span, new_docstring))
+            continue
+        if result is not None:
+            LOGGER.info(
+                "%s\r⚠ No docstring generated for %s %s...",
+                ANSI_CODE["yellow"],
+                span.type,
+                span.qualname,
+            )
+        else:  # Error in the query
+            LOGGER.info(
+                "%s\r❌ Error in the query for %s %s! No response provided...",
+                ANSI_CODE["red"],
+                span.type,
+                span.qualname,
+            )
+        edits.append(
+            _insertion_edit(
+                script_content, span, TODO_message.replace("ELEMENT", span.type)
+            )
+        )
+        documented = False
+    with metrics.timer("write", script):
+        new_content = apply_edits(script_content, edits)
+        if new_content != script_content:  # Unchanged scripts are not touched
+            # Keeping its declared encoding, with escapes for the characters it cannot encode
+            write_atomic(script, new_content, encoding, errors="backslashreplace")
+    metrics.increment("scripts", outcome="documented" if documented else "partial")
+    return documented
+
+
+def doc_python_file(
+    script,
+    prompts,
+    elements2doc=custom_params.elements2doc,
+    overwrite=custom_params.overwrite,
+    get_completion=None,
+    stop_flag=Event(),
+    TODO_message="# TODO: Document this ELEMENT on your own. Could not be documented by the model.",
+    max_workers=custom_params.max_workers,
+    pack=custom_params.pack_elements,
+):
+    """
+    Synchronous wrapper of `doc_python_file_async`.
+
+    Args:
+        script (str): The path to the Python script file to be documented.
+        prompts (dict): A dictionary with the prompts to be used for generating docstrings.
+        elements2doc (list, optional): A list of elements (classes or functions) to document. Defaults to
+            custom_params.elements2doc.
+        overwrite (bool, optional): Flag indicating whether to overwrite existing docstrings. Defaults to
+            custom_params.overwrite.
+        get_completion (callable, optional): A function or coroutine function to get the completion responses.
+            Defaults to None, the configured completion function, resolved only if some element is queried.
+        stop_flag (Event, optional): An event flag to signal stopping the documentation process. Defaults to
+            Event().
+        TODO_message (str, optional): Message template to indicate that an element could not be documented.
+            Defaults to "# TODO: Document this ELEMENT on your own. Could not be documented by the model."
+        max_workers (int, optional): Maximum number of concurrent queries to the completion model. Defaults to
+            custom_params.max_workers.
+        pack (bool, optional): Whether to document several small functions with a single query. Defaults to
+            custom_params.pack_elements.
+
+    Returns:
+        (bool | None): True if all the selected elements were documented, False if some of them could not be
+            documented, and None if the script could not be parsed or the process was interrupted.
+    """
+    return asyncio.run(
+        closing_client(
+            cancel_on_stop(
+                doc_python_file_async(
                     script,
-                    ANSI_CODE["reset"],
-                )
-                return
-            if e_type == "function" or e_type == "class":
-                if element[dosctring_idx : dosctring_idx + 3] == '"""':
-                    previous_docstring = re.search(r'"""(.*?)"""', element, re.DOTALL)
-                    if (
-                        previous_docstring and not overwrite
-                    ):  # If element had docstring and we do not want to change it
-                        continue
-                    LOGGER.info(
-                        "%s\r\n🤖 Generating docstring for %s %s...\n\n",
-                        ANSI_CODE["reset"],
-                        e_type,
-                        e_name,
-                    )
-                else:
-                    previous_docstring = None
-                result = doc_element(element, prompts[e_type], get_completion)
-                if result is not None:  # Query successfull
-                    new_docstring = re.search(r'"""(.*?)"""', result, re.DOTALL)
-                    if new_docstring:
-                        new_docstring = new_docstring.group(1)
-                        LOGGER.info("%s\r%s\n\n\n", ANSI_CODE["reset"], new_docstring)
-                    else:
-                        LOGGER.info(
-                            "%s\r⚠ No docstring generated for %s %s...",
-                            ANSI_CODE["yellow"],
-                            e_type,
-                            e_name,
-                        )
-                        script_content = add_msg(
-                            TODO_message.replace("ELEMENT", e_type),
-                            dosctring_idx,
-                            element,
-                            script_content,
-                        )
-                        continue
-                    if previous_docstring:  # If element had docstring
-                        previous_docstring = previous_docstring.group(1)
-                        element_new = element.replace(
-                            previous_docstring, new_docstring, 1
-                        )
-                        script_content = script_content.replace(element, element_new, 1)
-                    else:  # If element did not have docstring
-                        script_content = add_msg(
-                            f'"""{new_docstring}"""',
-                            dosctring_idx,
-                            element,
-                            script_content,
-                        )
-                else:  # Error in the query
-                    LOGGER.info(
-                        "%s\r❌ Error in the query for %s %s! No response provided...",
-                        ANSI_CODE["red"],
-                        e_type,
-                        e_name,
-                    )
-                    script_content = add_msg(
-                        TODO_message.replace("ELEMENT", e_type),
-                        dosctring_idx,
-                        element,
-                        script_content,
-                    )
-    with open(script, "w", encoding="utf-8") as python_file:
-        python_file.write(script_content)
+                    prompts,
+                    elements2doc=elements2doc,
+                    overwrite=overwrite,
+                    get_completion=get_completion,
+                    stop_flag=stop_flag,
+                    TODO_message=TODO_message,
+                    max_workers=max_workers,
+                    pack=pack,
+                ),
+                stop_flag,
+            )
+        )
+    )
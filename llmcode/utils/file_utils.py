@@ -8,8 +8,14 @@ Functions:
     parse_python: Parses a Python file and returns its tokens.
     extract_functions_and_classes_from_python_tokens: Extracts functions and
         classes from Python tokens.
+    read_python: Reads the source code of a Python script.
+    iter_python_elements: Yields the span of every function and class of Python
+        source code, at any depth.
+    apply_edits: Applies a list of non-overlapping edits to a string in a single pass.
     read_content: Reads the content of a file.
-    list_submodule_directories: Lists git submodule directories in a project.
+    write_atomic: Writes the content of a file atomically.
+    walk_scripts: Yields the scripts of a directory tree with some suffixes in a single pass.
+    list_submodule_directories: Lists the git submodule directories of a project.
     is_file_in_directory: Checks if a file or directory exists within a given directory.
     copy_path: Copies a file or directory to a new location with a modified name.
     ensure_folder_exist: Ensures that a folder exists, creating it if necessary.
@@ -19,16 +25,38 @@ Author: Francisco Javier Gañán
 License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
 """
 
+import ast
 import shutil
-import subprocess
-from tokenize import tokenize
+import stat
+import tempfile
+from collections import namedtuple
+from tokenize import tokenize, open as open_python
 from token import tok_name
 import os
 import platform
 from pathlib import Path
 from . import ANSI_CODE, SUFFIX
+from .git import find_repository_root, list_submodules
+from .ignore import IgnoreSpec
 from .logger import LOGGER
 
+# Span of a function or class in a Python source code. The offsets are indices of the
+# source string: the element spans [start, end), its body starts at body_start, and its
+# docstring literal, if any, spans [docstring_start, docstring_end).
+ElementSpan = namedtuple(
+    "ElementSpan",
+    [
+        "type",
+        "name",
+        "qualname",
+        "start",
+        "end",
+        "body_start",
+        "docstring_start",
+        "docstring_end",
+    ],
+)
+
 
 def parse_python(fn):
     """
@@ -68,7 +96,8 @@ def extract_functions_and_classes_from_python_tokens(tokens):
     This function processes a list of tokens representing a Python script and extracts
     the definitions of functions and classes along with their associated docstrings.
     It handles indentation levels to accurately determine the boundaries of each
-    extracted element.
+    extracted element. The documentation process uses `iter_python_elements` instead,
+    which indexes the elements at any depth in a single pass without copying them.
 
     Args:
         tokens (list of tuple): A list of tokenized elements, where each element is a
@@ -161,6 +190,145 @@ def extract_functions_and_classes_from_python_tokens(tokens):
     return stored, python_code
 
 
+def read_python(fn, with_encoding=False):
+    """
+    Reads the source code of a Python script.
+
+    The encoding of the script is detected from its encoding declaration or BOM, as the
+    Python interpreter does, and the newlines are normalized to "\n".
+
+    Args:
+        fn (str): The path to the Python script file.
+        with_encoding (bool, optional): Whether to return the detected encoding too, to write the
+            script back with it (default is False).
+
+    Returns:
+        (str | tuple): The source code of the script, or a (source, encoding) tuple if with_encoding
+            is True. The encoding is "utf-8-sig" for the scripts with a UTF-8 BOM.
+    """
+    with open_python(fn) as file:
+        source = file.read()
+        return (source, file.encoding) if with_encoding else source
+
+
+def iter_python_elements(source):
+    """
+    Yields the span of every function and class defined in Python source code.
+
+    The source is parsed once with the `ast` module, and the functions, async functions and
+    classes are yielded in the order they appear in the source, at any depth: methods, nested
+    functions and classes defined inside other blocks are included. Every element is described
+    by an `ElementSpan` of offsets into the original source string, so no copy of the source of
+    each element is made.
+
+    Args:
+        source (str): The Python source code, with "\n" newlines.
+
+    Returns:
+        (generator): A generator of `ElementSpan` records. The type is "function" or "class",
+            and the qualified name follows the `__qualname__` convention (e.g. "f.<locals>.g").
+
+    Raises:
+        SyntaxError: If the source is not valid Python code.
+    """
+    tree = ast.parse(source)
+    lines = source.split("\n")
+    line_starts = [0] * (len(lines) + 1)
+    for i, line in enumerate(lines):
+        line_starts[i + 1] = line_starts[i] + len(line) + 1
+
+    def offset(lineno, col_offset):
+        # The column offsets of the ast module are UTF-8 byte offsets
+        line = lines[lineno - 1]
+        if not line.isascii():
+            col_offset = len(
+                line.encode("utf-8")[:col_offset].decode("utf-8", "ignore")
+            )
+        return line_starts[lineno - 1] + col_offset
+
+    def walk(node, prefix):
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                qualname = prefix + child.name
+                first = child.body[0]
+                body_start = offset(first.lineno, first.col_offset)
+                if getattr(first, "decorator_list", None):  # The body starts at its "@"
+                    body_start = source.rfind(
+                        "@",
+                        0,
+                        offset(
+                            first.decorator_list[0].lineno,
+                            first.decorator_list[0].col_offset,
+                        ),
+                    )
+                docstring = (
+                    first
+                    if isinstance(first, ast.Expr)
+                    and isinstance(first.value, ast.Constant)
+                    and isinstance(first.value.value, str)
+                    else None
+                )
+                yield ElementSpan(
+                    "class" if isinstance(child, ast.ClassDef) else "function",
+                    child.name,
+                    qualname,
+                    offset(child.lineno, child.col_offset),
+                    offset(child.end_lineno, child.end_col_offset),
+                    body_start,
+                    (
+                        offset(docstring.lineno, docstring.col_offset)
+                        if docstring
+                        else None
+                    ),
+                    (
+                        offset(docstring.end_lineno, docstring.end_col_offset)
+                        if docstring
+                        else None
+                    ),
+                )
+                yield from walk(
+                    child,
+                    qualname
+                    + ("." if isinstance(child, ast.ClassDef) else ".<locals>."),
+                )
+            else:
+                yield from walk(child, prefix)
+
+    return walk(tree, "")
+
+
+def apply_edits(content, edits):
+    """
+    Applies a list of edits to a string in a single pass.
+
+    Each edit replaces the characters [start, end) of the original string with a new text
+    (an insertion when start equals end). The offsets always refer to the original string, so
+    the edits can be collected in any order and are independent of each other. The new string
+    is built once at the end, in time linear in its size.
+
+    Args:
+        content (str): The original string.
+        edits (list): A list of (start, end, replacement) tuples. Insertions at the same offset
+            are applied in the order they appear in the list.
+
+    Returns:
+        (str): The edited string.
+
+    Raises:
+        ValueError: If two edits overlap.
+    """
+    pieces = []
+    position = 0
+    for start, end, replacement in sorted(edits, key=lambda edit: edit[:2]):
+        if start < position:
+            raise ValueError(f"Overlapping edit at offset {start}")
+        pieces.append(content[position:start])
+        pieces.append(replacement)
+        position = end
+    pieces.append(content[position:])
+    return "".join(pieces)
+
+
 def read_content(file_path):
     """
     Reads the content of a text file.
@@ -178,49 +346,115 @@ def read_content(file_path):
         return file.read()
 
 
+def write_atomic(path, content, encoding="utf-8", errors="strict"):
+    """
+    Writes the content of a text file atomically.
+
+    The content is written to a temporary file in the same directory, which then replaces the
+    file with a single rename, so readers never see a partially written file and an interrupted
+    write leaves the original file intact. The permissions of the replaced file are kept.
+
+    Args:
+        path (str or Path): The path to the file.
+        content (str): The content to write.
+        encoding (str, optional): The encoding of the file (default is "utf-8").
+        errors (str, optional): How the characters that cannot be encoded are handled, as in `open`
+            (default is "strict").
+    """
+    path = Path(path)
+    descriptor, temporary_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with open(descriptor, "w", encoding=encoding, errors=errors) as file:
+            file.write(content)
+        try:
+            os.chmod(temporary_path, stat.S_IMODE(os.stat(path).st_mode))
+        except FileNotFoundError:
+            pass
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+
+
+def walk_scripts(root, suffixes, exclude=()):
+    """
+    Yields the scripts of a directory tree with some suffixes, walking the tree once.
+
+    The tree is walked depth-first with `os.scandir`, in alphabetical order, and the scripts are
+    yielded as they are found, so they can be processed while the walk goes on. The excluded
+    files and directories are matched while walking, so the excluded directories, as well as the
+    ".git" directories, are pruned before descending into them. Symbolic links to directories are
+    not followed.
+
+    Args:
+        root (str or Path): The root directory of the tree.
+        suffixes (Iterable): The suffixes of the scripts to yield (e.g. {".py", ".cpp"}).
+        exclude (Iterable | IgnoreSpec, optional): The compiled exclusion patterns, or a list of gitignore
+            patterns relative to the root, such as names matching at any depth (default is ()).
+
+    Returns:
+        (generator): A generator of (path, suffix) tuples, where path is the Path of a script.
+    """
+    suffixes = set(suffixes)
+    spec = exclude if isinstance(exclude, IgnoreSpec) else IgnoreSpec(root, exclude)
+    pending = [(os.fspath(root), "")]
+    while pending:
+        directory, relative = pending.pop()
+        spec.enter(directory, relative)
+        try:
+            with os.scandir(directory) as iterator:
+                entries = sorted(iterator, key=lambda entry: entry.name)
+        except OSError:  # e.g. removed or not readable
+            continue
+        subdirectories = []
+        for entry in entries:
+            relative_path = relative + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if (is_dir and entry.name == ".git") or spec.match(
+                    relative_path, is_dir
+                ):
+                    continue
+                if is_dir:
+                    subdirectories.append((entry.path, relative_path + "/"))
+                    continue
+                suffix = os.path.splitext(entry.name)[1]
+                if suffix in suffixes and entry.is_file():
+                    yield Path(entry.path), suffix
+            except OSError:
+                continue
+        pending.extend(reversed(subdirectories))
+
+
 def list_submodule_directories(project_directory):
     """
-    Retrieves a list of submodule directory names from a specified Git project.
+    Retrieves the list of the submodule directories of the git project of a directory.
 
-    This function executes the "git submodule status" command to fetch the status
-    of submodules in a Git repository located at the specified project directory.
-    It then processes the output to extract the names of the subdirectories that
-    contain these submodules.
+    The submodules are read in-process from the `.gitmodules` file and the index of the
+    repository that contains the directory, without running any git command.
 
     Args:
-        project_directory (str): The path to the Git project directory where
+        project_directory (str): The path to a directory of the Git project where
         submodules are to be checked.
 
     Returns:
-        (list): A list of submodule directory names. If no submodules are found, an
-            empty list is returned.
+        (list): The paths of the submodule directories inside the directory, relative to it and
+            with "/" separators. If no submodules are found, an empty list is returned.
     """
-    project_directory = Path(project_directory)
+    project_directory = Path(project_directory).resolve()
+    repository = find_repository_root(project_directory)
     submodule_directories = []
-    try:
-        # Use the "git submodule status" command to list submodules
-        git_command = ["git", "submodule", "status"]
-        result = subprocess.run(
-            git_command,
-            cwd=project_directory,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            check=True,
-        )
-        # Split the output into lines and extract submodule directory names
-        output_lines = result.stdout.strip().split("\n")
-        for line in output_lines:
-            try:
-                _, submodule_path, _ = line.split()
-            except ValueError:  # TODO: Check error type
-                LOGGER.info(
-                    "%s\rNo git submodules found in the project", ANSI_CODE["reset"]
-                )
-                return submodule_directories
-            submodule_name = Path(submodule_path).name
-            submodule_directories.append(submodule_name)
-    except subprocess.CalledProcessError:
+    if repository is not None:
+        prefix = project_directory.relative_to(repository).as_posix() + "/"
+        prefix = "" if prefix == "./" else prefix
+        submodule_directories = [
+            submodule[len(prefix) :]
+            for submodule in list_submodules(repository)
+            if submodule.startswith(prefix)
+        ]
+    if not submodule_directories:
         LOGGER.info("%s\rNo git submodules found in the project", ANSI_CODE["reset"])
     return submodule_directories
 
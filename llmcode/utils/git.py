@@ -0,0 +1,173 @@
+"""
+This module provides the in-process reading of the git metadata of a repository.
+
+The submodules of a repository are read from its `.gitmodules` file and from the gitlinks
+(entries of mode 160000) of its index, without spawning any git process, so they are found
+quickly and also outside a working git installation.
+
+Functions:
+    find_repository_root: Finds the root of the git repository of a directory.
+    git_directory: Returns the git directory of a repository.
+    read_gitmodules: Reads the paths of the submodules declared in a .gitmodules file.
+    read_index_gitlinks: Reads the paths of the submodules recorded in a git index.
+    list_submodules: Lists the paths of the submodules of a repository.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import configparser
+import struct
+from pathlib import Path
+
+GITLINK_MODE = 0o160000
+INDEX_SIGNATURE = b"DIRC"
+
+
+def find_repository_root(directory):
+    """
+    Finds the root of the git repository of a directory.
+
+    Args:
+        directory (str or Path): The directory.
+
+    Returns:
+        (Path | None): The closest directory with a ".git" entry, among the directory and its
+            parents, or None if it is not in a git repository.
+    """
+    directory = Path(directory).resolve()
+    for parent in [directory, *directory.parents]:
+        if (parent / ".git").exists():
+            return parent
+    return None
+
+
+def git_directory(repository):
+    """
+    Returns the git directory of a repository.
+
+    Args:
+        repository (str or Path): The root of the repository.
+
+    Returns:
+        (Path | None): The ".git" directory, or the directory a ".git" file points to (as in the
+            submodules and worktrees), or None if there is none.
+    """
+    git = Path(repository) / ".git"
+    if git.is_dir():
+        return git
+    try:
+        content = git.read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        return None
+    if not content.startswith("gitdir:"):
+        return None
+    directory = Path(content[len("gitdir:") :].strip())
+    return (
+        directory
+        if directory.is_absolute()
+        else (Path(repository) / directory).resolve()
+    )
+
+
+def read_gitmodules(path):
+    """
+    Reads the paths of the submodules declared in a .gitmodules file.
+
+    Args:
+        path (str or Path): The path to the .gitmodules file.
+
+    Returns:
+        (list): The paths of the submodules, relative to the root of the repository, or an empty
+            list if the file does not exist or can not be parsed.
+    """
+    parser = configparser.ConfigParser(interpolation=None, strict=False)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            # The options of git config files may be indented with tabs
+            parser.read_string("\n".join(line.strip() for line in file))
+    except (OSError, UnicodeDecodeError, configparser.Error):
+        return []
+    return [
+        parser[section]["path"].strip().strip('"').strip("/")
+        for section in parser.sections()
+        if section.startswith("submodule") and "path" in parser[section]
+    ]
+
+
+def read_index_gitlinks(path):
+    """
+    Reads the paths of the submodules (gitlinks) recorded in a git index.
+
+    The versions 2, 3 and 4 of the index format are supported, with SHA-1 object names.
+
+    Args:
+        path (str or Path): The path to the index file (e.g. ".git/index").
+
+    Returns:
+        (list): The paths of the submodules, relative to the root of the repository, or an empty
+            list if the index does not exist or can not be parsed.
+    """
+    try:
+        with open(path, "rb") as file:
+            data = file.read()
+    except OSError:
+        return []
+    if len(data) < 12 or data[:4] != INDEX_SIGNATURE:
+        return []
+    version, entries = struct.unpack(">II", data[4:12])
+    if version not in (2, 3, 4):
+        return []
+    gitlinks = []
+    offset = 12
+    previous = b""
+    try:
+        for _ in range(entries):
+            start = offset
+            mode = struct.unpack(">I", data[offset + 24 : offset + 28])[0]
+            flags = struct.unpack(">H", data[offset + 60 : offset + 62])[0]
+            offset += 62
+            if version >= 3 and flags & 0x4000:  # Extended flags
+                offset += 2
+            if version == 4:  # The path is compressed against the previous one
+                byte = data[offset]
+                offset += 1
+                strip = byte & 0x7F
+                while byte & 0x80:  # Offset-encoded varint
+                    byte = data[offset]
+                    offset += 1
+                    strip = ((strip + 1) << 7) | (byte & 0x7F)
+                end = data.index(b"\0", offset)
+                name = previous[: len(previous) - strip] + data[offset:end]
+                offset = end + 1
+            else:
+                end = data.index(b"\0", offset)
+                name = data[offset:end]
+                offset = start + ((end - start) // 8 + 1) * 8  # NUL padded to 8 bytes
+            previous = name
+            if mode & 0o170000 == GITLINK_MODE:
+                gitlinks.append(name.decode("utf-8", "surrogateescape"))
+    except (struct.error, IndexError, ValueError):
+        return gitlinks
+    return gitlinks
+
+
+def list_submodules(repository):
+    """
+    Lists the paths of the submodules of a repository.
+
+    The submodules recorded in the index are combined with those declared in the .gitmodules
+    file, so the submodules are found both in clones and in repositories without an index.
+
+    Args:
+        repository (str or Path): The root of the repository.
+
+    Returns:
+        (list): The sorted paths of the submodules, relative to the root of the repository.
+    """
+    repository = Path(repository)
+    paths = set(read_gitmodules(repository / ".gitmodules"))
+    git = git_directory(repository)
+    if git is not None:
+        paths.update(read_index_gitlinks(git / "index"))
+    return sorted(paths)
@@ -0,0 +1,279 @@
+"""
+This module provides the exclusion of files and folders with gitignore patterns.
+
+The patterns follow the gitignore syntax: a pattern without a slash matches a name at any
+depth, a pattern with a slash is relative to the directory of its file (or to the documented
+folder, for the patterns of the command line), a trailing slash matches only directories, "*",
+"?" and "[...]" do not match a slash, "**" matches any number of directories, and a leading "!"
+re-includes what a previous pattern excluded. The last matching pattern wins. Every pattern is
+compiled once into a regular expression, and the patterns are matched while the tree is walked,
+so the ignored folders are pruned without being listed.
+
+The patterns are read, from lowest to highest precedence, from the `info/exclude` file of the
+git directory of the repository, the `.gitignore` files of the repository (the deeper the higher),
+the project ignore file of the documented folder and the exclusions of the command line. The
+patterns of a `.gitignore` file only apply to the paths of its directory.
+
+Functions:
+    compile_pattern: Compiles a gitignore pattern into a rule.
+    find_missing: Returns the exclusions that are paths not found in a directory.
+    _info_exclude: Returns the path of the `info/exclude` file of a repository.
+
+Classes:
+    IgnoreSpec: The compiled exclusion patterns of a documented folder.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import re
+from collections import namedtuple
+from pathlib import Path
+from .git import find_repository_root, git_directory
+
+GLOB_CHARACTERS = "*?["
+
+# A compiled pattern: the regular expression of the paths it matches, relative to the
+# repository root, and whether it re-includes the paths and only matches directories
+IgnoreRule = namedtuple("IgnoreRule", ["regex", "negated", "directory_only"])
+
+
+def _translate(pattern):
+    """Translates the glob of a gitignore pattern into a regular expression."""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        character = pattern[i]
+        if pattern.startswith("**/", i):
+            regex.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i) and i + 2 == len(pattern):
+            regex.append(".*")
+            i += 2
+            continue
+        if character == "*":
+            regex.append("[^/]*")
+        elif character == "?":
+            regex.append("[^/]")
+        elif character == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex.append(re.escape(character))
+            else:
+                content = pattern[i + 1 : end].replace("\\", "\\\\")
+                if content[0] in "!^":
+                    content = "^/" + content[1:]
+                regex.append(f"[{content}]")
+                i = end
+        elif character == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(character))
+        i += 1
+    return "".join(regex)
+
+
+def compile_pattern(pattern, base=""):
+    """
+    Compiles a gitignore pattern into a rule.
+
+    Args:
+        pattern (str): A line of an ignore file, or an exclusion of the command line.
+        base (str, optional): The path of the directory the pattern is relative to, from the
+            repository root and ending with "/" (default is "", the root).
+
+    Returns:
+        (IgnoreRule | None): The compiled rule, or None if the line is blank or a comment.
+    """
+    pattern = pattern.rstrip("\n")
+    if not pattern.endswith("\\ "):
+        pattern = pattern.rstrip(" ")
+    if not pattern or pattern.startswith("#"):
+        return None
+    negated = pattern.startswith("!")
+    if negated:
+        pattern = pattern[1:]
+    elif pattern.startswith("\\"):  # Escaped "#" or "!"
+        pattern = pattern[1:]
+    directory_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if not pattern:
+        return None
+    anchored = "/" in pattern
+    regex = _translate(pattern.lstrip("/"))
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+    return IgnoreRule(
+        re.compile(re.escape(base) + regex + r"\Z", re.DOTALL), negated, directory_only
+    )
+
+
+def _info_exclude(repository):
+    """
+    Returns the path of the `info/exclude` file of a repository.
+
+    The git directory is resolved from the ".git" file of the submodules and worktrees, and the
+    worktrees share the file of the git directory of their main repository.
+
+    Args:
+        repository (Path): The root of the repository.
+
+    Returns:
+        (Path | None): The path of the file, or None if the repository has no git directory.
+    """
+    git = git_directory(repository)
+    if git is None:
+        return None
+    try:  # The git directory of a worktree points to the common one
+        common = (git / "commondir").read_text(encoding="utf-8").strip()
+        git = git / common if common else git
+    except (OSError, UnicodeDecodeError):
+        pass
+    return git / "info" / "exclude"
+
+
+class IgnoreSpec:
+    """
+    The compiled exclusion patterns of a documented folder.
+
+    The paths are matched relative to the documented folder. The patterns of the `.gitignore`
+    files found while walking the folder are loaded as the walk enters their directories, and
+    dropped when it leaves them, so they are only matched against the paths of their directories.
+
+    Attributes:
+        root (Path): The documented folder.
+        gitignore (bool): Whether the `.gitignore` files are honored.
+    """
+
+    def __init__(self, root, patterns=(), gitignore=False, ignore_file=None):
+        """
+        Compiles the exclusion patterns of a documented folder.
+
+        Args:
+            root (str or Path): The documented folder.
+            patterns (Iterable, optional): The exclusions of the command line, as gitignore patterns
+                relative to the documented folder (default is ()).
+            gitignore (bool, optional): Whether to honor the `.gitignore` files and the
+                `.git/info/exclude` file of the repository of the folder (default is False).
+            ignore_file (str, optional): The name of the project ignore file, read from the documented
+                folder if it exists (default is None).
+        """
+        self.root = Path(root).resolve()
+        self.gitignore = gitignore
+        repository = find_repository_root(self.root) if gitignore else None
+        base_root = repository or self.root
+        self._prefix = (
+            ""
+            if base_root == self.root
+            else self.root.relative_to(base_root).as_posix() + "/"
+        )
+        self._repository_rules = []  # .git/info/exclude
+        # (directory, rules) of the .gitignore files, from the root to the deepest directory entered
+        self._gitignore_rules = []
+        self._project_rules = []  # Project ignore file
+        self._pattern_rules = [
+            rule
+            for rule in (compile_pattern(pattern, self._prefix) for pattern in patterns)
+            if rule is not None
+        ]
+        if repository is not None:
+            exclude = _info_exclude(repository)
+            if exclude is not None:
+                self._repository_rules = self._read(exclude, "")
+            # The .gitignore files of the parents of the folder, from the repository root
+            for parent in reversed(self.root.relative_to(repository).parents):
+                self._gitignore_rules.append(
+                    (
+                        "",  # They apply to the whole folder
+                        self._read(
+                            repository / parent / ".gitignore",
+                            "" if parent == Path(".") else parent.as_posix() + "/",
+                        ),
+                    )
+                )
+        if ignore_file is not None:
+            self._project_rules = self._read(self.root / ignore_file, self._prefix)
+
+    @staticmethod
+    def _read(path, base):
+        """Compiles the patterns of an ignore file, returning no rules if it can not be read."""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return []
+        return [
+            rule for rule in (compile_pattern(line, base) for line in lines) if rule
+        ]
+
+    def enter(self, directory, relative):
+        """
+        Loads the `.gitignore` file of a directory, when the walk enters it.
+
+        The rules of the directories that are not parents of the directory, which the walk already
+        left, are dropped.
+
+        Args:
+            directory (str or Path): The path to the directory.
+            relative (str): The path of the directory relative to the documented folder, ending with
+                "/", or "" for the documented folder itself.
+        """
+        if self.gitignore:
+            while self._gitignore_rules and not relative.startswith(
+                self._gitignore_rules[-1][0]
+            ):
+                self._gitignore_rules.pop()
+            rules = self._read(Path(directory) / ".gitignore", self._prefix + relative)
+            if rules:
+                self._gitignore_rules.append((relative, rules))
+
+    def match(self, relative_path, is_dir=False):
+        """
+        Checks if a path is excluded.
+
+        Args:
+            relative_path (str): The path relative to the documented folder, with "/" separators.
+            is_dir (bool, optional): Whether the path is a directory (default is False).
+
+        Returns:
+            (bool): True if the last pattern matching the path excludes it.
+        """
+        path = self._prefix + relative_path
+        excluded = False
+        for rules in (
+            self._repository_rules,
+            *(rules for _, rules in self._gitignore_rules),
+            self._project_rules,
+            self._pattern_rules,
+        ):
+            for rule in rules:
+                if (is_dir or not rule.directory_only) and rule.regex.match(path):
+                    excluded = not rule.negated
+        return excluded
+
+
+def find_missing(root, names):
+    """
+    Returns the exclusions that are paths not found in a directory.
+
+    Only the literal paths are checked, i.e. the exclusions with a slash other than a trailing one
+    and without glob characters, which are relative to the directory. The rest of the exclusions are
+    patterns that may match at any depth, and they are not checked, so no directory is walked.
+
+    Args:
+        root (str or Path): The directory.
+        names (Iterable): The exclusions.
+
+    Returns:
+        (list): The exclusions not found, in their original order.
+    """
+    root = Path(root)
+    return [
+        name
+        for name in names
+        if "/" in name.rstrip("/")
+        and not any(character in name for character in GLOB_CHARACTERS)
+        and not (root / name.strip("/")).exists()
+    ]
@@ -0,0 +1,159 @@
+"""
+This module provides the run manifest used to skip the scripts that did not change.
+
+The manifest is a JSON file stored next to the documented project. For every script that
+was successfully documented, it records the hash, size and modification time of its content
+and a fingerprint of the settings it was documented with. In the following runs, a script
+whose settings and content match the manifest is skipped before being copied or parsed.
+Comparing the size and modification time is enough in most cases, so the content is only
+hashed when they differ.
+
+Functions:
+    settings_fingerprint: Computes a stable fingerprint of the documentation settings.
+    hash_file: Computes the hash of the content of a file.
+
+Classes:
+    RunManifest: Records the scripts documented in the last successful runs.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from .file_utils import write_atomic
+from .logger import LOGGER
+from . import ANSI_CODE
+
+MANIFEST_VERSION = 1
+
+
+def settings_fingerprint(settings):
+    """
+    Computes a stable fingerprint of the documentation settings.
+
+    Args:
+        settings (dict): The settings used to document the scripts. Values that are not
+            JSON serializable are converted to strings.
+
+    Returns:
+        (str): The hexadecimal SHA-256 digest of the settings.
+    """
+    content = json.dumps(settings, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def hash_file(path):
+    """
+    Computes the hash of the content of a file.
+
+    Args:
+        path (str or Path): The path to the file.
+
+    Returns:
+        (str): The hexadecimal SHA-256 digest of the content of the file.
+    """
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+class RunManifest:
+    """
+    Records the scripts documented in the last successful runs.
+
+    The scripts are stored by their path relative to the root of the project, so the manifest
+    remains valid if the project is moved.
+
+    Attributes:
+        root (Path): The root directory of the project.
+        path (Path): The path to the manifest file.
+        files (dict): The recorded scripts, by relative path.
+    """
+
+    def __init__(self, root, path):
+        """
+        Loads the manifest of a project, starting an empty one if it does not exist or is invalid.
+
+        Args:
+            root (str or Path): The root directory of the project.
+            path (str or Path): The path to the manifest file, relative to the root directory.
+        """
+        self.root = Path(root).resolve()
+        self.path = self.root / path
+        self.files = {}
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                content = json.load(file)
+            if content.get("version") == MANIFEST_VERSION:
+                self.files = content["files"]
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            LOGGER.info(
+                "%s\r⚠ The run manifest %s could not be read and will be rebuilt: %s",
+                ANSI_CODE["yellow"],
+                self.path,
+                e,
+            )
+
+    def _key(self, file):
+        """Returns the key of a script in the manifest."""
+        return Path(file).resolve().relative_to(self.root).as_posix()
+
+    def is_unchanged(self, file, fingerprint):
+        """
+        Checks if a script is unchanged since it was recorded with the same settings.
+
+        Args:
+            file (str or Path): The path to the script.
+            fingerprint (str): The fingerprint of the current settings.
+
+        Returns:
+            (bool): True if the script was recorded with the same settings and content.
+        """
+        entry = self.files.get(self._key(file))
+        if entry is None or entry["settings"] != fingerprint:
+            return False
+        stat = os.stat(file)
+        if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        if entry["size"] != stat.st_size or entry["hash"] != hash_file(file):
+            return False
+        # Same content with a new modification time, e.g. after a checkout
+        entry["mtime_ns"] = stat.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(self, file, fingerprint):
+        """
+        Records a script as successfully documented with the given settings.
+
+        Args:
+            file (str or Path): The path to the script.
+            fingerprint (str): The fingerprint of the settings used to document it.
+        """
+        stat = os.stat(file)
+        self.files[self._key(file)] = {
+            "hash": hash_file(file),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "settings": fingerprint,
+        }
+        self._dirty = True
+
+    def save(self):
+        """Writes the manifest to disk if it changed, replacing the previous one atomically."""
+        if not self._dirty:
+            return
+        write_atomic(
+            self.path,
+            json.dumps(
+                {"version": MANIFEST_VERSION, "files": self.files},
+                indent=1,
+                sort_keys=True,
+            ),
+        )
+        self._dirty = False
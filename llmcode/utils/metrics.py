@@ -0,0 +1,317 @@
+"""
+This module provides the instrumentation of the documentation process.
+
+The time spent in every stage of a run (parsing the scripts, selecting and rendering the
+elements, waiting for the completions, writing the scripts...) is recorded in latency
+histograms labeled by stage and element type, and accumulated per script. The outcomes of
+the completions, their retries and the cache hits are counted. At the end of a run, the
+metrics can be exported as a JSON summary and as a Prometheus textfile, to be collected by
+the textfile collector of the node exporter.
+
+Functions:
+    get_metrics: Returns the metrics of the process.
+
+Classes:
+    Histogram: A latency histogram with cumulative buckets.
+    Metrics: The counters and latency histograms of a run.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from .file_utils import write_atomic
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+PREFIX = "llmcode"
+
+
+class Histogram:
+    """
+    A latency histogram with the cumulative buckets of the Prometheus histograms.
+
+    Attributes:
+        buckets (tuple): The upper bounds of the buckets, in seconds.
+        counts (list): The number of observations of each bucket (not cumulative), and of +Inf last.
+        count (int): The number of observations.
+        sum (float): The sum of the observations, in seconds.
+        max (float): The largest observation, in seconds.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        """
+        Records an observation.
+
+        Args:
+            value (float): The observed latency, in seconds.
+        """
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """
+        Estimates a quantile of the observations as the upper bound of its bucket.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            (float): The estimated quantile, in seconds, bounded by the largest observation.
+        """
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Summarizes the observations.
+
+        Returns:
+            (dict): The count, total, mean, p50, p95 and max of the observations.
+        """
+        return {
+            "count": self.count,
+            "total": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": round(self.max, 6),
+        }
+
+
+def _label_string(labels):
+    """Formats a sorted tuple of labels in the Prometheus text format."""
+    if not labels:
+        return ""
+    escaped = (
+        (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Metrics:
+    """
+    The counters and latency histograms of a run.
+
+    The metrics are thread-safe, since the synchronous documentation functions run in worker threads.
+
+    Attributes:
+        counters (dict): The counters, by name and sorted tuple of labels.
+        histograms (dict): The latency histograms, by stage and sorted tuple of labels.
+        files (dict): The seconds spent in every stage, by script.
+        started (float): The time the metrics were started or reset.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        """
+        Creates empty metrics.
+
+        Args:
+            buckets (tuple, optional): The upper bounds of the buckets of the histograms (default is BUCKETS).
+        """
+        self._buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Clears the metrics, starting a new run."""
+        with self._lock:
+            self.counters = {}
+            self.histograms = {}
+            self.files = {}
+            self.started = time.perf_counter()
+
+    def increment(self, name, value=1, **labels):
+        """
+        Increments a counter.
+
+        Args:
+            name (str): The name of the counter (e.g. "completions").
+            value (float, optional): The increment (default is 1).
+            **labels: The labels of the counter (e.g. outcome="timeout").
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, stage, seconds, file=None, **labels):
+        """
+        Records the time spent in a stage.
+
+        Args:
+            stage (str): The name of the stage (e.g. "parse").
+            seconds (float): The time spent, in seconds.
+            file (str, optional): The script the time was spent on, accumulated per script (default is None).
+            **labels: The labels of the histogram (e.g. element_type="function").
+        """
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(self._buckets)
+            self.histograms[key].observe(seconds)
+            if file is not None:
+                stages = self.files.setdefault(str(file), {})
+                stages[stage] = stages.get(stage, 0) + seconds
+
+    @contextmanager
+    def timer(self, stage, file=None, **labels):
+        """
+        Records the time spent in the block of a `with` statement as a stage, even if it raises.
+
+        Args:
+            stage (str): The name of the stage.
+            file (str, optional): The script the time is spent on (default is None).
+            **labels: The labels of the histogram.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, file, **labels)
+
+    def summary(self):
+        """
+        Summarizes the metrics of the run.
+
+        Returns:
+            (dict): The duration of the run, the summary of every stage (overall and by labels), the
+                counters, the throughput in scripts and elements per second, and the seconds spent in
+                every stage by script.
+        """
+        with self._lock:
+            duration = time.perf_counter() - self.started
+            stages = {}
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                entry = stages.setdefault(stage, {"overall": Histogram(self._buckets)})
+                overall = entry["overall"]
+                for i, count in enumerate(histogram.counts):
+                    overall.counts[i] += count
+                overall.count += histogram.count
+                overall.sum += histogram.sum
+                overall.max = max(overall.max, histogram.max)
+                if labels:
+                    entry[_label_string(labels)] = histogram.summary()
+            for entry in stages.values():
+                entry["overall"] = entry["overall"].summary()
+            counters = {
+                name + _label_string(labels): value
+                for (name, labels), value in sorted(self.counters.items())
+            }
+            elements = sum(
+                value
+                for (name, _), value in self.counters.items()
+                if name == "elements"
+            )
+            return {
+                "duration": round(duration, 6),
+                "stages": stages,
+                "counters": counters,
+                "throughput": {
+                    "scripts_per_second": (
+                        round(len(self.files) / duration, 6) if duration else 0
+                    ),
+                    "elements_per_second": (
+                        round(elements / duration, 6) if duration else 0
+                    ),
+                },
+                "files": {
+                    file: {stage: round(seconds, 6) for stage, seconds in spent.items()}
+                    for file, spent in sorted(self.files.items())
+                },
+            }
+
+    def prometheus(self):
+        """
+        Formats the metrics in the Prometheus text exposition format.
+
+        Returns:
+            (str): The counters, the histograms of the stages and the seconds spent in every stage by script.
+        """
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(
+                            f"{PREFIX}_{name}_total{_label_string(labels)} {value}"
+                        )
+            metric = f"{PREFIX}_stage_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                labels = (("stage", stage),) + labels
+                cumulative = 0
+                for bound, count in zip(
+                    histogram.buckets + ("+Inf",), histogram.counts
+                ):
+                    cumulative += count
+                    lines.append(
+                        f"{metric}_bucket{_label_string(labels + (('le', bound),))} {cumulative}"
+                    )
+                lines.append(f"{metric}_sum{_label_string(labels)} {histogram.sum}")
+                lines.append(f"{metric}_count{_label_string(labels)} {histogram.count}")
+            metric = f"{PREFIX}_file_stage_seconds"
+            lines.append(f"# TYPE {metric} gauge")
+            for file, stages in sorted(self.files.items()):
+                for stage, seconds in sorted(stages.items()):
+                    labels = (("file", file), ("stage", stage))
+                    lines.append(f"{metric}{_label_string(labels)} {seconds}")
+            lines.append(f"# TYPE {PREFIX}_run_duration_seconds gauge")
+            lines.append(
+                f"{PREFIX}_run_duration_seconds {time.perf_counter() - self.started}"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """
+        Writes the summary of the metrics to a JSON file.
+
+        Args:
+            path (str or Path): The path to the JSON file.
+        """
+        write_atomic(path, json.dumps(self.summary(), indent=2) + "\n")
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics to a Prometheus textfile, replacing it atomically so that the collector
+        never reads a partial file.
+
+        Args:
+            path (str or Path): The path to the textfile, which should end with ".prom" to be
+                read by the textfile collector.
+        """
+        write_atomic(path, self.prometheus())
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    """
+    Returns the metrics of the process.
+
+    Returns:
+        (Metrics): The metrics, reset at the beginning of every run of `format_code`.
+    """
+    return _metrics
@@ -0,0 +1,207 @@
+"""
+This module provides the plans of the documentation process.
+
+A plan is the work queue of a run, built by discovering the scripts and selecting their elements
+exactly as the documentation process would, but without querying the model. Every element of the
+plan has an estimate of the input and output tokens of its query and of the seconds it takes, and
+the plan has the projected wall time of the run at the configured concurrency and rate limits, so
+the size of a long run is known before launching it. The plan is stored as a JSON file, and it can
+be executed later to document exactly its elements, so scanning and querying can be scheduled
+independently.
+
+Functions:
+    estimate_query: Estimates the tokens and seconds of the query of an element.
+    projected_seconds: Projects the wall time of a set of queries.
+
+Classes:
+    Plan: The elements to document of a run, with their estimates.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import json
+from pathlib import Path
+import llmcode.cfg.completion_params as completion_params
+import llmcode.cfg.custom_params as custom_params
+from .file_utils import write_atomic
+from .manifest import hash_file
+from .tokens import count_tokens
+
+PLAN_VERSION = 1
+
+
+def estimate_query(prompt):
+    """
+    Estimates the tokens and seconds of the query of an element.
+
+    The input tokens are counted on the rendered prompt. The output tokens are the expected length
+    of a docstring, bounded by the maximum tokens of the completion, and the seconds are the latency
+    of a query plus the time to generate its output.
+
+    Args:
+        prompt (str): The rendered prompt of the element.
+
+    Returns:
+        (dict): The estimated "input_tokens", "output_tokens" and "seconds" of the query.
+    """
+    output_tokens = min(
+        custom_params.plan_output_tokens,
+        getattr(completion_params, "max_tokens", custom_params.plan_output_tokens),
+    )
+    return {
+        "input_tokens": count_tokens(prompt),
+        "output_tokens": output_tokens,
+        "seconds": round(
+            custom_params.plan_query_latency
+            + output_tokens / custom_params.plan_output_rate,
+            3,
+        ),
+    }
+
+
+def projected_seconds(queries, max_workers):
+    """
+    Projects the wall time of a set of queries.
+
+    The queries are assumed to keep `max_workers` slots busy, so the wall time is their total time
+    divided by the slots, but never less than the longest query. If rate limits are configured, the
+    wall time is not less than the time to admit the requests and their reserved tokens (the prompt
+    and the maximum tokens of the completion, as the rate limiter reserves them).
+
+    Args:
+        queries (list): The estimates of the queries, as returned by `estimate_query`.
+        max_workers (int): The maximum number of concurrent queries.
+
+    Returns:
+        (float): The projected wall time, in seconds.
+    """
+    if not queries:
+        return 0.0
+    seconds = max(
+        sum(query["seconds"] for query in queries) / max(1, max_workers),
+        max(query["seconds"] for query in queries),
+    )
+    if custom_params.requests_per_minute:
+        seconds = max(seconds, 60 * len(queries) / custom_params.requests_per_minute)
+    if custom_params.tokens_per_minute:
+        tokens = sum(
+            query["input_tokens"] + getattr(completion_params, "max_tokens", 0)
+            for query in queries
+        )
+        seconds = max(seconds, 60 * tokens / custom_params.tokens_per_minute)
+    return round(seconds, 3)
+
+
+class Plan:
+    """
+    The elements to document of a run, with their estimates.
+
+    Attributes:
+        path (Path): The documented script or folder.
+        root (Path): The folder the paths of the scripts are relative to.
+        settings (dict): The settings the elements were selected with, such as "elements2doc" and "overwrite".
+        scripts (list): The scripts to document, as dictionaries with their relative "path", "language",
+            "sha256" hash and "elements", each of them with its "qualname", "type" and estimates.
+    """
+
+    def __init__(self, path, settings, scripts=None, root=None):
+        """
+        Creates a plan.
+
+        Args:
+            path (str or Path): The documented script or folder.
+            settings (dict): The settings the elements were selected with.
+            scripts (list, optional): The scripts to document (default is None, no scripts).
+            root (str or Path, optional): The folder the paths of the scripts are relative to (default is
+                None, the path if it is a folder or its parent otherwise).
+        """
+        self.path = Path(path).resolve()
+        if root is None:
+            root = self.path if self.path.is_dir() else self.path.parent
+        self.root = Path(root)
+        self.settings = settings
+        self.scripts = scripts or []
+
+    def add(self, script, language, elements):
+        """
+        Adds a script and the elements to document of it.
+
+        Args:
+            script (str or Path): The path to the script.
+            language (str): The programming language of the script.
+            elements (list): The (qualname, prompt, element_type) tuples of the elements to document.
+        """
+        if not elements:
+            return
+        self.scripts.append(
+            {
+                "path": Path(script).resolve().relative_to(self.root).as_posix(),
+                "language": language,
+                "sha256": hash_file(script),
+                "elements": [
+                    {
+                        "qualname": qualname,
+                        "type": element_type,
+                        **estimate_query(prompt),
+                    }
+                    for qualname, prompt, element_type in elements
+                ],
+            }
+        )
+
+    def summary(self):
+        """
+        Summarizes the plan.
+
+        Returns:
+            (dict): The number of scripts and elements, the estimated input and output tokens and the
+                projected wall time at the concurrency of the settings.
+        """
+        queries = [element for script in self.scripts for element in script["elements"]]
+        return {
+            "scripts": len(self.scripts),
+            "elements": len(queries),
+            "input_tokens": sum(query["input_tokens"] for query in queries),
+            "output_tokens": sum(query["output_tokens"] for query in queries),
+            "seconds": projected_seconds(queries, self.settings.get("max_workers", 1)),
+        }
+
+    def save(self, path):
+        """
+        Writes the plan to a JSON file.
+
+        Args:
+            path (str or Path): The path to the JSON file.
+        """
+        content = {
+            "version": PLAN_VERSION,
+            "path": str(self.path),
+            "root": str(self.root),
+            "settings": self.settings,
+            "summary": self.summary(),
+            "scripts": self.scripts,
+        }
+        write_atomic(path, json.dumps(content, indent=2, ensure_ascii=False) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads a plan from a JSON file.
+
+        Args:
+            path (str or Path): The path to the JSON file.
+
+        Returns:
+            (Plan): The plan.
+
+        Raises:
+            ValueError: If the file is not a plan of a supported version.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            content = json.load(file)
+        if not isinstance(content, dict) or content.get("version") != PLAN_VERSION:
+            raise ValueError(f"{path} is not a plan of version {PLAN_VERSION}")
+        return cls(
+            content["path"], content["settings"], content["scripts"], content["root"]
+        )
@@ -0,0 +1,73 @@
+"""
+This module provides the prompt templates used to query the completion model.
+
+The prompt files are read once and split around the placeholder of the element, so
+rendering a prompt for an element is a simple concatenation. The loaded templates are
+cached by path and reloaded only if the modification time of the file changes, which
+keeps long-running processes up to date with the edited prompts.
+
+Functions:
+    get_prompt_template: Returns the cached template of a prompt file.
+
+Classes:
+    PromptTemplate: An immutable prompt template, split around its placeholder.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import os
+from collections import namedtuple
+import llmcode.cfg.custom_params as custom_params
+from .file_utils import read_content
+
+_templates = {}  # Loaded templates by (path, placeholder)
+
+
+class PromptTemplate(namedtuple("PromptTemplate", ["path", "mtime_ns", "parts"])):
+    """
+    An immutable prompt template, split around its placeholder.
+
+    Attributes:
+        path (str): The path to the prompt file.
+        mtime_ns (int): The modification time of the prompt file when it was loaded.
+        parts (tuple): The pieces of the prompt between the occurrences of the placeholder.
+    """
+
+    __slots__ = ()
+
+    def render(self, element):
+        """
+        Renders the prompt for an element.
+
+        Args:
+            element (str): The element that replaces the placeholder.
+
+        Returns:
+            (str): The rendered prompt.
+        """
+        return element.join(self.parts)
+
+
+def get_prompt_template(path, placeholder=None):
+    """
+    Returns the template of a prompt file, loading it only if it is not cached or it changed.
+
+    Args:
+        path (str or Path): The path to the prompt file.
+        placeholder (str, optional): The placeholder of the element in the prompt (default is
+            custom_params.query_completion_key).
+
+    Returns:
+        (PromptTemplate): The template of the prompt.
+    """
+    path = str(path)
+    placeholder = placeholder or custom_params.query_completion_key
+    mtime_ns = os.stat(path).st_mtime_ns
+    template = _templates.get((path, placeholder))
+    if template is None or template.mtime_ns != mtime_ns:
+        template = PromptTemplate(
+            path, mtime_ns, tuple(read_content(path).split(placeholder))
+        )
+        _templates[(path, placeholder)] = template
+    return template
@@ -0,0 +1,325 @@
+"""
+This module provides the scheduler that keeps the completion requests within the rate limits.
+
+The requests are admitted through two token buckets, one for the requests per minute and
+one for the tokens per minute, so the sustained throughput stays right at the limits of the
+account. When the API answers that a limit was exceeded, the scheduler reads the rate-limit
+headers of the response, pauses every request until the limit resets (or backs off
+exponentially with jitter if there are no headers) and the request is retried instead of
+failing.
+
+The backends report the headers of their successful responses through `report_headers`, so
+the limits and the remaining budget announced by the server are adopted from the first response,
+before any request is rejected.
+
+Functions:
+    parse_duration: Parses the durations of the rate-limit headers, such as "6m0s" or "20ms".
+    report_headers: Reports the headers of a successful response to the completion in progress.
+    reporting_headers: Sends the headers reported in a block to a callback.
+    get_rate_limiter: Returns the rate limiter of the process.
+    _parse_number: Parses the number of a rate-limit header.
+
+Classes:
+    TokenBucket: A token bucket that lets the reservations go into debt.
+    RateLimiter: Admits the completion requests within the rate limits and computes the retries.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import contextvars
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+import llmcode.cfg.custom_params as custom_params
+
+RETRYABLE_STATUS = {429, 503}  # Rate limited and overloaded
+
+# The callback of the headers of the responses of the completion in progress
+_headers_callback = contextvars.ContextVar("llmcode_headers_callback", default=None)
+
+
+def parse_duration(value):
+    """
+    Parses the durations of the rate-limit headers.
+
+    Args:
+        value (str): A number of seconds (e.g. "1.5") or a duration such as "6m0s" or "20ms".
+
+    Returns:
+        (float | None): The duration in seconds, or None if it could not be parsed.
+    """
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def report_headers(headers):
+    """
+    Reports the headers of a successful response to the completion in progress, if any.
+
+    Args:
+        headers (Mapping): The headers of the response.
+    """
+    callback = _headers_callback.get()
+    if callback is not None and headers:
+        callback(headers)
+
+
+def _parse_number(value):
+    """
+    Parses the number of a rate-limit header.
+
+    Args:
+        value (str | None): The value of the header.
+
+    Returns:
+        (float | None): The number, or None if it is negative, missing or could not be parsed.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number >= 0 else None
+
+
+@contextmanager
+def reporting_headers(callback):
+    """
+    Sends the headers reported in the block of a `with` statement (and in the tasks and worker threads
+    started from it) to a callback.
+
+    Args:
+        callback (callable | None): The function called with the headers, or None to ignore them.
+    """
+    token = _headers_callback.set(callback)
+    try:
+        yield
+    finally:
+        _headers_callback.reset(token)
+
+
+class TokenBucket:
+    """
+    A token bucket that refills continuously at a given rate per minute.
+
+    Reservations are taken immediately and may leave the bucket in debt; the reservation then
+    returns the time to wait until the debt is paid. This keeps the admitted requests in order
+    and their throughput exactly at the rate, without holding any lock while waiting.
+
+    Attributes:
+        rate (float): The number of tokens added per minute.
+        capacity (float): The maximum number of tokens, one second of rate.
+        tokens (float): The available tokens, negative if in debt.
+    """
+
+    def __init__(self, rate):
+        """
+        Creates a full bucket.
+
+        Args:
+            rate (float): The number of tokens added per minute.
+        """
+        self.rate = rate
+        self.capacity = rate / 60
+        self.tokens = self.capacity
+        self._last = time.monotonic()
+
+    def reserve(self, amount):
+        """
+        Reserves some tokens.
+
+        Args:
+            amount (float): The number of tokens to reserve.
+
+        Returns:
+            (float): The seconds to wait before using the reserved tokens.
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self._last) * self.rate / 60
+        )
+        self._last = now
+        self.tokens -= amount
+        return max(0.0, -self.tokens * 60 / self.rate)
+
+    def limit(self, remaining):
+        """
+        Limits the available tokens to the ones the server reports as remaining.
+
+        Args:
+            remaining (float): The remaining tokens reported by the server.
+        """
+        self.tokens = min(self.tokens, remaining)
+
+
+class RateLimiter:
+    """
+    Admits the completion requests within the rate limits and computes the retries.
+
+    The state of the buckets and of the pause is guarded by a lock, since the backends report
+    the headers of their responses from the worker threads of the completion executor.
+
+    Attributes:
+        requests (TokenBucket | None): The bucket of requests per minute, None if unlimited.
+        tokens (TokenBucket | None): The bucket of tokens per minute, None if unlimited.
+        max_retries (int): The maximum number of retries of a rate-limited request.
+        backoff_base (float): The base of the exponential backoff, in seconds.
+        backoff_max (float): The maximum backoff, in seconds.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=None,
+        tokens_per_minute=None,
+        max_retries=5,
+        backoff_base=1,
+        backoff_max=60,
+    ):
+        """
+        Creates the rate limiter.
+
+        Args:
+            requests_per_minute (float, optional): The requests per minute budget, None if unlimited (default is None).
+            tokens_per_minute (float, optional): The tokens per minute budget, None if unlimited (default is None).
+            max_retries (int, optional): The maximum number of retries of a rate-limited request (default is 5).
+            backoff_base (float, optional): The base of the exponential backoff, in seconds (default is 1).
+            backoff_max (float, optional): The maximum backoff, in seconds (default is 60).
+        """
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=0):
+        """
+        Reserves the budget of a request.
+
+        Args:
+            tokens (int, optional): The estimated number of tokens of the request (default is 0).
+
+        Returns:
+            (float): The seconds to wait before sending the request.
+        """
+        with self._lock:
+            delay = max(0.0, self._paused_until - time.monotonic())
+            if self.requests is not None:
+                delay = max(delay, self.requests.reserve(1))
+            if self.tokens is not None and tokens:
+                delay = max(delay, self.tokens.reserve(tokens))
+        return delay
+
+    @staticmethod
+    def is_retryable(error):
+        """
+        Checks if an error of a completion is due to the rate limits or an overloaded server.
+
+        Args:
+            error (Exception): The error raised by the completion function.
+
+        Returns:
+            (bool): True if the request should be retried.
+        """
+        status = getattr(error, "http_status", None) or getattr(
+            error, "status_code", None
+        )
+        return status in RETRYABLE_STATUS or type(error).__name__ == "RateLimitError"
+
+    def update(self, headers):
+        """
+        Updates the buckets with the rate-limit headers of a response, successful or not.
+
+        If no limit was configured, the limits reported by the server are adopted. The available
+        budget is reduced to what the server reports as remaining. The headers that cannot be parsed
+        are ignored.
+
+        Args:
+            headers (Mapping): The headers of the response.
+        """
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        with self._lock:
+            for name in ("requests", "tokens"):
+                limit = _parse_number(headers.get(f"x-ratelimit-limit-{name}"))
+                remaining = _parse_number(headers.get(f"x-ratelimit-remaining-{name}"))
+                bucket = getattr(self, name)
+                if bucket is None and limit:
+                    bucket = TokenBucket(limit)
+                    setattr(self, name, bucket)
+                if bucket is not None and remaining is not None:
+                    bucket.limit(remaining)
+
+    def backoff(self, error, attempt):
+        """
+        Computes the delay before retrying a rate-limited request, pausing all the requests meanwhile.
+
+        The delay is taken from the "retry-after" or rate-limit reset headers of the response if
+        present, with some jitter, and otherwise is an exponential backoff with full jitter.
+
+        Args:
+            error (Exception): The error raised by the completion function.
+            attempt (int): The number of retries already done.
+
+        Returns:
+            (float): The seconds to wait before retrying.
+        """
+        headers = {
+            key.lower(): value
+            for key, value in (getattr(error, "headers", None) or {}).items()
+        }
+        self.update(headers)
+        delay = None
+        if "retry-after-ms" in headers:
+            delay = parse_duration(headers["retry-after-ms"])
+            delay = delay / 1000 if delay is not None else None
+        for name in (
+            "retry-after",
+            "x-ratelimit-reset-requests",
+            "x-ratelimit-reset-tokens",
+        ):
+            if delay is None and name in headers:
+                delay = parse_duration(headers[name])
+        if delay is None:
+            delay = random.uniform(
+                0, min(self.backoff_max, self.backoff_base * 2**attempt)
+            )
+        else:
+            delay = min(self.backoff_max, delay) * random.uniform(1, 1.1)
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        return delay
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """
+    Returns the rate limiter of the process, creating it on first use from `custom_params`.
+
+    Returns:
+        (RateLimiter): The rate limiter.
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter(
+            custom_params.requests_per_minute,
+            custom_params.tokens_per_minute,
+            custom_params.max_retries,
+            custom_params.backoff_base,
+            custom_params.backoff_max,
+        )
+    return _rate_limiter
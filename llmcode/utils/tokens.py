@@ -0,0 +1,278 @@
+"""
+This module provides the token counting and the minimization of the elements sent to the model.
+
+The tokens are counted with the counter configured in `custom_params.token_counter`, with the
+tokenizer of the model from tiktoken if it is installed, or estimated as one token every four
+characters otherwise. Before an element is rendered in its prompt, it is minimized: comments and
+blank lines are stripped, the bodies of the nested blocks are collapsed (keeping the signatures
+and return statements) while the element exceeds the token budget, and long literals are elided.
+
+Functions:
+    get_token_counter: Returns the token counter of the process.
+    count_tokens: Counts the tokens of a text.
+    minimize_python: Minimizes the source code of a Python element for its prompt.
+    _strip_comments: Removes the comments and blank lines of some Python code.
+    _collapse_bodies: Collapses the bodies of the nested blocks of some Python code within a token budget.
+    _elide_literals: Shortens the long string literals of some Python code.
+
+Author: Francisco Javier Gañán
+License File: https://github.com/javierganan99/LLMCode/blob/main/LICENSE
+"""
+
+import ast
+import io
+import textwrap
+import tokenize
+import llmcode.cfg.completion_params as completion_params
+import llmcode.cfg.custom_params as custom_params
+from .file_utils import apply_edits
+
+_token_counter = None
+
+
+def get_token_counter():
+    """
+    Returns the token counter of the process, creating it on first use.
+
+    Returns:
+        (callable): A function that takes a text and returns its number of tokens. It is
+            `custom_params.token_counter` if defined, the tiktoken encoding of the model if tiktoken
+            is installed, and an estimate of one token every four characters otherwise.
+    """
+    global _token_counter
+    if _token_counter is None:
+        if custom_params.token_counter is not None:
+            _token_counter = custom_params.token_counter
+        else:
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(completion_params.model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+                _token_counter = lambda text: len(
+                    encoding.encode(text, disallowed_special=())
+                )
+            except ImportError:
+                _token_counter = lambda text: len(text) // 4
+    return _token_counter
+
+
+def count_tokens(text):
+    """
+    Counts the tokens of a text with the token counter of the process.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        (int): The number of tokens of the text.
+    """
+    return get_token_counter()(text)
+
+
+def _line_offsets(code):
+    """Returns the offset of the beginning of each line of some code, indexed from 1."""
+    offsets = [0, 0]
+    for line in code.splitlines(keepends=True):
+        offsets.append(offsets[-1] + len(line))
+    return offsets
+
+
+def _strip_comments(code):
+    """
+    Removes the comments and the blank lines of some Python code, keeping the content of the strings.
+
+    Args:
+        code (str): The Python code.
+
+    Returns:
+        (str): The code without comments and blank lines.
+    """
+    offsets = _line_offsets(code)
+    edits = []
+    string_lines = set()  # Lines inside multiline strings
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if token.type == tokenize.COMMENT:
+            start = offsets[token.start[0]] + token.start[1]
+            line_start = offsets[token.start[0]]
+            start = line_start + len(code[line_start:start].rstrip(" \t"))
+            edits.append((start, offsets[token.end[0]] + token.end[1], ""))
+        elif token.type == tokenize.STRING:
+            string_lines.update(range(token.start[0] + 1, token.end[0] + 1))
+    lines = apply_edits(code, edits).splitlines()
+    return "\n".join(
+        line
+        for number, line in enumerate(lines, 1)
+        if line.strip() or number in string_lines
+    )
+
+
+def _collapse_bodies(code, max_tokens):
+    """
+    Collapses the bodies of the nested blocks of some Python code while it exceeds a token budget.
+
+    The nested functions are collapsed first, from the largest, and then the rest of the nested
+    blocks. The body of a collapsed block is replaced by "..." followed by its return statements,
+    so the signatures and returns are kept. The clauses of a block, such as "else", "except" or
+    "finally", are collapsed separately. The savings of the blocks inside a collapsed block are
+    only counted once.
+
+    Args:
+        code (str): The Python code of an element, without indentation.
+        max_tokens (int): The token budget.
+
+    Returns:
+        (str): The code with some bodies collapsed.
+    """
+    tokens = count_tokens(code)
+    if tokens <= max_tokens:
+        return code
+    lines = code.splitlines()
+    root = ast.parse(code).body[0]
+    functions = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+    def starts_line(statement):
+        return (
+            not lines[statement.lineno - 1]
+            .encode("utf-8")[: statement.col_offset]
+            .strip()
+        )
+
+    candidates = []  # (is a function, statements of the block)
+    for node in ast.walk(root):
+        if node is root:
+            continue
+        for field in ("body", "orelse", "finalbody"):
+            statements = getattr(node, field, None)
+            if not isinstance(statements, list) or not statements:
+                continue
+            if (
+                field == "orelse"
+                and isinstance(node, ast.If)
+                and isinstance(statements[0], ast.If)
+                and lines[statements[0].lineno - 1].lstrip().startswith("elif")
+            ):
+                continue  # The blocks of an "elif" are collapsed on their own
+            if starts_line(statements[0]):
+                candidates.append(
+                    (field == "body" and isinstance(node, functions), statements)
+                )
+    candidates.sort(
+        key=lambda candidate: (
+            not candidate[0],
+            candidate[1][0].lineno - candidate[1][-1].end_lineno,
+        )
+    )
+    collapsed = []  # (first line, last line, replacement lines, saved tokens)
+    for _, statements in candidates:
+        if tokens <= max_tokens:
+            break
+        first, last = statements[0].lineno, statements[-1].end_lineno
+        if any(start <= first and last <= end for start, end, _, _ in collapsed):
+            continue  # Inside a collapsed block
+        indent = lines[first - 1][
+            : len(lines[first - 1]) - len(lines[first - 1].lstrip())
+        ]
+        replacement = [indent + "..."]
+        returns = []
+        pending = list(statements)
+        while pending:  # Returns of the block, not of its nested functions or classes
+            child = pending.pop()
+            if isinstance(child, ast.Return):
+                returns.append(child)
+            elif not isinstance(child, functions + (ast.ClassDef, ast.Lambda)):
+                pending.extend(ast.iter_child_nodes(child))
+        for child in sorted(returns, key=lambda child: child.lineno):
+            statement = "\n".join(lines[child.lineno - 1 : child.end_lineno])
+            replacement.extend(
+                textwrap.indent(textwrap.dedent(statement), indent).splitlines()
+            )
+        removed = "\n".join(lines[first - 1 : last])
+        saved = count_tokens(removed) - count_tokens("\n".join(replacement))
+        inner = [block for block in collapsed if first <= block[0] and block[1] <= last]
+        tokens -= saved - sum(block[3] for block in inner)  # Already counted
+        collapsed = [block for block in collapsed if block not in inner]
+        collapsed.append((first, last, replacement, saved))
+    for first, last, replacement, _ in sorted(collapsed, reverse=True):
+        lines[first - 1 : last] = replacement
+    return "\n".join(lines)
+
+
+def _elide_literals(code, max_length):
+    """
+    Shortens the string and bytes literals of some Python code longer than a maximum length, except the docstring.
+
+    Args:
+        code (str): The Python code of an element, without indentation.
+        max_length (int): The maximum length of a literal.
+
+    Returns:
+        (str): The code with the long literals shortened and ended with "...".
+    """
+    root = ast.parse(code).body[0]
+    docstring_line = (
+        root.body[0].lineno
+        if root.body
+        and isinstance(root.body[0], ast.Expr)
+        and isinstance(root.body[0].value, ast.Constant)
+        and isinstance(root.body[0].value.value, str)
+        else None
+    )
+    offsets = _line_offsets(code)
+    edits = []
+    for token in tokenize.generate_tokens(io.StringIO(code).readline):
+        if (
+            token.type != tokenize.STRING
+            or len(token.string) <= max_length
+            or token.start[0] == docstring_line
+        ):
+            continue
+        try:
+            value = ast.literal_eval(token.string)
+        except (ValueError, SyntaxError):  # e.g. f-strings
+            continue
+        ellipsis = b"..." if isinstance(value, bytes) else "..."
+        replacement = repr(value[: max_length // 2] + ellipsis)
+        edits.append(
+            (
+                offsets[token.start[0]] + token.start[1],
+                offsets[token.end[0]] + token.end[1],
+                replacement,
+            )
+        )
+    return apply_edits(code, edits)
+
+
+def minimize_python(
+    element,
+    indent="",
+    max_tokens=custom_params.max_element_tokens,
+    max_literal_length=custom_params.max_literal_length,
+):
+    """
+    Minimizes the source code of a Python element for its prompt.
+
+    The comments and blank lines are stripped, the bodies of the nested blocks are collapsed while the
+    element exceeds the token budget, and the long string literals are elided. The signatures, return
+    statements and the docstring of the element are kept. If the element can not be parsed or
+    minimized, it is returned unchanged.
+
+    Args:
+        element (str): The source code of the element, from the beginning of its definition.
+        indent (str, optional): The indentation of the line of the definition (default is "").
+        max_tokens (int, optional): The token budget of the element (default is custom_params.max_element_tokens).
+        max_literal_length (int, optional): The maximum length of a string literal (default is
+            custom_params.max_literal_length).
+
+    Returns:
+        (str): The minimized source code of the element, without indentation.
+    """
+    try:
+        code = textwrap.dedent(indent + element)
+        code = _strip_comments(code)
+        code = _collapse_bodies(code, max_tokens)
+        return _elide_literals(code, max_literal_length)
+    except Exception:  # The prompt falls back to the element as written
+        return element
@@ -42,6 +42,7 @@ setup(
     package_data={"config_files": ["*.yaml"], "prompts": ["*.txt"]},
     include_package_data=True,
     install_requires=parse_requirements(PARENT / "requirements.txt"),
+    extras_require={"tiktoken": ["tiktoken"]},
     keywords="deep-learning, Large Language Models, LLM, Programming",
     entry_points={
         "console_scripts": [
@@ -29,7 +29,10 @@ def mock_completion(mocker):
 
 
 @pytest.fixture(autouse=True)
-def modify_custom_vars(monkeypatch):
+def modify_custom_vars(monkeypatch, tmp_path):
     # Change the value of the 'rewrite' variable to True
     monkeypatch.setattr(custom_params, "rewrite", False)
     monkeypatch.setattr(custom_params, "surname", "_toRemove")
+    # Keep the completion cache of the tests out of the user cache
+    monkeypatch.setattr(custom_params, "cache_path", tmp_path / "cache.sqlite")
+    monkeypatch.setattr(custom_params, "manifest_name", tmp_path / "manifest.json")
@@ -1,4 +1,6 @@
 import os
+import shutil
+import asyncio
 import pytest
 from llmcode.utils import auxiliary
 from llmcode.utils.auxiliary import _apply_to_scripts
@@ -56,3 +58,26 @@ def test_apply_to_scripts():
         ".py",
         "no_matter",
     )
+
+
+def test_apply_to_scripts_shared_budget(good_example_python_file, tmp_path):
+    for i in range(6):
+        shutil.copy(good_example_python_file, tmp_path / f"script_{i}.py")
+    in_flight = [0, 0]  # Current and maximum number of concurrent queries
+
+    async def query(semaphore):
+        async with semaphore:
+            in_flight[0] += 1
+            in_flight[1] = max(in_flight)
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+
+    async def document_with_queries(file, stop_flag, semaphore, *args, **kwargs):
+        await asyncio.gather(*(query(semaphore) for _ in range(4)))
+        with open(file, "a") as f:
+            f.write("# documented\n")
+
+    assert _apply_to_scripts(tmp_path, document_with_queries, ".py", [], max_workers=3)
+    assert 1 < in_flight[1] <= 3
+    for i in range(6):
+        assert (tmp_path / f"script_{i}.py").read_text().endswith("# documented\n")
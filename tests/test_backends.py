@@ -0,0 +1,79 @@
+import asyncio
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from aiohttp import web
+from llmcode.utils import backends, completion
+from llmcode.utils.scheduler import RateLimiter
+
+
+def test_resolve_backend():
+    code = (
+        "from llmcode.utils.backends import resolve_backend\n"
+        "print(resolve_backend('get_completion_openai').__name__)"
+    )
+    result = subprocess.run(  # On a fresh import
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parents[1],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert result.stdout.strip() == "get_completion_openai"
+    assert (
+        backends.resolve_backend("get_completion_openai")
+        is completion.get_completion_openai
+    )
+    assert (
+        backends.resolve_backend("get_completion_local_async")
+        is backends.get_completion_local_async
+    )
+    assert (
+        backends.resolve_backend("os.path:basename") is __import__("os").path.basename
+    )
+    with pytest.raises(ValueError):
+        backends.resolve_backend("non_existing_backend")
+
+
+def test_local_backend():
+    requests = []
+
+    async def chat_completions(request):
+        body = await request.json()
+        requests.append((request.headers.get("Authorization"), body))
+        if len(requests) == 1:
+            return web.Response(text="<html>Busy</html>", status=503)
+        content = f'"""Docstring of {body["messages"][0]["content"]}"""'
+        return web.json_response(
+            {"choices": [{"message": {"content": content}}]},
+            headers={"x-ratelimit-limit-requests": "600"},
+        )
+
+    async def run():
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", chat_completions)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        backend = backends.LocalBackend(f"http://127.0.0.1:{port}/v1/", "key", 4, 60)
+        try:
+            with pytest.raises(backends.BackendError) as error:
+                await backend.acomplete("f")
+            assert error.value.http_status == 503
+            limiter = RateLimiter()
+            await completion.run_with_timeout_async(
+                backend.acomplete, args=("f",), timeout=10, rate_limiter=limiter
+            )
+            assert limiter.requests is not None  # Adopted from the headers
+            return await asyncio.gather(*(backend.acomplete(str(i)) for i in range(8)))
+        finally:
+            await backends.close_sessions()
+            await runner.cleanup()
+
+    results = asyncio.run(run())
+    assert results == [f'"""Docstring of {i}"""' for i in range(8)]
+    assert requests[2][0] == "Bearer key"
+    assert requests[1][1]["model"] == completion.completion_params.model
@@ -0,0 +1,86 @@
+import json
+import shutil
+from llmcode.cfg import custom_params
+from llmcode.utils import auxiliary
+from llmcode.utils.batch import BatchResults
+from llmcode.utils.file_utils import read_content
+
+
+def test_batch_export_import(good_example_python_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(custom_params, "rewrite", True)
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(good_example_python_file, project / "script.py")
+    original = read_content(project / "script.py")
+    requests_path = tmp_path / "requests.jsonl"
+    n_requests = auxiliary.export_batch(
+        project, requests_path, exclude=[], languages=["python"], overwrite=True
+    )
+    requests = [json.loads(line) for line in open(requests_path)]
+    assert n_requests == len(requests) > 0
+    assert read_content(project / "script.py") == original  # Not modified
+    assert requests[0]["url"] == "/v1/chat/completions"
+    assert requests[0]["custom_id"].startswith("script.py:")
+    # Exporting again gives the same requests
+    auxiliary.export_batch(
+        project,
+        tmp_path / "again.jsonl",
+        exclude=[],
+        languages=["python"],
+        overwrite=True,
+    )
+    assert read_content(tmp_path / "again.jsonl") == read_content(requests_path)
+    # Local stand-in of the results of the batch
+    with open(tmp_path / "results.jsonl", "w") as f:
+        for i, request in enumerate(requests):
+            body = {"choices": [{"message": {"content": f'"""Batch docstring {i}"""'}}]}
+            result = {
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "body": body},
+                "error": None,
+            }
+            f.write(json.dumps(result) + "\n")
+    assert auxiliary.format_code(
+        project,
+        exclude=[],
+        languages=["python"],
+        overwrite=True,
+        use_cache=False,
+        get_completion=BatchResults(tmp_path / "results.jsonl").get_completion_batch,
+    )
+    content = read_content(project / "script.py")
+    assert all(f"Batch docstring {i}" in content for i in range(len(requests)))
+    assert "TODO" not in content
+
+
+def test_batch_import_partial(good_example_python_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(custom_params, "rewrite", True)
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(good_example_python_file, project / "script.py")
+    requests_path = tmp_path / "requests.jsonl"
+    auxiliary.export_batch(
+        project, requests_path, exclude=[], languages=["python"], overwrite=True
+    )
+    requests = [json.loads(line) for line in open(requests_path)]
+    assert len(requests) > 1
+    # Results of the first request only
+    with open(tmp_path / "results.jsonl", "w") as f:
+        body = {"choices": [{"message": {"content": '"""Batch docstring"""'}}]}
+        result = {
+            "custom_id": requests[0]["custom_id"],
+            "response": {"status_code": 200, "body": body},
+            "error": None,
+        }
+        f.write(json.dumps(result) + "\n")
+    auxiliary.format_code(
+        project,
+        exclude=[],
+        languages=["python"],
+        overwrite=True,
+        use_cache=False,
+        get_completion=BatchResults(tmp_path / "results.jsonl").get_completion_batch,
+    )
+    content = read_content(project / "script.py")
+    assert content.count("Batch docstring") == 1
+    assert "TODO" not in content  # The missing elements are left untouched
@@ -0,0 +1,28 @@
+import ast
+from benchmarks.bench_python import compare, generate_module, run_benchmarks
+
+
+def test_generate_module():
+    for shape in ("flat", "nested"):
+        source = generate_module(500, shape)
+        ast.parse(source)
+        assert source.count("\n") >= 500
+
+
+def test_run_benchmarks():
+    results = run_benchmarks([50], ["flat"], min_time=0)
+    assert {key.split("/")[0] for key in results} == {
+        "tokenize",
+        "extract",
+        "read",
+        "index",
+        "select",
+        "rewrite",
+        "replace",
+    }
+    assert not compare(results, results)
+    faster = {
+        key: {"ops": 2 * result["ops"], "peak_kib": result["peak_kib"]}
+        for key, result in results.items()
+    }
+    assert len(compare(results, faster)) == len(results)
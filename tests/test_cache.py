@@ -0,0 +1,74 @@
+import asyncio
+from llmcode.utils.cache import CompletionCache
+from llmcode.utils import document
+from llmcode.cfg.custom_params import document_prompts
+
+
+def test_completion_cache(tmp_path):
+    cache = CompletionCache(tmp_path / "cache.sqlite", max_size=1000)
+    key = CompletionCache.key("prompt", {"model": "a"})
+    assert key != CompletionCache.key("prompt", {"model": "b"})
+    assert key != CompletionCache.key("other prompt", {"model": "a"})
+    assert cache.get(key) is None
+    cache.set(key, "response")
+    assert cache.get(key) == "response"
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+    # The completions persist between runs
+    cache = CompletionCache(tmp_path / "cache.sqlite", max_size=1000)
+    assert cache.get(key) == "response"
+    cache.close()
+
+
+def test_completion_cache_lru_eviction(tmp_path):
+    cache = CompletionCache(tmp_path / "cache.sqlite", max_size=3 * (64 + 100))
+    keys = [CompletionCache.key(str(i), {}) for i in range(4)]
+    for key in keys[:3]:
+        cache.set(key, "x" * 100)
+    cache.get(keys[0])  # The first entry is now the most recently used
+    cache.set(keys[3], "x" * 100)
+    assert cache.get(keys[1]) is None  # Least recently used entry evicted
+    assert all(cache.get(key) is not None for key in (keys[0], keys[2], keys[3]))
+    assert cache.stats()["entries"] == 3
+    cache.close()
+
+
+def test_doc_element_cache(tmp_path):
+    calls = []
+
+    def completion(prompt):
+        calls.append(prompt)
+        return '"""Cached docstring"""'
+
+    cache = CompletionCache(tmp_path / "cache.sqlite", max_size=10**6)
+    for _ in range(2):
+        result = asyncio.run(
+            document.doc_element_async(
+                "def f(): pass",
+                document_prompts["python"]["function"],
+                completion,
+                cache=cache,
+            )
+        )
+        assert result == '"""Cached docstring"""'
+    assert len(calls) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.close()
+
+    def unusable(prompt):
+        calls.append(prompt)
+        return "No docstring here"
+
+    calls.clear()
+    cache = CompletionCache(tmp_path / "unusable.sqlite", max_size=10**6)
+    for _ in range(2):
+        asyncio.run(
+            document.doc_element_async(
+                "def g(): pass",
+                document_prompts["python"]["function"],
+                unusable,
+                cache=cache,
+            )
+        )
+    assert len(calls) == 2  # Unusable answers are not replayed
+    cache.close()
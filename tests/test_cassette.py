@@ -0,0 +1,55 @@
+import asyncio
+import time
+import pytest
+from llmcode.utils import backends, completion
+from llmcode.utils.backends import resolve_backend
+from llmcode.utils.cassette import Cassette
+from llmcode.utils.scheduler import RateLimiter
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    def recorded_backend(prompt):
+        calls.append(prompt)
+        return f'"""Docstring of {prompt}"""'
+
+    monkeypatch.setitem(backends._backends, "recorded_backend", recorded_backend)
+    return calls
+
+
+def test_cassette_record_replay(tmp_path, calls):
+    path = tmp_path / "cassette.jsonl"
+    recorder = Cassette(path, "record", "recorded_backend")
+    prompts = [f"prompt {i}" for i in range(5)]
+
+    async def run(cassette):
+        return await asyncio.gather(*(cassette.complete(p) for p in prompts))
+
+    recorded = asyncio.run(run(recorder))
+    assert len(calls) == 5
+    replayed = asyncio.run(run(Cassette(path)))
+    assert replayed == recorded and len(calls) == 5  # Not queried again
+    with pytest.raises(KeyError):
+        asyncio.run(Cassette(path).complete("not recorded"))
+    assert (
+        resolve_backend("get_completion_cassette_async").__module__
+        == "llmcode.utils.cassette"
+    )
+
+
+def test_cassette_simulation(tmp_path, calls):
+    path = tmp_path / "cassette.jsonl"
+    asyncio.run(Cassette(path, "record", "recorded_backend").complete("p"))
+    assert calls == ["p"]
+    cassette = Cassette(path, latency=(0.01, 0.02), error_rate=0.5, seed=0)
+    limiter = RateLimiter(max_retries=20, backoff_base=0.001, backoff_max=0.001)
+    start = time.perf_counter()
+    results = asyncio.run(
+        completion.run_with_timeout_async(
+            cassette.complete, args=("p",), timeout=10, rate_limiter=limiter
+        )
+    )
+    assert results == '"""Docstring of p"""'  # The simulated errors are retried
+    assert time.perf_counter() - start >= 0.01
@@ -1,4 +1,8 @@
+import asyncio
 import time
+import threading
+from types import SimpleNamespace
+import openai
 from llmcode.utils import completion
 
 
@@ -14,3 +18,141 @@ def test_run_with_timeout():
     assert (
         completion.run_with_timeout(example_function, args=(0.1,), timeout=0.05) is None
     )  # Not run in time
+
+
+def failing_function():
+    raise ValueError("failed")
+
+
+def test_run_with_timeout_error():
+    metrics = completion.get_metrics()
+    metrics.reset()
+    assert completion.run_with_timeout(failing_function, timeout=10) is None
+    assert completion.run_with_timeout(example_function, args=(0.01,), timeout=10)
+    assert metrics.summary()["counters"] == {
+        'completions{outcome="error"}': 1,
+        'completions{outcome="ok"}': 1,
+    }
+
+
+async def example_coroutine(sleep_time):
+    await asyncio.sleep(sleep_time)
+    return True
+
+
+def test_run_with_timeout_async():
+    for function in (example_function, example_coroutine):
+        assert asyncio.run(
+            completion.run_with_timeout_async(function, args=(0.01,), timeout=10)
+        )  # Run it time
+    assert (
+        asyncio.run(
+            completion.run_with_timeout_async(
+                example_coroutine, args=(1,), timeout=0.05
+            )
+        )
+        is None
+    )  # Not run in time
+
+
+def test_completion_executor_bounded_threads():
+    executor = completion.CompletionExecutor(max_threads=2)
+    live = set()
+
+    def register(sleep_time):
+        live.add(threading.current_thread().name)
+        time.sleep(sleep_time)
+        return True
+
+    async def run_all():
+        return await asyncio.gather(
+            *(executor.submit(register, args=(0.01,), timeout=10) for _ in range(10))
+        )
+
+    assert all(asyncio.run(run_all()))
+    assert len(live) <= 2
+
+
+def test_cancel_on_stop():
+    stop_flag = threading.Event()
+
+    async def query():
+        return await completion.run_with_timeout_async(
+            example_coroutine, args=(10,), timeout=20
+        )
+
+    async def stop_soon():
+        await asyncio.sleep(0.05)
+        stop_flag.set()
+
+    async def run_all():
+        return await completion.cancel_on_stop(
+            asyncio.gather(query(), query(), stop_soon()), stop_flag
+        )
+
+    start = time.time()
+    assert asyncio.run(run_all()) == [None, None, None]
+    assert time.time() - start < 5
+
+
+def fake_stream(received):
+    for content in [
+        'Here it is:\n""',
+        '"\n    Summary.\n',
+        '    """',
+        "\nMore text",
+        " that is never read",
+    ]:
+        received.append(content)
+        yield SimpleNamespace(choices=[SimpleNamespace(delta={"content": content})])
+
+
+async def fake_stream_async(received):
+    for chunk in fake_stream(received):
+        yield chunk
+
+
+def test_get_completion_openai_stream(mocker):
+    expected = 'Here it is:\n"""\n    Summary.\n    """'
+    received = []
+    mocker.patch.object(
+        openai.ChatCompletion, "create", return_value=fake_stream(received)
+    )
+    assert completion.get_completion_openai_stream("prompt") == expected
+    assert len(received) == 3  # Stopped after the closing quotes
+    received.clear()
+
+    async def acreate(*args, **kwargs):
+        return fake_stream_async(received)
+
+    mocker.patch.object(openai.ChatCompletion, "acreate", acreate)
+    assert (
+        asyncio.run(completion.get_completion_openai_stream_async("prompt")) == expected
+    )
+    assert len(received) == 3
+
+
+def test_openai_client(mocker):
+    sessions = []
+
+    async def acreate(*args, **kwargs):
+        sessions.append(openai.aiosession.get())
+        message = SimpleNamespace(content=kwargs["messages"][0]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    mocker.patch.object(openai.ChatCompletion, "acreate", acreate)
+    client = completion.get_client()
+    assert client is completion.get_client()
+    assert openai.requestssession is client.session
+    assert client.params["model"] == completion.completion_params.model
+
+    async def run():
+        results = await asyncio.gather(
+            *(completion.get_completion_openai_client_async(str(i)) for i in range(3))
+        )
+        await completion.close_client()
+        return results
+
+    assert asyncio.run(run()) == ["0", "1", "2"]
+    assert sessions[0] is not None and all(s is sessions[0] for s in sessions)
+    assert sessions[0].closed and openai.aiosession.get() is None
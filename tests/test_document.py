@@ -1,23 +1,15 @@
 import shutil
+import time
+import random
 import os
 import re
-import inspect
 from llmcode.utils import document
 from llmcode.cfg.custom_params import document_prompts
-from llmcode.utils.completion import get_completion_openai
-from llmcode.utils import completion
+from llmcode.utils.cassette import Cassette
 from llmcode.utils.file_utils import read_content
 
 
-def find_functions_in_module(module, match):
-    matching_functions = []
-    for name, obj in inspect.getmembers(module):
-        if inspect.isfunction(obj) and match in name:
-            matching_functions.append(obj)
-    return matching_functions
-
-
-def test_doc_element():
+def test_doc_element(tmp_path):
     my_function = """
     def sum(a,b):
         return a+b
@@ -26,22 +18,19 @@ def test_doc_element():
     class Definition:
         NAME = "Rigoberto"
     """
-    for completion_function in find_functions_in_module(completion, "get_completion"):
-        result = document.doc_element(
-            element=my_function,
-            prompt=document_prompts["python"]["function"],
-            get_completion=completion_function,
+    path = tmp_path / "cassette.jsonl"
+    recorder = Cassette(path, "record", f"{__name__}:fake_completion")
+    for element, element_type in ((my_function, "function"), (my_class, "class")):
+        prompt = document_prompts["python"][element_type]
+        recorded = document.doc_element(element, prompt, recorder.complete)
+        assert recorded.startswith('"""Docstring number')
+        # Replayed offline, without querying any model
+        assert (
+            document.doc_element(element, prompt, Cassette(path).complete) == recorded
         )
-        assert result is None or isinstance(result, str)
-        result = document.doc_element(
-            element=my_class,
-            prompt=document_prompts["python"]["class"],
-            get_completion=completion_function,
-        )
-        assert result is None or isinstance(result, str)
 
 
-def test_doc_python_file(good_example_python_file):
+def test_doc_python_file(good_example_python_file, tmp_path):
     new_file = str(good_example_python_file).replace(
         good_example_python_file.stem,
         good_example_python_file.stem + "_toRemove",
@@ -51,7 +40,9 @@ def test_doc_python_file(good_example_python_file):
     test_message = " # TODO: Test message"
     document.doc_python_file(
         script=new_file,
-        get_completion=get_completion_openai,
+        get_completion=Cassette(
+            tmp_path / "cassette.jsonl", "record", f"{__name__}:fake_completion"
+        ).complete,
         prompts=document_prompts["python"],
         TODO_message=test_message,
     )
@@ -65,3 +56,93 @@ def test_doc_python_file(good_example_python_file):
         " ", ""
     ) == prev_content.replace("\n", "").replace("\t", "").replace(" ", "")
     os.remove(new_file)
+
+
+def fake_completion(prompt):
+    time.sleep(random.uniform(0, 0.02))
+    return f'"""Docstring number {len(prompt)}"""'
+
+
+def test_doc_python_file_concurrent(good_example_python_file, tmp_path):
+    contents = []
+    for max_workers in (1, 8):
+        new_file = tmp_path / f"example_{max_workers}.py"
+        shutil.copy(good_example_python_file, new_file)
+        document.doc_python_file(
+            script=new_file,
+            get_completion=fake_completion,
+            prompts=document_prompts["python"],
+            overwrite=True,
+            max_workers=max_workers,
+        )
+        contents.append(read_content(new_file))
+    assert contents[0] == contents[1]
+    assert "Docstring number" in contents[0]
+
+
+def test_doc_python_file_edits(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "class A:\n    @property\n    def f(self):\n        return 1\n\n\n"
+        "class B:\n    @property\n    def f(self):\n        return 1\n\n\n"
+        "def one_liner(): return 2\n\n\n"
+        "def documented():\n    '''Old docstring'''\n    return 3\n"
+    )
+    document.doc_python_file(
+        script=script,
+        get_completion=lambda prompt: '"""New docstring"""',
+        prompts=document_prompts["python"],
+        overwrite=True,
+    )
+    new_content = read_content(script)
+    assert new_content == (
+        'class A:\n    """New docstring"""\n    @property\n    def f(self):\n'
+        '        """New docstring"""\n        return 1\n\n\n'
+        'class B:\n    """New docstring"""\n    @property\n    def f(self):\n'
+        '        """New docstring"""\n        return 1\n\n\n'
+        'def one_liner():\n    """New docstring"""\n    return 2\n\n\n'
+        'def documented():\n    """New docstring"""\n    return 3\n'
+    )
+
+
+def test_doc_python_file_pack(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text(
+        "def a():\n    return 1\n\n\n"
+        "def b(x):\n    return x\n\n\n"
+        "class C:\n    def c(self): return 3\n"
+    )
+    prompts = []
+
+    def packed_completion(prompt):
+        prompts.append(prompt)
+        if "NAME: " in prompt:  # Packed query, leave out "b"
+            return '```json\n{"a": "Docstring of a.", "C.c": "Docstring of c.\\n\\nReturns:\\n    (int): 3."}\n```'
+        return '"""Single docstring"""'
+
+    document.doc_python_file(
+        script=script,
+        get_completion=packed_completion,
+        prompts=document_prompts["python"],
+        pack=True,
+    )
+    assert len(prompts) == 3  # The pack, the class and the fallback of "b"
+    assert read_content(script) == (
+        'def a():\n    """\n    Docstring of a.\n    """\n    return 1\n\n\n'
+        'def b(x):\n    """Single docstring"""\n    return x\n\n\n'
+        'class C:\n    """Single docstring"""\n    def c(self):\n        """\n'
+        "        Docstring of c.\n\n        Returns:\n            (int): 3.\n"
+        '        """\n        return 3\n'
+    )
+
+
+def test_doc_python_file_unchanged(tmp_path):
+    script = tmp_path / "script.py"
+    script.write_text("def documented():\n    '''Docstring'''\n    return 3\n")
+    os.utime(script, ns=(0, 0))
+    assert document.doc_python_file(
+        script=script,
+        get_completion=lambda prompt: '"""New docstring"""',
+        prompts=document_prompts["python"],
+    )
+    assert os.stat(script).st_mtime_ns == 0  # Nothing to document, not written
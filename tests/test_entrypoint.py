@@ -0,0 +1,49 @@
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+HEAVY_MODULES = ["openai", "aiohttp", "tqdm", "llmcode.utils.document"]
+
+
+def run_python(code, *options):
+    return subprocess.run(
+        [sys.executable, *options, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def test_help_imports():
+    code = (
+        "import sys\n"
+        "from llmcode.entrypoint import main\n"
+        "sys.argv = ['docu', '--help']\n"
+        "try:\n"
+        "    main()\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print([module for module in {HEAVY_MODULES} if module in sys.modules])"
+    )
+    result = run_python(code)
+    assert "--metrics-json" in result.stdout
+    assert result.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_import_time():
+    result = run_python("import llmcode.entrypoint", "-X", "importtime")
+    imported = {line.split("|")[-1].strip() for line in result.stderr.splitlines()}
+    assert "llmcode.entrypoint" in imported
+    assert not imported.intersection(HEAVY_MODULES)  # Deferred until needed
+
+
+def test_execute_with_path():
+    result = subprocess.run(
+        [sys.executable, "-m", "llmcode.entrypoint", ".", "--execute", "plan.json"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 2 and "--execute" in result.stderr
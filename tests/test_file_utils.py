@@ -78,3 +78,86 @@ def test_ensure_folder_exist(good_example_python_file):
 def test_get_temp_folder():
     folder = file_utils.get_temp_folder()
     assert Path(folder).exists()
+
+
+def test_iter_python_elements(good_example_python_file):
+    source = file_utils.read_python(good_example_python_file)
+    spans = list(file_utils.iter_python_elements(source))
+    assert [span.qualname for span in spans] == [
+        "ExampleClass",
+        "ExampleClass.__init__",
+        "ExampleClass.example_method",
+        "format_code",
+    ]
+    for span in spans:
+        assert source[span.start :].startswith(("def", "class"))
+        assert span.start < span.body_start < span.end
+    # Nested elements at any depth, docstrings and non-ASCII content
+    source = (
+        'class A:\n    """Dóc"""\n\n    def f(self):\n'
+        '        def g():\n            return "é"\n\n        return g\n\n\n'
+        "if True:\n    async def h():\n        pass\n"
+    )
+    spans = list(file_utils.iter_python_elements(source))
+    assert [(span.type, span.qualname) for span in spans] == [
+        ("class", "A"),
+        ("function", "A.f"),
+        ("function", "A.f.<locals>.g"),
+        ("function", "h"),
+    ]
+    assert source[spans[0].docstring_start : spans[0].docstring_end] == '"""Dóc"""'
+    assert source[spans[2].start : spans[2].end] == 'def g():\n            return "é"'
+    assert spans[1].docstring_start is None
+    with pytest.raises(SyntaxError):
+        list(file_utils.iter_python_elements("def f(:\n    pass\n"))
+
+
+def test_apply_edits():
+    assert file_utils.apply_edits("abcdef", []) == "abcdef"
+    edits = [(4, 6, ""), (3, 3, "X"), (0, 1, "Z"), (3, 3, "Y")]
+    assert file_utils.apply_edits("abcdef", edits) == "ZbcXYd"
+    with pytest.raises(ValueError):
+        file_utils.apply_edits("abcdef", [(0, 3, "x"), (2, 4, "y")])
+
+
+def test_write_atomic(tmp_path):
+    path = tmp_path / "script.py"
+    path.write_text("old")
+    os.chmod(path, 0o640)
+    file_utils.write_atomic(path, "new ñ")
+    assert path.read_text(encoding="utf-8") == "new ñ"
+    assert os.stat(path).st_mode & 0o777 == 0o640
+    assert os.listdir(tmp_path) == ["script.py"]  # No temporary file left
+    # The scripts are written back with the encoding they were read with
+    for raw in (
+        "# -*- coding: latin-1 -*-\ns = 'ñ'\n".encode("latin-1"),
+        "\ufeffs = 'ñ'\n".encode("utf-8"),
+    ):
+        path.write_bytes(raw)
+        source, encoding = file_utils.read_python(path, with_encoding=True)
+        file_utils.write_atomic(path, source, encoding)
+        assert path.read_bytes() == raw
+
+
+def test_walk_scripts(tmp_path):
+    for name in [
+        "a.py",
+        "b.cpp",
+        "notes.txt",
+        "pkg/c.py",
+        "pkg/build/d.py",
+        "build/e.py",
+        "vendor/lib/f.py",
+        ".git/g.py",
+    ]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("")
+    found = [
+        (path.relative_to(tmp_path).as_posix(), suffix)
+        for path, suffix in file_utils.walk_scripts(
+            tmp_path, {".py", ".cpp"}, exclude=["build", "vendor/lib"]
+        )
+    ]
+    assert found == [("a.py", ".py"), ("b.cpp", ".cpp"), ("pkg/c.py", ".py")]
+    # The scripts are yielded lazily
+    assert next(file_utils.walk_scripts(tmp_path, {".py"}))[0].name == "a.py"
@@ -0,0 +1,42 @@
+import shutil
+import subprocess
+import pytest
+from llmcode.utils.file_utils import list_submodule_directories
+from llmcode.utils.git import list_submodules, read_gitmodules, read_index_gitlinks
+
+
+def git(repository, *args):
+    subprocess.run(["git", *args], cwd=repository, check=True, capture_output=True)
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+@pytest.mark.parametrize("index_version", [2, 3, 4])
+def test_list_submodules(tmp_path, index_version):
+    repository = tmp_path / "repo"
+    (repository / "src").mkdir(parents=True)
+    (repository / "src" / "main.py").write_text("")
+    git(repository, "init", "-q")
+    git(repository, "add", "src/main.py")
+    for path in ["libs/first", "src/vendor/second"]:
+        git(
+            repository,
+            "update-index",
+            "--add",
+            "--cacheinfo",
+            f"160000,{'1' * 40},{path}",
+        )
+    if index_version == 3:  # Extended flags are only written for intent-to-add entries
+        (repository / "new.py").write_text("")
+        git(repository, "add", "--intent-to-add", "new.py")
+    git(repository, "update-index", "--index-version", str(index_version))
+    (repository / ".gitmodules").write_text(
+        '[submodule "third"]\n\tpath = third\n\turl = https://example.com/third.git\n'
+    )
+    assert read_index_gitlinks(repository / ".git" / "index") == [
+        "libs/first",
+        "src/vendor/second",
+    ]
+    assert read_gitmodules(repository / ".gitmodules") == ["third"]
+    assert list_submodules(repository) == ["libs/first", "src/vendor/second", "third"]
+    assert list_submodule_directories(repository / "src") == ["vendor/second"]
+    assert list_submodule_directories(tmp_path) == []
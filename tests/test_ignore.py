@@ -0,0 +1,82 @@
+from llmcode.utils.file_utils import walk_scripts
+from llmcode.utils.ignore import IgnoreSpec, compile_pattern, find_missing
+
+
+def test_compile_pattern():
+    def matches(pattern, path):
+        return bool(compile_pattern(pattern).regex.match(path))
+
+    assert matches("build", "build") and matches("build", "src/build")
+    assert matches("/build", "build") and not matches("/build", "src/build")
+    assert matches("doc/*.py", "doc/a.py") and not matches("doc/*.py", "doc/x/a.py")
+    assert matches("**/venv", "a/b/venv") and matches("src/**", "src/a/b.py")
+    assert matches("a/**/b", "a/b") and matches("a/**/b", "a/x/y/b")
+    assert matches("file?.py", "file1.py") and matches("[!a]*.py", "b.py")
+    assert not matches("[!a]*.py", "a.py")
+    assert compile_pattern("# comment") is None and compile_pattern("   ") is None
+    assert compile_pattern("build/").directory_only
+    assert compile_pattern("!keep.py").negated
+
+
+def test_ignore_spec(tmp_path):
+    root = tmp_path / "repo"
+    for name in [
+        "main.py",
+        "generated.py",
+        "keep_generated.py",
+        "venv/lib/site.py",
+        "src/app.py",
+        "src/legacy/old.py",
+        "src/tmp.py",
+        "docs/conf.py",
+    ]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text("")
+    (root / ".git" / "info").mkdir(parents=True)
+    (root / ".git" / "info" / "exclude").write_text("docs/\n")
+    (root / ".gitignore").write_text("venv/\n*generated.py\n!keep_generated.py\n")
+    (root / "src" / ".gitignore").write_text("/legacy\n")
+    (root / ".llmcodeignore").write_text("tmp.py\n")
+
+    def walk(spec, directory=root):
+        return [
+            path.relative_to(directory).as_posix()
+            for path, _ in walk_scripts(directory, {".py"}, spec)
+        ]
+
+    spec = IgnoreSpec(root, ["main.py"], gitignore=True, ignore_file=".llmcodeignore")
+    assert walk(spec) == ["keep_generated.py", "src/app.py"]
+    # A subfolder of the repository honors the ignore files of its parents
+    (root / "src" / "legacy" / "more.py").write_text("")
+    spec = IgnoreSpec(root / "src", gitignore=True)
+    assert walk(spec, root / "src") == ["app.py", "tmp.py"]
+    # Without the ignore files, only the patterns are used
+    assert len(walk(IgnoreSpec(root, ["venv"]))) == 8
+    # Only the literal paths are checked, the patterns are not searched for
+    assert find_missing(root, ["venv", "site.py", "src/app.py", "*.txt"]) == []
+    assert find_missing(root, ["missing.py", "src/missing", "src/*.md"]) == [
+        "src/missing"
+    ]
+
+
+def test_ignore_spec_scope(tmp_path):
+    root = tmp_path / "repo"
+    for name in ["a/tmp.py", "a/app.py", "b/tmp.py", "b/app.py"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text("")
+    (root / "a" / ".gitignore").write_text("tmp.py\n")
+    # A worktree, whose ".git" file points to a git directory that shares the common one
+    common = tmp_path / "main.git"
+    (common / "info").mkdir(parents=True)
+    (common / "info" / "exclude").write_text("b/app.py\n")
+    worktree = common / "worktrees" / "repo"
+    worktree.mkdir(parents=True)
+    (worktree / "commondir").write_text("../..\n")
+    (root / ".git").write_text(f"gitdir: {worktree}\n")
+
+    paths = [
+        path.relative_to(root).as_posix()
+        for path, _ in walk_scripts(root, {".py"}, IgnoreSpec(root, gitignore=True))
+    ]
+    # The .gitignore of a folder does not apply to its siblings
+    assert sorted(paths) == ["a/app.py", "b/tmp.py"]
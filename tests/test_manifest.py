@@ -0,0 +1,70 @@
+import os
+import asyncio
+import shutil
+from llmcode.utils.manifest import RunManifest, settings_fingerprint
+from llmcode.cfg import custom_params
+from llmcode.utils.auxiliary import _apply_to_scripts_async, _settings_fingerprint
+
+
+def test_run_manifest(good_example_python_file, tmp_path):
+    script = tmp_path / "script.py"
+    shutil.copy(good_example_python_file, script)
+    fingerprint = settings_fingerprint({"overwrite": False})
+    manifest = RunManifest(tmp_path, "manifest.json")
+    assert not manifest.is_unchanged(script, fingerprint)
+    manifest.record(script, fingerprint)
+    manifest.save()
+    manifest = RunManifest(tmp_path, "manifest.json")
+    assert manifest.is_unchanged(script, fingerprint)
+    # Different settings
+    assert not manifest.is_unchanged(script, settings_fingerprint({"overwrite": True}))
+    # Same content with a new modification time
+    os.utime(script, ns=(0, 0))
+    assert manifest.is_unchanged(script, fingerprint)
+    # Modified content
+    with open(script, "a") as f:
+        f.write("\n")
+    assert not manifest.is_unchanged(script, fingerprint)
+
+
+def test_apply_to_scripts_skips_unchanged(good_example_python_file, tmp_path):
+    for i in range(3):
+        shutil.copy(good_example_python_file, tmp_path / f"script_{i}.py")
+    documented = []
+
+    async def document(file, stop_flag, *args, **kwargs):
+        documented.append(file.name)
+        return True
+
+    manifest = RunManifest(tmp_path, "manifest.json")
+    fingerprint = settings_fingerprint({})
+
+    def apply():
+        documented.clear()
+        asyncio.run(
+            _apply_to_scripts_async(
+                tmp_path,
+                document,
+                ".py",
+                [],
+                manifest=manifest,
+                fingerprint=fingerprint,
+            )
+        )
+
+    apply()
+    assert len(documented) == 3
+    apply()
+    assert len(documented) == 0
+    with open(tmp_path / "script_1.py", "a") as f:
+        f.write("\n")
+    apply()
+    assert documented == ["script_1.py"]
+
+
+def test_settings_fingerprint():
+    assert not custom_params.incremental  # Opt-in, no manifest is written by default
+    fingerprint = _settings_fingerprint("python", None, False)
+    assert fingerprint == _settings_fingerprint("python", None, False)
+    assert fingerprint != _settings_fingerprint("python", None, True)
+    assert fingerprint != _settings_fingerprint("python", ["f"], False)
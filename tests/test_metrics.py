@@ -0,0 +1,51 @@
+import json
+import shutil
+from llmcode.cfg import custom_params
+from llmcode.utils import auxiliary
+from llmcode.utils.metrics import Metrics
+
+
+def test_metrics():
+    metrics = Metrics(buckets=(0.1, 1))
+    metrics.observe("completion", 0.05, "a.py", element_type="function")
+    metrics.observe("completion", 0.5, "a.py", element_type="class")
+    metrics.observe("parse", 2, "b.py")
+    metrics.increment("completions", outcome="ok")
+    metrics.increment("completions", outcome="ok")
+    summary = metrics.summary()
+    assert summary["stages"]["completion"]["overall"]["count"] == 2
+    assert summary["stages"]["completion"]['{element_type="class"}']["max"] == 0.5
+    assert summary["stages"]["parse"]["overall"]["p50"] == 2
+    assert summary["counters"] == {'completions{outcome="ok"}': 2}
+    assert summary["files"] == {"a.py": {"completion": 0.55}, "b.py": {"parse": 2}}
+    text = metrics.prometheus()
+    assert 'llmcode_completions_total{outcome="ok"} 2' in text
+    assert (
+        'llmcode_stage_seconds_bucket{stage="completion",element_type="class",le="1"} 1'
+        in text
+    )
+    assert 'llmcode_stage_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'llmcode_file_stage_seconds{file="b.py",stage="parse"} 2' in text
+
+
+def test_format_code_metrics(good_example_python_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(custom_params, "rewrite", True)
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(good_example_python_file, project / "script.py")
+    assert auxiliary.format_code(
+        project,
+        exclude=[],
+        languages=["python"],
+        use_cache=False,
+        get_completion=lambda prompt: '"""A docstring."""',
+        metrics_json=tmp_path / "metrics.json",
+        metrics_prometheus=tmp_path / "metrics.prom",
+    )
+    summary = json.loads((tmp_path / "metrics.json").read_text())
+    assert {"parse", "select", "render", "completion", "write"} <= set(
+        summary["stages"]
+    )
+    assert summary["counters"]['completions{outcome="ok"}'] > 0
+    assert len(summary["files"]) == 1
+    assert "llmcode_stage_seconds_count" in (tmp_path / "metrics.prom").read_text()
@@ -0,0 +1,66 @@
+import json
+import shutil
+from llmcode.cfg import custom_params
+from llmcode.utils import auxiliary
+from llmcode.utils.file_utils import read_content
+from llmcode.utils.manifest import RunManifest
+from llmcode.utils.plan import Plan, projected_seconds
+
+
+def test_projected_seconds(monkeypatch):
+    queries = [{"input_tokens": 100, "output_tokens": 50, "seconds": 2}] * 10
+    assert projected_seconds(queries, 1) == 20
+    assert projected_seconds(queries, 4) == 5
+    assert projected_seconds(queries, 100) == 2  # Not less than the longest query
+    monkeypatch.setattr(custom_params, "requests_per_minute", 60)
+    assert projected_seconds(queries, 100) == 10
+
+
+def test_plan_execute(good_example_python_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(custom_params, "rewrite", True)
+    project = tmp_path / "project"
+    project.mkdir()
+    shutil.copy(good_example_python_file, project / "script.py")
+    original = read_content(project / "script.py")
+    plan_path = tmp_path / "plan.json"
+    plan = auxiliary.export_plan(
+        project, plan_path, exclude=[], languages=["python"], overwrite=True
+    )
+    assert read_content(project / "script.py") == original  # Not modified
+    content = json.loads(read_content(plan_path))
+    assert content["summary"] == plan.summary()
+    assert content["summary"]["elements"] > 1
+    assert content["scripts"][0]["path"] == "script.py"
+    assert all(
+        element["input_tokens"] > 0 and element["output_tokens"] > 0
+        for element in content["scripts"][0]["elements"]
+    )
+    # Keep only the first element in the work queue
+    first = content["scripts"][0]["elements"][0]["qualname"]
+    loaded = Plan.load(plan_path)
+    loaded.scripts[0]["elements"] = loaded.scripts[0]["elements"][:1]
+    loaded.save(plan_path)
+    prompts = []
+
+    def completion(prompt):
+        prompts.append(prompt)
+        return '"""Planned docstring"""'
+
+    assert auxiliary.execute_plan(
+        plan_path, use_cache=False, incremental=True, get_completion=completion
+    )
+    assert len(prompts) == 1
+    assert read_content(project / "script.py").count("Planned docstring") == 1
+    assert first in prompts[0] or first.rpartition(".")[2] in prompts[0]
+    # Only partly documented, so it is not recorded in the run manifest
+    fingerprint = auxiliary._settings_fingerprint("python", None, True)
+    manifest = RunManifest(project, custom_params.manifest_name)
+    assert not manifest.is_unchanged(project / "script.py", fingerprint)
+    auxiliary.export_plan(
+        project, plan_path, exclude=[], languages=["python"], overwrite=True
+    )
+    assert auxiliary.execute_plan(
+        plan_path, use_cache=False, incremental=True, get_completion=completion
+    )
+    manifest = RunManifest(project, custom_params.manifest_name)
+    assert manifest.is_unchanged(project / "script.py", fingerprint)
@@ -0,0 +1,24 @@
+import os
+from llmcode.utils.prompt import get_prompt_template
+from llmcode.utils.file_utils import read_content
+from llmcode.cfg.custom_params import document_prompts, query_completion_key
+
+
+def test_get_prompt_template():
+    path = document_prompts["python"]["function"]
+    template = get_prompt_template(path)
+    element = "def f():\n    pass"
+    assert template.render(element) == read_content(path).replace(
+        query_completion_key, element
+    )
+    assert get_prompt_template(path) is template  # Loaded only once
+
+
+def test_prompt_template_reload(tmp_path):
+    path = tmp_path / "prompt.txt"
+    path.write_text(f"Document {query_completion_key} please")
+    assert get_prompt_template(path).render("f") == "Document f please"
+    path.write_text(f"Explain {query_completion_key}")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert get_prompt_template(path).render("f") == "Explain f"
@@ -0,0 +1,82 @@
+import asyncio
+from llmcode.utils import completion
+from llmcode.utils.scheduler import RateLimiter, parse_duration, report_headers
+
+
+class RateLimitError(Exception):
+    http_status = 429
+
+    def __init__(self, headers):
+        super().__init__("Rate limit reached")
+        self.headers = headers
+
+
+def test_rate_limiter_budget():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=6000)
+    assert limiter.reserve(100) == 0  # Within the burst
+    assert abs(limiter.reserve(100) - 1) < 0.01  # 100 tokens at 100 tokens per second
+    assert parse_duration("6m0s") == 360 and parse_duration("20ms") == 0.02
+    limiter.update(
+        {"x-ratelimit-limit-tokens": "n/a", "x-ratelimit-remaining-requests": ""}
+    )
+    assert limiter.tokens.rate == 6000  # Malformed headers are ignored
+
+
+def test_run_with_timeout_async_retries():
+    calls = []
+
+    async def limited(prompt):
+        calls.append(prompt)
+        if len(calls) < 3:
+            raise RateLimitError({"retry-after-ms": "10"})
+        return prompt
+
+    limiter = RateLimiter(max_retries=5)
+    assert (
+        asyncio.run(
+            completion.run_with_timeout_async(
+                limited, args=("done",), timeout=10, rate_limiter=limiter
+            )
+        )
+        == "done"
+    )
+    assert len(calls) == 3
+    limiter = RateLimiter(max_retries=1, backoff_base=0.01)
+    calls.clear()
+    assert (
+        asyncio.run(
+            completion.run_with_timeout_async(
+                limited, args=("done",), timeout=10, rate_limiter=limiter
+            )
+        )
+        is None
+    )  # Retries exhausted
+
+
+def test_run_with_timeout_async_headers():
+    headers = {
+        "x-ratelimit-limit-requests": "600",
+        "x-ratelimit-remaining-requests": "0",
+    }
+
+    async def limited_async(prompt):
+        report_headers(headers)
+        return prompt
+
+    def limited(prompt):
+        report_headers(headers)  # From a worker thread
+        return prompt
+
+    for function in (limited_async, limited):
+        limiter = RateLimiter()
+        assert (
+            asyncio.run(
+                completion.run_with_timeout_async(
+                    function, args=("done",), timeout=10, rate_limiter=limiter
+                )
+            )
+            == "done"
+        )
+        assert limiter.requests is not None and limiter.requests.rate == 600
+        assert limiter.requests.tokens <= 0  # Nothing remaining
+    report_headers(headers)  # Ignored outside of a query
@@ -0,0 +1,56 @@
+import ast
+import textwrap
+from llmcode.utils.tokens import _collapse_bodies, count_tokens, minimize_python
+
+
+def test_minimize_python():
+    element = (
+        "def f(a, b=1):\n"
+        '        """The docstring."""\n'
+        "        # A comment\n"
+        "        x = a + b  # Another comment\n\n"
+        "        def g(y):\n"
+        "            for i in range(y):\n"
+        "                x = i * 2\n"
+        "                x += 1\n"
+        "            return x\n"
+        f"        text = {'a' * 300!r}\n"
+        "        return g(x), text\n"
+    )
+    minimized = minimize_python(element, "    ", max_tokens=50, max_literal_length=100)
+    ast.parse(minimized)
+    assert "comment" not in minimized and "\n\n" not in minimized
+    assert minimized.startswith('def f(a, b=1):\n    """The docstring."""')
+    assert "    def g(y):\n        ...\n        return x\n" in minimized
+    assert "return g(x), text" in minimized
+    assert "a" * 51 not in minimized
+    assert count_tokens(minimized) < count_tokens(element)
+    # Within the budget, only the comments are stripped
+    assert "x = i * 2" in minimize_python(element, "    ", max_tokens=10**6)
+    # Long bytes literals are elided as bytes
+    element = f"def h():\n    return {b'b' * 300!r}\n"
+    minimized = minimize_python(element, max_literal_length=100)
+    assert "b'" + "b" * 50 + "...'" in minimized
+    # Not parseable elements are kept
+    assert minimize_python("def f(:\n  pass", "") == "def f(:\n  pass"
+
+
+def test_collapse_bodies():
+    block = "\n".join(f"x{i} = compute({i}, 'value {i}')" for i in range(30))
+    code = (
+        "def f(a):\n"
+        "    if a:\n"
+        "        def g():\n"
+        f"{textwrap.indent(block, ' ' * 12)}\n"
+        "            return x0\n"
+        f"{textwrap.indent(block, ' ' * 8)}\n"
+        "    else:\n"
+        f"{textwrap.indent(block, ' ' * 8)}\n"
+        "    return a\n"
+    )
+    for max_tokens in (50, 300, 400, 600):
+        collapsed = _collapse_bodies(code, max_tokens)
+        ast.parse(collapsed)
+        assert count_tokens(collapsed) <= max_tokens  # The savings are counted once
+    # The "else" clause is collapsed on its own
+    assert "    else:\n        ...\n    return a" in _collapse_bodies(code, 200)